@@ -0,0 +1,347 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks of the overhead of the plugin on synthetic test trees.
+
+A synthetic tree is made of test cases with input files, nested directories,
+reference files and a runner script that does nothing, such that the measured
+times are the ones of the plugin. The phases are timed for several numbers of
+test cases, the minimum time of the repetitions is kept, and the results are
+written as json.
+
+The phases are:
+- settings: loading the settings of all the test cases,
+- output_tree: creating the output directories of all the test cases,
+- output_tree_sync: synchronizing the existing output directories,
+- collection: collecting the tests, including their ordering,
+- ordering: ordering the tests,
+- run: running the tests, including the creation of the output directories,
+- report: dumping the report database.
+
+Usage example:
+
+    python benchmarks/bench_plugin.py --cases 10 100 1000 --output results.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Iterator
+
+import pytest
+from pytest_executable.file_tools import create_output_directory
+from pytest_executable.plugin import OUTPUT_IGNORED_FILES
+from pytest_executable.plugin import SETTINGS_PATH
+from pytest_executable.settings import SettingsCache
+
+SETTINGS_FILENAME = "test-settings.yaml"
+
+# a test module that checks all the reference files of a test case
+TEST_MODULE = """
+def test_reference(regression_file_path):
+    assert regression_file_path.absolute.is_file()
+"""
+
+# a report generator script that does nothing
+GENERATOR_SCRIPT = "#!/bin/sh\ntrue\n"
+
+# the number of sub-directories per directory level of the tree
+TREE_WIDTH = 8
+
+
+@dataclass
+class Tree:
+    """Paths to a synthetic test tree.
+
+    Attributes:
+        root: Path to the root directory.
+        inputs: Path to the test inputs directory.
+        references: Path to the references directory.
+        cases: Paths to the test cases directories, relative to inputs.
+        runner: Path to the runner script.
+        generator: Path to the report generator script.
+    """
+
+    root: Path
+    inputs: Path
+    references: Path
+    cases: list[Path]
+    runner: Path
+    generator: Path
+
+
+def create_tree(
+    root: Path, cases: int, files: int, depth: int, references: int
+) -> Tree:
+    """Create a synthetic test tree.
+
+    Args:
+        root: Path to the directory where the tree is created.
+        cases: The number of test cases.
+        files: The number of input files per test case.
+        depth: The number of directory levels of a test case path.
+        references: The number of reference files per test case.
+
+    Returns:
+        The paths to the tree.
+    """
+    inputs = root / "tests-inputs"
+    references_root = root / "references"
+    case_paths = []
+    for index in range(cases):
+        parts = [
+            f"dir-{index // TREE_WIDTH**level % TREE_WIDTH}"
+            for level in range(depth - 1, 0, -1)
+        ]
+        case_path = Path(*parts, f"case-{index}")
+        case_paths += [case_path]
+
+        case_dir = inputs / case_path
+        case_dir.mkdir(parents=True)
+        settings = "references:\n  - 'ref-*.dat'\n" if references else ""
+        (case_dir / SETTINGS_FILENAME).write_text(settings)
+        if references:
+            (case_dir / "test_reference.py").write_text(TEST_MODULE)
+        for file_index in range(files):
+            (case_dir / f"input-{file_index}.dat").write_text(str(file_index))
+
+        reference_dir = references_root / case_path
+        reference_dir.mkdir(parents=True)
+        for file_index in range(references):
+            (reference_dir / f"ref-{file_index}.dat").write_text(str(file_index))
+
+    runner = root / "runner.sh"
+    runner.write_text("true\n")
+    generator = root / "generator.sh"
+    generator.write_text(GENERATOR_SCRIPT)
+    generator.chmod(0o755)
+    # isolate the pytest sessions from the configuration of the current project
+    (root / "pytest.ini").write_text("[pytest]\n")
+
+    return Tree(root, inputs, references_root, case_paths, runner, generator)
+
+
+class _PhasesTimer:
+    """Pytest plugin that times the phases of a session.
+
+    Attributes:
+        times: The times in seconds of the phases bound to their names.
+    """
+
+    def __init__(self) -> None:
+        self.times: dict[str, float] = {}
+
+    def __time(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        yield
+        self.times[name] = time.perf_counter() - start
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_collection(self) -> Iterator[None]:
+        """Time the collection."""
+        yield from self.__time("collection")
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_collection_modifyitems(self) -> Iterator[None]:
+        """Time the ordering."""
+        yield from self.__time("ordering")
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtestloop(self) -> Iterator[None]:
+        """Time the execution of the tests."""
+        yield from self.__time("run")
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_terminal_summary(self) -> Iterator[None]:
+        """Time the report."""
+        yield from self.__time("report")
+
+
+def time_settings(tree: Tree) -> float:
+    """Time the loading of the settings of all the test cases.
+
+    Args:
+        tree: The synthetic tree.
+
+    Returns:
+        The time in seconds.
+    """
+    cache = SettingsCache()
+    start = time.perf_counter()
+    for case_path in tree.cases:
+        cache.get(SETTINGS_PATH, tree.inputs / case_path / SETTINGS_FILENAME)
+    return time.perf_counter() - start
+
+
+def time_output_tree(tree: Tree, output_root: Path) -> tuple[float, float]:
+    """Time the creation and the synchronization of the output directories.
+
+    Args:
+        tree: The synthetic tree.
+        output_root: Path to the output root directory, it shall not exist.
+
+    Returns:
+        The times in seconds of the creation and of the synchronization.
+    """
+    times = []
+    for check_dst in (True, False):
+        start = time.perf_counter()
+        for case_path in tree.cases:
+            create_output_directory(
+                tree.inputs / case_path,
+                output_root / case_path,
+                check_dst,
+                False,
+                OUTPUT_IGNORED_FILES,
+            )
+        times += [time.perf_counter() - start]
+    return times[0], times[1]
+
+
+def time_session(tree: Tree, output_root: Path) -> dict[str, float]:
+    """Time the phases of a pytest session on the synthetic tree.
+
+    Args:
+        tree: The synthetic tree.
+        output_root: Path to the output root directory.
+
+    Returns:
+        The times in seconds of the phases bound to their names.
+    """
+    timer = _PhasesTimer()
+    args = [
+        str(tree.inputs),
+        "--exe-runner",
+        str(tree.runner),
+        "--exe-output-root",
+        str(output_root),
+        "--exe-regression-root",
+        str(tree.references),
+        "--exe-report-generator",
+        str(tree.generator),
+        "--rootdir",
+        str(tree.root),
+        "-c",
+        str(tree.root / "pytest.ini"),
+        "--import-mode=importlib",
+        "-p",
+        "no:cacheprovider",
+        "-q",
+    ]
+    # the current working directory shall be a parent of the inputs directory,
+    # the output of the session is shown only on failure
+    cwd = Path.cwd()
+    output = io.StringIO()
+    try:
+        os.chdir(tree.root)
+        with contextlib.redirect_stdout(output):
+            exit_code = pytest.main(args, plugins=[timer])
+    finally:
+        os.chdir(cwd)
+    if exit_code != pytest.ExitCode.OK:
+        sys.stderr.write(output.getvalue())
+        raise RuntimeError(f"the benchmark session failed with exit code {exit_code}")
+    return timer.times
+
+
+def run(
+    cases: list[int], files: int, depth: int, references: int, repeat: int
+) -> list[dict[str, Any]]:
+    """Run the benchmarks.
+
+    Args:
+        cases: The numbers of test cases of the trees.
+        files: The number of input files per test case.
+        depth: The number of directory levels of a test case path.
+        references: The number of reference files per test case.
+        repeat: The number of repetitions of the measures, the minimum is kept.
+
+    Returns:
+        The times in seconds of the phases for each number of test cases.
+    """
+    results = []
+    for cases_number in cases:
+        phases: dict[str, float] = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tree = create_tree(Path(tmp_dir), cases_number, files, depth, references)
+            for index in range(repeat):
+                times = {"settings": time_settings(tree)}
+                output_root = tree.root / f"output-{index}"
+                times["output_tree"], times["output_tree_sync"] = time_output_tree(
+                    tree, output_root
+                )
+                shutil.rmtree(output_root)
+                times.update(time_session(tree, output_root))
+                for name, value in times.items():
+                    phases[name] = min(phases.get(name, value), value)
+        results += [{"cases": cases_number, "phases": phases}]
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of the benchmarks.
+
+    Args:
+        argv: The command line arguments, if None the ones of the process.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--cases", type=int, nargs="+", default=[10, 100, 1000], help="numbers of cases"
+    )
+    parser.add_argument("--files", type=int, default=10, help="input files per case")
+    parser.add_argument("--depth", type=int, default=3, help="depth of a case path")
+    parser.add_argument(
+        "--references", type=int, default=5, help="reference files per case"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="measures repetitions")
+    parser.add_argument("--output", type=Path, help="json output file, default stdout")
+    args = parser.parse_args(argv)
+
+    results = {
+        "parameters": {
+            "files": args.files,
+            "depth": args.depth,
+            "references": args.references,
+            "repeat": args.repeat,
+        },
+        "python": platform.python_version(),
+        "pytest": pytest.__version__,
+        "platform": platform.platform(),
+        "results": run(
+            args.cases, args.files, args.depth, args.references, args.repeat
+        ),
+    }
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+    else:
+        with args.output.open("w") as stream:
+            json.dump(results, stream, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,9 +30,47 @@
 # sys.path.insert(0, os.path.abspath('.'))
 from __future__ import annotations
 
+import json
+from functools import partial
+from pathlib import Path
+
+# file written in the output root directory by generate_report.py with the status
+# of the test cases and the documents to be read again
+REPORT_CASES_FILENAME = ".report-cases.json"
+
 
 def setup(app):
     app.add_css_file("html_width.css")
+    try:
+        with (Path(app.srcdir) / REPORT_CASES_FILENAME).open() as stream:
+            report_cases = json.load(stream)
+    except (OSError, ValueError):
+        report_cases = {"cases": {}, "outdated": []}
+    app.connect("env-get-outdated", partial(get_outdated, report_cases["outdated"]))
+    app.connect("source-read", partial(add_status, report_cases["cases"]))
+
+
+def get_outdated(outdated, app, env, added, changed, removed):
+    """Return the documents which inputs changed since the last report."""
+    return [docname for docname in outdated if docname in env.found_docs]
+
+
+def add_status(cases, app, docname, source):
+    """Add the status and the messages of a test case to its description."""
+    case = cases.get(docname)
+    if case is None:
+        return
+    lines = [
+        "",
+        "",
+        f".. admonition:: Status: {case['status']}",
+        "",
+        f"   The test case is {case['status']}.",
+    ]
+    for message in case["messages"]:
+        lines += ["", "   ::", ""]
+        lines += [f"      {line}" for line in message.splitlines()]
+    source[0] += "\n".join(lines) + "\n"
 
 
 # -- Project information -----------------------------------------------------
@@ -18,8 +18,8 @@
 """This module generates the test report.
 
 It shall be called from the test output root directory where the tests report
-database file is (tests_report_db.yaml). Under the output root directory, it
-will create a:
+database file is (tests_report_db.sqlite or tests_report_db.yaml). Under the
+output root directory, it will create a:
 - the index.rst file from the index_template.rst,
 - the directory named report that contains the generated report.
 
@@ -31,15 +31,31 @@ A line of the summary table contains a case:
 The table of content contains the path to the description.rst files relative to
 the output root directory.
 
+The status and the messages of a test case are also added to its description
+document by the sphinx configuration.
+
+The report is generated incrementally: the test cases are read from the report
+database instead of searching the output root directory, the index.rst is
+written only when its contents change, and the doctrees that sphinx stores in
+the report directory are kept between the runs. The digests of the inputs of the
+report of each test case, its description file and its status and messages, are
+kept in the output root directory, such that sphinx reads again only the
+modified documents and the ones which inputs changed. The files of the test
+inputs, to which the description files are usually linked, are never modified.
+
 This module requires the packages tabulate and sphinx, these could be installed
 with the command: conda install tabluate sphinx
 """
 from __future__ import annotations
 
+import hashlib
+import json
 import shutil
+import sqlite3
 import subprocess
 import textwrap
 from pathlib import Path
+from typing import Any
 
 import yaml
 from tabulate import tabulate
@@ -55,27 +71,60 @@ DESCRIPTION_FILENAME = "description.rst"
 DOC_GENERATOR_DIRPATH = Path(__file__).parent
 # sphinx documentation builder type
 DOC_BUILDER = "html"
+# number of the processes of sphinx
+SPHINX_JOBS = "auto"
 # name of the test report database
 REPORT_DB_FILENAME = "tests_report_db.yaml"
+# name of the SQLite test report database
+REPORT_SQLITE_FILENAME = "tests_report_db.sqlite"
+# name of the file with the digests of the inputs of the reports of the test cases
+DIGESTS_FILENAME = ".report-digests.json"
+# name of the file with the status of the test cases and the documents to be read
+# again, it is read by the sphinx configuration
+REPORT_CASES_FILENAME = ".report-cases.json"
 # template file for creating the index.rst
 INDEX_TEMPLATE_RST = "index_template.rst"
 
 
-def create_summary_table(output_root: Path) -> str:
+def load_report_db(output_root: Path) -> dict[str, dict[str, Any]]:
+    """Load the report database.
+
+    The SQLite database is used if it exists, otherwise the yaml database.
+
+    Args:
+        output_root: Path to the test results output directory.
+
+    Returns:
+        The report database.
+    """
+    sqlite_path = output_root / REPORT_SQLITE_FILENAME
+    if not sqlite_path.is_file():
+        with (output_root / REPORT_DB_FILENAME).open() as stream:
+            return yaml.safe_load(stream) or {}
+
+    connection = sqlite3.connect(str(sqlite_path))
+    try:
+        cursor = connection.execute("SELECT path, status, messages FROM cases")
+        return {
+            path: {"status": status, "messages": json.loads(messages)}
+            for path, status, messages in cursor
+        }
+    finally:
+        connection.close()
+
+
+def create_summary_table(report_db: dict[str, dict[str, Any]]) -> str:
     """Create the summary table in rst.
 
     The summary table is sorted alphabetically.
 
     Args:
-        output_root: Path to the test results output directory.
+        report_db: The report database.
 
     Returns:
         The summary table string in rst format.
     """
-    with (output_root / REPORT_DB_FILENAME).open() as stream:
-        report_db = yaml.safe_load(stream)
-
-    report_data: list[tuple[str]] = []
+    report_data: list[tuple[str, str, str]] = []
     for case, data in report_db.items():
         messages = "\n".join(data.get("messages", []))
         report_data += [(case, data["status"], messages)]
@@ -85,21 +134,118 @@ def create_summary_table(output_root: Path) -> str:
     )
 
 
-def create_index_rst(output_root: Path) -> None:
-    """Create the index.rst.
+def get_case_digests(
+    output_root: Path, report_db: dict[str, dict[str, Any]], paths: list[Path]
+) -> dict[str, str]:
+    """Return the digests of the inputs of the reports of the test cases.
+
+    The inputs of the report of a test case are its description file and its
+    status and messages from the report database.
+
+    Args:
+        output_root: Path to the test results output directory.
+        report_db: The report database.
+        paths: The paths to the description files relatively to the output root
+            directory.
+
+    Returns:
+        The digests bound to the sphinx names of the description documents.
+    """
+    digests: dict[str, str] = {}
+    for path in paths:
+        entry = report_db[str(path.parent)]
+        hash_ = hashlib.blake2b((output_root / path).read_bytes())
+        hash_.update(json.dumps([entry["status"], entry.get("messages", [])]).encode())
+        digests[path.with_suffix("").as_posix()] = hash_.hexdigest()
+    return digests
+
+
+def write_report_cases(
+    output_root: Path, report_db: dict[str, dict[str, Any]], paths: list[Path]
+) -> dict[str, str]:
+    """Write the status of the test cases and the documents to be read again.
+
+    The file REPORT_CASES_FILENAME in the output root directory is read by the
+    sphinx configuration, the status and the messages of a test case are added
+    to its description document, and the documents which inputs changed since
+    the last report are read again by sphinx. The files of the test inputs are
+    never modified.
 
     Args:
         output_root: Path to the test results output directory.
+        report_db: The report database.
+        paths: The paths to the description files relatively to the output root
+            directory.
+
+    Returns:
+        The digests of the inputs of the reports of the test cases, to be saved
+        with :py:func:`save_case_digests` once the report is built.
+    """
+    try:
+        with (output_root / DIGESTS_FILENAME).open() as stream:
+            previous_digests: dict[str, str] = json.load(stream)
+    except (OSError, ValueError):
+        previous_digests = {}
+
+    digests = get_case_digests(output_root, report_db, paths)
+    cases = {}
+    for path in paths:
+        entry = report_db[str(path.parent)]
+        cases[path.with_suffix("").as_posix()] = {
+            "status": entry["status"],
+            "messages": entry.get("messages", []),
+        }
+    outdated = [
+        docname
+        for docname, digest in digests.items()
+        if previous_digests.get(docname) != digest
+    ]
+
+    with (output_root / REPORT_CASES_FILENAME).open("w") as stream:
+        json.dump({"cases": cases, "outdated": outdated}, stream)
+
+    return digests
+
+
+def save_case_digests(output_root: Path, digests: dict[str, str]) -> None:
+    """Save the digests of the inputs of the reports of the test cases.
+
+    Args:
+        output_root: Path to the test results output directory.
+        digests: The digests from :py:func:`write_report_cases`.
+    """
+    with (output_root / DIGESTS_FILENAME).open("w") as stream:
+        json.dump(digests, stream)
+
+
+def create_index_rst(output_root: Path) -> dict[str, str]:
+    """Create the index.rst and the status of the test cases for sphinx.
+
+    The index.rst is not written when its contents have not changed.
+
+    Args:
+        output_root: Path to the test results output directory.
+
+    Returns:
+        The digests of the inputs of the reports of the test cases, see
+        :py:func:`write_report_cases`.
     """
     # check that the output directory exists
     output_root = Path(output_root).resolve(True)
 
-    # find the paths to the description rst files relatively to the output_root
+    report_db = load_report_db(output_root)
+
+    # the paths to the description rst files relatively to the output_root of
+    # the test cases in the database
     description_paths: list[Path] = []
-    for path in output_root.glob(f"**/{DESCRIPTION_FILENAME}"):
-        description_paths += [path.relative_to(output_root)]
+    for case in report_db:
+        path = Path(case) / DESCRIPTION_FILENAME
+        if (output_root / path).is_file():
+            description_paths += [path]
 
-    summary_table = create_summary_table(output_root)
+    digests = write_report_cases(output_root, report_db, description_paths)
+
+    summary_table = create_summary_table(report_db)
 
     # the toc tree is sorted alphabetically like the summary table
     toctree_cases = textwrap.indent(
@@ -118,8 +264,11 @@ def create_index_rst(output_root: Path) -> None:
 
     # write the final index.rst
     index_path = output_root / "index.rst"
-    with index_path.open("w") as stream:
-        stream.write(index_rst)
+    if not index_path.is_file() or index_path.read_text() != index_rst:
+        with index_path.open("w") as stream:
+            stream.write(index_rst)
+
+    return digests
 
 
 if __name__ == "__main__":
@@ -127,17 +276,21 @@ if __name__ == "__main__":
     output_root = Path.cwd()
 
     # create the report index.rst
-    create_index_rst(output_root)
+    digests = create_index_rst(output_root)
     # copy the _static directory if it exists
     static_path = DOC_GENERATOR_DIRPATH / "_static"
     if static_path.exists():
-        shutil.copytree(static_path, output_root / "_static")
+        shutil.copytree(static_path, output_root / "_static", dirs_exist_ok=True)
 
-    # command line to build the report
+    # command line to build the report, the doctrees kept by sphinx in the report
+    # directory are reused such that only the documents that changed are read again
     cmd = (
-        f"sphinx-build -b {DOC_BUILDER} -c {DOC_GENERATOR_DIRPATH} "
+        f"sphinx-build -b {DOC_BUILDER} -j {SPHINX_JOBS} -c {DOC_GENERATOR_DIRPATH} "
         f"{output_root} {output_root}/{REPORT_OUTPUT_DIRNAME}"
     )
 
     # build the report
     subprocess.run(cmd.split(), check=True)
+
+    # the documents which inputs changed are read again until a build succeeds
+    save_case_digests(output_root, digests)
@@ -0,0 +1,400 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Provides the cache for the results of the runner scripts executions."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import stat
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Iterable
+
+from .file_tools import file_digest
+
+LOG = logging.getLogger(__name__)
+
+# name of the file with the description of a cache entry
+MANIFEST_FILENAME = "manifest.json"
+# name of the directory with the files of a cache entry
+FILES_DIRNAME = "files"
+# name of the file with the digests of the files of a directory tree
+DIGESTS_FILENAME = ".exe-digests.json"
+# prefix of the names of the entries being stored
+_TMP_PREFIX = ".tmp-"
+# age in seconds after which an entry being stored is considered as left behind by
+# an interrupted session
+STALE_TMP_AGE = 24 * 3600
+
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+# maps the identification of a file contents to its digest, such that a file is
+# hashed only once as long as it is not modified
+_DIGESTS: dict[tuple[str, int, int], str] = {}
+
+
+def parse_size(size: str) -> int:
+    """Return a size in bytes from a string.
+
+    Args:
+        size: A number optionally followed by one of the units K, M, G or T.
+
+    Returns:
+        The size in bytes.
+
+    Raises:
+        ValueError: If the size cannot be parsed or is less than 1 byte.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d*)?)\s*([KMGT]?)B?\s*", size.upper())
+    if match is None:
+        raise ValueError(f"invalid size: {size}")
+    nbytes = int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+    if nbytes < 1:
+        raise ValueError(f"invalid size: {size}")
+    return nbytes
+
+
+def _get_digest(path: Path) -> str:
+    """Return the digest of the contents of a file, hashing it only once.
+
+    Args:
+        path: Path to a file.
+
+    Returns:
+        The digest.
+    """
+    real_path = os.path.realpath(path)
+    file_stat = os.stat(real_path)
+    key = (real_path, file_stat.st_mtime_ns, file_stat.st_size)
+    digest = _DIGESTS.get(key)
+    if digest is None:
+        digest = _DIGESTS[key] = file_digest(Path(real_path))
+    return digest
+
+
+@dataclass
+class CacheInputs:
+    """The inputs that identify the results of a runner script execution.
+
+    Attributes:
+        input_dir: Path to the input directory of a test case.
+        ignored_files: Files to be ignored in the input directory.
+        dependencies: Paths to the files on which the results depend in addition
+            to the input files, only their modification times and sizes are
+            used.
+    """
+
+    input_dir: Path
+    ignored_files: Iterable[str]
+    dependencies: Iterable[Path]
+
+    def get_key(self, script: str, digests: DigestCache | None = None) -> str:
+        """Return the key that identifies the results of an execution.
+
+        The key is computed from the contents of the script and of the input
+        files, and from the modification times and sizes of the dependencies.
+
+        Args:
+            script: The contents of the script.
+            digests: The cache of the digests of the input files, if None the
+                digests are only kept in memory.
+
+        Returns:
+            The key.
+        """
+        get_digest = _get_digest if digests is None else digests.get
+        digest = hashlib.blake2b(script.encode())
+        for dir_path, dir_names, file_names in os.walk(
+            self.input_dir, followlinks=True
+        ):
+            dir_names[:] = sorted(set(dir_names).difference(self.ignored_files))
+            for file_name in sorted(set(file_names).difference(self.ignored_files)):
+                path = Path(dir_path, file_name)
+                relative_path = path.relative_to(self.input_dir)
+                digest.update(f"\0{relative_path}\0{get_digest(path)}".encode())
+        for path in sorted(self.dependencies):
+            try:
+                file_stat = path.stat()
+            except FileNotFoundError:
+                description = "missing"
+            else:
+                description = f"{file_stat.st_mtime_ns} {file_stat.st_size}"
+            digest.update(f"\0{path.resolve()}\0{description}".encode())
+        return digest.hexdigest()
+
+
+class ResultCache:
+    """Cache for the results of the runner scripts executions.
+
+    An entry contains the files created or modified in the working directory by an
+    execution, it is identified by a key, see :meth:`CacheInputs.get_key`. When the
+    total size of the entries exceeds the limit, the least recently used entries
+    are removed, as well as the entries left behind by an interrupted store.
+
+    The digests of the input files are stored in the cache directory, such that
+    the unmodified input files are not hashed again in the next sessions.
+
+    Args:
+        root: Path to the cache directory.
+        max_size: The maximum size of the cache in bytes.
+    """
+
+    def __init__(self, root: Path, max_size: int):
+        self.root = root
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        root.mkdir(parents=True, exist_ok=True)
+        # the input files are identified by their absolute paths
+        self.digests = DigestCache(Path(root.resolve().anchor), root / DIGESTS_FILENAME)
+
+    def save(self) -> None:
+        """Write the digests of the input files if digests have been added."""
+        self.digests.save()
+
+    def restore(self, key: str, workdir: Path) -> bool:
+        """Restore the files of an entry in a working directory.
+
+        The existing files are replaced.
+
+        Args:
+            key: The key of the entry.
+            workdir: Path to the working directory.
+
+        Returns:
+            Whether the entry exists.
+        """
+        entry_path = self.root / key
+        try:
+            # mark the entry as recently used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return False
+
+        LOG.debug("restoring the cached results %s in %s", key, workdir)
+        files_path = entry_path / FILES_DIRNAME
+        for dir_path, _, file_names in os.walk(files_path):
+            dst_dir_path = workdir / Path(dir_path).relative_to(files_path)
+            dst_dir_path.mkdir(parents=True, exist_ok=True)
+            for file_name in file_names:
+                dst_path = dst_dir_path / file_name
+                # do not write through a link to an input file
+                if dst_path.is_symlink() or dst_path.exists():
+                    dst_path.unlink()
+                shutil.copy2(Path(dir_path, file_name), dst_path)
+
+        return True
+
+    def store(self, key: str, workdir: Path, paths: Iterable[Path]) -> None:
+        """Store files of a working directory in an entry.
+
+        Args:
+            key: The key of the entry.
+            workdir: Path to the working directory.
+            paths: Paths to the files to be stored, relative to the working
+                directory.
+        """
+        entry_path = self.root / key
+        if entry_path.exists():
+            return
+
+        LOG.debug("storing the results of %s in the cache %s", workdir, key)
+        tmp_path = self.root / f"{_TMP_PREFIX}{uuid.uuid4().hex}"
+        files_path = tmp_path / FILES_DIRNAME
+        size = 0
+        for path in paths:
+            dst_path = files_path / path
+            dst_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(workdir / path, dst_path)
+            size += dst_path.stat().st_size
+        files_path.mkdir(parents=True, exist_ok=True)
+        with (tmp_path / MANIFEST_FILENAME).open("w") as file_:
+            json.dump({"size": size}, file_)
+
+        with self.__lock:
+            try:
+                tmp_path.rename(entry_path)
+            except OSError:
+                # stored concurrently
+                shutil.rmtree(tmp_path)
+            self.__evict()
+
+    def __evict(self) -> None:
+        """Remove the least recently used entries exceeding the size limit.
+
+        The entries being stored for longer than :data:`STALE_TMP_AGE` are
+        removed too.
+        """
+        entries: list[tuple[int, int, Path]] = []
+        total_size = 0
+        for entry_path in self.root.iterdir():
+            if entry_path.name.startswith(_TMP_PREFIX):
+                try:
+                    age = time.time() - entry_path.stat().st_mtime
+                except OSError:
+                    continue
+                if age > STALE_TMP_AGE:
+                    LOG.debug("removing the interrupted cache entry %s", entry_path)
+                    shutil.rmtree(entry_path, ignore_errors=True)
+                continue
+            try:
+                with (entry_path / MANIFEST_FILENAME).open() as file_:
+                    size = json.load(file_)["size"]
+                mtime = entry_path.stat().st_mtime_ns
+            except (OSError, ValueError, KeyError):
+                # not an entry
+                continue
+            entries += [(mtime, size, entry_path)]
+            total_size += size
+
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            LOG.debug("removing the cache entry %s", entry_path.name)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+
+
+class DigestCache:
+    """Cache for the digests of the files of a directory tree.
+
+    The digests are stored in a file in the root directory of the tree, they are
+    identified by the relative paths, the modification times and the sizes of the
+    files, such that a file is hashed only once as long as it is not modified.
+    The errors when writing the cache file are ignored, for instance when the
+    tree is read-only.
+
+    Args:
+        root: Path to the root directory of the tree.
+        path: Path to the cache file, by default in the root directory.
+    """
+
+    def __init__(self, root: Path, path: Path | None = None):
+        self.root = root
+        self.__path = root / DIGESTS_FILENAME if path is None else path
+        self.__lock = threading.Lock()
+        self.__modified = False
+        self.__digests: dict[str, list[Any]] = {}
+        try:
+            with self.__path.open() as file_:
+                self.__digests = json.load(file_)
+        except (OSError, ValueError):
+            pass
+        if not isinstance(self.__digests, dict):
+            self.__digests = {}
+
+    def get(self, path: Path) -> str:
+        """Return the digest of a file.
+
+        Args:
+            path: Path to a file, under the root directory or not.
+
+        Returns:
+            The hexadecimal BLAKE2 digest.
+        """
+        try:
+            rel_path = str(path.relative_to(self.root))
+        except ValueError:
+            return _get_digest(path)
+
+        file_stat = path.stat()
+        file_id = [file_stat.st_mtime_ns, file_stat.st_size]
+        with self.__lock:
+            entry = self.__digests.get(rel_path)
+        if entry is not None and entry[:2] == file_id:
+            return str(entry[2])
+
+        digest = file_digest(path)
+        with self.__lock:
+            self.__digests[rel_path] = file_id + [digest]
+            self.__modified = True
+        return digest
+
+    def save(self) -> None:
+        """Write the cache file if digests have been added."""
+        with self.__lock:
+            if not self.__modified:
+                return
+            tmp_path = self.__path.with_name(f"{self.__path.name}.{uuid.uuid4().hex}")
+            try:
+                with tmp_path.open("w") as file_:
+                    json.dump(self.__digests, file_)
+                tmp_path.replace(self.__path)
+            except OSError:
+                LOG.debug(
+                    "cannot write the digests cache %s", self.__path, exc_info=True
+                )
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+                return
+            self.__modified = False
+
+
+def get_modified_files(
+    workdir: Path, snapshot: dict[Path, tuple[int, int]]
+) -> list[Path]:
+    """Return the files of a directory created or modified since a snapshot.
+
+    The symbolic links are ignored.
+
+    Args:
+        workdir: Path to a directory.
+        snapshot: The snapshot of the directory, see :func:`get_snapshot`.
+
+    Returns:
+        The paths relative to the directory.
+    """
+    return [
+        path
+        for path, file_id in get_snapshot(workdir).items()
+        if snapshot.get(path) != file_id
+    ]
+
+
+def get_snapshot(workdir: Path) -> dict[Path, tuple[int, int]]:
+    """Return the modification times and sizes of the files of a directory.
+
+    The symbolic links are ignored.
+
+    Args:
+        workdir: Path to a directory.
+
+    Returns:
+        The modification times and sizes bound to the paths relative to the
+        directory.
+    """
+    snapshot: dict[Path, tuple[int, int]] = {}
+    for dir_path, _, file_names in os.walk(workdir):
+        for file_name in file_names:
+            path = Path(dir_path, file_name)
+            file_stat = path.lstat()
+            if stat.S_ISLNK(file_stat.st_mode):
+                continue
+            snapshot[path.relative_to(workdir)] = (
+                file_stat.st_mtime_ns,
+                file_stat.st_size,
+            )
+    return snapshot
@@ -0,0 +1,718 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Provides the comparison of the fields of a file with the ones of a reference.
+
+The fields are loaded as numpy arrays, numpy is an optional dependency that is
+only imported when the fields are compared.
+"""
+from __future__ import annotations
+
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Tuple
+from typing import TYPE_CHECKING
+from typing import Union
+
+from .cache import DigestCache
+from .file_tools import file_digest
+from .settings import Tolerances
+
+if TYPE_CHECKING:
+    import numpy
+
+# name of the field of the files that contain a single array
+SINGLE_FIELD_NAME = "data"
+
+# default number of bytes of the chunks of the compared arrays
+DEFAULT_CHUNK_SIZE = 1 << 26
+
+FieldsType = Dict[str, "numpy.ndarray[Any, Any]"]
+LoaderType = Callable[[Path], FieldsType]
+
+# the errors of the comparison of a file that are reported with the results of
+# the other files, like the ones of the loaders for corrupted or incomplete files
+FILE_ERRORS = (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile, zlib.error)
+
+
+def _import_numpy() -> Any:
+    """Return the numpy module.
+
+    Raises:
+        ImportError: If numpy is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        msg = (
+            "numpy is required for comparing fields, it can be installed with "
+            "pip install pytest-executable[compare]"
+        )
+        raise ImportError(msg)
+    return numpy
+
+
+def load_npy(path: Path) -> FieldsType:
+    """Load a numpy .npy file.
+
+    The array is memory mapped.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        The array of the file bound to :py:data:`SINGLE_FIELD_NAME`.
+    """
+    np = _import_numpy()
+    return {SINGLE_FIELD_NAME: np.load(path, mmap_mode="r", allow_pickle=False)}
+
+
+def load_npz(path: Path) -> FieldsType:
+    """Load a numpy .npz file.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        The arrays of the file bound to their names.
+    """
+    np = _import_numpy()
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_table(path: Path, delimiter: str | None = None) -> FieldsType:
+    """Load a text file with a table of numbers.
+
+    Each column of the table is a field. If the first line contains a token that
+    is not a number, it is the header with the names of the columns, otherwise
+    the columns are named column_0, column_1, ...
+
+    Args:
+        path: Path to the file.
+        delimiter: The delimiter of the columns, if None the columns are
+            delimited by whitespaces.
+
+    Returns:
+        The columns bound to their names.
+    """
+    np = _import_numpy()
+    with path.open() as stream:
+        tokens = [token.strip() for token in stream.readline().split(delimiter)]
+    has_header = not all(map(_is_number, tokens))
+    data = np.loadtxt(path, delimiter=delimiter, skiprows=int(has_header), ndmin=2)
+    if has_header:
+        names = tokens
+    else:
+        names = [f"column_{i}" for i in range(data.shape[1])]
+    return {name: data[:, i] for i, name in enumerate(names)}
+
+
+def _is_number(token: str) -> bool:
+    """Return whether a string is a number.
+
+    Args:
+        token: The string.
+
+    Returns:
+        Whether the string is a number.
+    """
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def raw_loader(dtype: str = "<f8", name: str = SINGLE_FIELD_NAME) -> LoaderType:
+    """Return a loader of a raw binary file with a single array.
+
+    The array is memory mapped.
+
+    Args:
+        dtype: The numpy data type of the elements of the array.
+        name: The name of the field.
+
+    Returns:
+        The loader.
+    """
+
+    def load_raw(path: Path) -> FieldsType:
+        np = _import_numpy()
+        if path.stat().st_size == 0:
+            # an empty file cannot be memory mapped
+            return {name: np.empty(0, dtype=dtype)}
+        return {name: np.memmap(path, dtype=dtype, mode="r")}
+
+    return load_raw
+
+
+# the loaders bound to the suffixes of the files they load
+LOADERS: dict[str, LoaderType] = {
+    ".npy": load_npy,
+    ".npz": load_npz,
+    ".csv": partial(load_table, delimiter=","),
+    ".txt": load_table,
+    ".dat": load_table,
+    ".bin": raw_loader(),
+}
+
+
+def register_loader(suffix: str, loader: LoaderType) -> None:
+    """Register the loader of the files with a suffix.
+
+    An already registered loader is replaced.
+
+    Args:
+        suffix: The suffix of the files, including the leading dot.
+        loader: The loader, a callable that takes the path to a file and returns
+            the fields as numpy arrays bound to their names.
+    """
+    LOADERS[suffix] = loader
+
+
+def load_fields(path: Path, loader: LoaderType | None = None) -> FieldsType:
+    """Load the fields of a file.
+
+    Args:
+        path: Path to the file.
+        loader: The loader, if None the registered loader for the suffix of the
+            file is used.
+
+    Returns:
+        The fields bound to their names.
+
+    Raises:
+        ValueError: If there is no loader for the file.
+    """
+    if loader is None:
+        loader = LOADERS.get(path.suffix)
+        if loader is None:
+            raise ValueError(f"no loader registered for the file {path}")
+    return loader(path)
+
+
+@dataclass
+class FieldStats:
+    """Statistics of the comparison of a field with its reference.
+
+    Attributes:
+        name: The name of the field.
+        tolerances: The tolerances used for the comparison.
+        size: The number of elements.
+        max_abs_error: The maximum absolute error.
+        max_rel_error: The maximum relative error.
+        violations: The number of elements out of the tolerances.
+        worst_index: The index of the element that is the farthest from the
+            tolerances, None if the field is empty.
+        nbytes: The number of bytes of the field and of its reference.
+        duration: The duration of the comparison in seconds.
+        identical: Whether the field has not been compared because the file and
+            the reference file are identical.
+    """
+
+    name: str
+    tolerances: Tolerances
+    size: int
+    max_abs_error: float
+    max_rel_error: float
+    violations: int
+    worst_index: Tuple[int, ...] | None
+    nbytes: int = 0
+    duration: float = 0.0
+    identical: bool = False
+
+    @property
+    def passed(self) -> bool:
+        """Whether all the elements are within the tolerances."""
+        return self.violations == 0
+
+    @property
+    def throughput(self) -> float:
+        """The number of GB of the field and its reference compared per second."""
+        if self.duration == 0.0:
+            return 0.0
+        return self.nbytes / self.duration / 1e9
+
+    def __str__(self) -> str:
+        return (
+            f"field {self.name}: {self.violations} of {self.size} elements out of "
+            f"the tolerances (rel={self.tolerances.rel}, abs={self.tolerances.abs}), "
+            f"max absolute error {self.max_abs_error:g}, "
+            f"max relative error {self.max_rel_error:g}, "
+            f"worst element at index {self.worst_index}"
+        )
+
+
+def compare_arrays(
+    name: str,
+    array: numpy.ndarray[Any, Any],
+    ref_array: numpy.ndarray[Any, Any],
+    tolerances: Tolerances,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> FieldStats:
+    """Compare an array with a reference array.
+
+    An element is within the tolerances when
+    ``abs(value - ref_value) <= tolerances.abs + tolerances.rel * abs(ref_value)``,
+    like with :py:func:`numpy.isclose`. The NaN are equal to each other.
+
+    The arrays are compared by chunks such that the memory used does not depend
+    on their sizes, the arrays may be memory mapped. The statistics do not
+    depend on the chunk size.
+
+    Args:
+        name: The name of the field.
+        array: The array.
+        ref_array: The reference array.
+        tolerances: The comparison tolerances.
+        chunk_size: The number of bytes of the chunks of an array.
+
+    Returns:
+        The statistics of the comparison.
+
+    Raises:
+        ValueError: If the shapes of the arrays differ.
+    """
+    np = _import_numpy()
+    array = np.asanyarray(array)
+    ref_array = np.asanyarray(ref_array)
+    if array.shape != ref_array.shape:
+        msg = (
+            f"field {name}: the shape {array.shape} differs from the reference "
+            f"shape {ref_array.shape}"
+        )
+        raise ValueError(msg)
+
+    if array.size == 0:
+        return FieldStats(name, tolerances, 0, 0.0, 0.0, 0, None)
+
+    start_time = time.perf_counter()
+    max_abs_error = 0.0
+    max_rel_error = 0.0
+    violations = 0
+    worst_excess = -np.inf
+    worst = 0
+
+    for offset, chunk, ref_chunk in _iter_chunks(array, ref_array, chunk_size):
+        chunk_stats = _compare_chunk(chunk, ref_chunk, tolerances)
+        max_abs_error = max(max_abs_error, chunk_stats[0])
+        max_rel_error = max(max_rel_error, chunk_stats[1])
+        violations += chunk_stats[2]
+        # keep the first worst element like numpy.argmax
+        if chunk_stats[3] > worst_excess:
+            worst_excess = chunk_stats[3]
+            worst = offset + chunk_stats[4]
+
+    return FieldStats(
+        name,
+        tolerances,
+        int(array.size),
+        max_abs_error,
+        max_rel_error,
+        violations,
+        tuple(int(i) for i in np.unravel_index(worst, array.shape)),
+        int(array.nbytes + ref_array.nbytes),
+        time.perf_counter() - start_time,
+    )
+
+
+def _iter_chunks(
+    array: numpy.ndarray[Any, Any],
+    ref_array: numpy.ndarray[Any, Any],
+    chunk_size: int,
+) -> Iterator[tuple[int, numpy.ndarray[Any, Any], numpy.ndarray[Any, Any]]]:
+    """Yield the chunks of 2 arrays of the same shape.
+
+    The chunks are flat and yielded with the flat index of their first element
+    in the C order. When the arrays are contiguous, the chunks are views,
+    otherwise the arrays are chunked along their first axis.
+
+    Args:
+        array: The array.
+        ref_array: The reference array.
+        chunk_size: The number of bytes of the chunks of an array.
+    """
+    itemsize = max(array.itemsize, ref_array.itemsize)
+
+    if array.flags.c_contiguous and ref_array.flags.c_contiguous:
+        flat_array = array.reshape(-1)
+        flat_ref_array = ref_array.reshape(-1)
+        step = max(1, chunk_size // itemsize)
+        for start in range(0, array.size, step):
+            stop = start + step
+            yield start, flat_array[start:stop], flat_ref_array[start:stop]
+        return
+
+    row_size = array.size // array.shape[0]
+    step = max(1, chunk_size // (row_size * itemsize))
+    for start in range(0, array.shape[0], step):
+        stop = start + step
+        yield (
+            start * row_size,
+            array[start:stop].reshape(-1),
+            ref_array[start:stop].reshape(-1),
+        )
+
+
+def _compare_chunk(
+    array: numpy.ndarray[Any, Any],
+    ref_array: numpy.ndarray[Any, Any],
+    tolerances: Tolerances,
+) -> tuple[float, float, int, float, int]:
+    """Compare a flat chunk with a reference chunk.
+
+    Args:
+        array: The chunk.
+        ref_array: The reference chunk.
+        tolerances: The comparison tolerances.
+
+    Returns:
+        The max absolute error, the max relative error, the number of violations,
+        the excess over the tolerances of the worst element and its index.
+    """
+    np = _import_numpy()
+
+    # integer arrays would overflow when subtracted
+    if not np.issubdtype(array.dtype, np.inexact):
+        array = array.astype(np.float64)
+    if not np.issubdtype(ref_array.dtype, np.inexact):
+        ref_array = ref_array.astype(np.float64)
+
+    with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+        equal = (array == ref_array) | (np.isnan(array) & np.isnan(ref_array))
+        abs_error = np.where(equal, 0.0, np.abs(array - ref_array))
+        # a NaN or an infinite value compared to anything else
+        abs_error[np.isnan(abs_error)] = np.inf
+        abs_ref = np.abs(ref_array)
+        rel_error = np.divide(
+            abs_error, abs_ref, out=np.full_like(abs_error, np.inf), where=abs_ref != 0
+        )
+        rel_error[abs_error == 0.0] = 0.0
+        rel_error[np.isnan(rel_error)] = np.inf
+        excess = abs_error - (tolerances.abs + tolerances.rel * abs_ref)
+        excess[np.isnan(excess)] = np.inf
+        excess[equal] = -np.inf
+
+    worst = int(np.argmax(excess))
+    return (
+        float(abs_error.max()),
+        float(rel_error.max()),
+        int(np.count_nonzero(excess > 0)),
+        float(excess[worst]),
+        worst,
+    )
+
+
+def compare_fields(
+    path: Path,
+    ref_path: Path,
+    tolerances: dict[str, Tolerances],
+    fields: Iterable[str] | None = None,
+    loader: LoaderType | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    digests: DigestCache | None = None,
+) -> dict[str, FieldStats]:
+    """Compare the fields of a file with the ones of a reference file.
+
+    When the file and the reference file have the same size and the same digest,
+    they are identical and only the reference file is loaded, to get the fields
+    names and sizes, the fields are not compared.
+
+    The fields are compared by chunks, the fields loaded from :file:`.npy` and
+    :file:`.bin` files are memory mapped such that the memory used does not
+    depend on the size of the files.
+
+    Args:
+        path: Path to the file.
+        ref_path: Path to the reference file.
+        tolerances: The comparison tolerances bound to the names of the fields,
+            a field without tolerances shall be equal to its reference.
+        fields: The names of the fields to compare, if None all the fields of
+            the reference file are compared.
+        loader: The loader of the files, if None the registered loader for the
+            suffix of the files is used.
+        chunk_size: The number of bytes of the chunks of a field.
+        digests: The cache of the digests of the reference files, if None the
+            reference file is hashed.
+
+    Returns:
+        The statistics of the comparisons bound to the names of the fields.
+
+    Raises:
+        ValueError: If a field is missing or if its shape differs from the
+            reference.
+    """
+    start_time = time.perf_counter()
+    identical = _are_identical(path, ref_path, digests)
+
+    ref_values = load_fields(ref_path, loader)
+    values = ref_values if identical else load_fields(path, loader)
+
+    if fields is None:
+        fields = ref_values
+
+    stats: dict[str, FieldStats] = {}
+    for name in fields:
+        for fields_values, file_path in ((values, path), (ref_values, ref_path)):
+            if name not in fields_values:
+                raise ValueError(f"field {name}: missing from {file_path}")
+        field_tolerances = tolerances.get(name, Tolerances())
+        if identical:
+            stats[name] = _get_identical_stats(name, ref_values[name], field_tolerances)
+        else:
+            stats[name] = compare_arrays(
+                name, values[name], ref_values[name], field_tolerances, chunk_size
+            )
+
+    if identical:
+        # the duration of the hashing is shared by the fields
+        duration = (time.perf_counter() - start_time) / max(len(stats), 1)
+        for field_stats in stats.values():
+            field_stats.duration = duration
+
+    return stats
+
+
+def _are_identical(path: Path, ref_path: Path, digests: DigestCache | None) -> bool:
+    """Return whether a file and a reference file have the same contents.
+
+    Args:
+        path: Path to the file.
+        ref_path: Path to the reference file.
+        digests: The cache of the digests of the reference files.
+
+    Returns:
+        Whether the files are identical.
+    """
+    try:
+        if path.stat().st_size != ref_path.stat().st_size:
+            return False
+    except OSError:
+        # the errors are reported by the loaders
+        return False
+    ref_digest = file_digest(ref_path) if digests is None else digests.get(ref_path)
+    return file_digest(path) == ref_digest
+
+
+def _get_identical_stats(
+    name: str, array: numpy.ndarray[Any, Any], tolerances: Tolerances
+) -> FieldStats:
+    """Return the statistics of a field compared with itself.
+
+    Args:
+        name: The name of the field.
+        array: The field.
+        tolerances: The comparison tolerances.
+
+    Returns:
+        The statistics.
+    """
+    worst_index = (0,) * array.ndim if array.size else None
+    return FieldStats(
+        name,
+        tolerances,
+        int(array.size),
+        0.0,
+        0.0,
+        0,
+        worst_index,
+        2 * int(array.nbytes),
+        identical=True,
+    )
+
+
+def check_fields(
+    path: Path,
+    ref_path: Path,
+    tolerances: dict[str, Tolerances],
+    fields: Iterable[str] | None = None,
+    loader: LoaderType | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    digests: DigestCache | None = None,
+) -> dict[str, FieldStats]:
+    """Check that the fields of a file are within the tolerances of a reference.
+
+    The arguments are the ones of :py:func:`compare_fields`.
+
+    Returns:
+        The statistics of the comparisons bound to the names of the fields.
+
+    Raises:
+        AssertionError: If a field is missing, has not the shape of the reference
+            or has elements out of the tolerances.
+    """
+    try:
+        stats = compare_fields(
+            path, ref_path, tolerances, fields, loader, chunk_size, digests
+        )
+    except ValueError as error:
+        raise AssertionError(str(error))
+    check_stats(path, ref_path, stats)
+    return stats
+
+
+# the statistics of the comparisons of the fields of files, or the errors that
+# prevented the comparisons, bound to the paths to the files and to their
+# reference files
+FilesResultsType = Dict[Tuple[Path, Path], Union[Dict[str, FieldStats], Exception]]
+
+
+def compare_files(
+    paths: Iterable[tuple[Path, Path]],
+    tolerances: dict[str, Tolerances],
+    fields: Iterable[str] | None = None,
+    loader: LoaderType | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    digests: DigestCache | None = None,
+    max_workers: int | None = None,
+) -> FilesResultsType:
+    """Compare the fields of files with the ones of reference files concurrently.
+
+    Args:
+        paths: The paths to the files and to their reference files.
+        tolerances: The comparison tolerances bound to the names of the fields.
+        fields: The names of the fields to compare, if None all the fields of
+            the reference files are compared.
+        loader: The loader of the files, if None the registered loader for the
+            suffix of a file is used.
+        chunk_size: The number of bytes of the chunks of a field.
+        digests: The cache of the digests of the reference files.
+        max_workers: The maximum number of files compared concurrently, if None
+            the default of :py:class:`ThreadPoolExecutor` is used.
+
+    Returns:
+        The statistics of the comparisons of the fields of the files, or the
+        errors among :py:data:`FILE_ERRORS` raised when comparing them, bound to
+        the paths to the files and to their reference files.
+    """
+    fields = None if fields is None else list(fields)
+
+    def compare(file_paths: tuple[Path, Path]) -> dict[str, FieldStats]:
+        path, ref_path = file_paths
+        return compare_fields(
+            path, ref_path, tolerances, fields, loader, chunk_size, digests
+        )
+
+    results: FilesResultsType = {}
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="compare") as executor:
+        futures = {
+            file_paths: executor.submit(compare, file_paths) for file_paths in paths
+        }
+    for file_paths, future in futures.items():
+        try:
+            results[file_paths] = future.result()
+        except FILE_ERRORS as error:
+            results[file_paths] = error
+    return results
+
+
+def check_files(
+    paths: Iterable[tuple[Path, Path]],
+    tolerances: dict[str, Tolerances],
+    fields: Iterable[str] | None = None,
+    loader: LoaderType | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    digests: DigestCache | None = None,
+    max_workers: int | None = None,
+) -> dict[Path, dict[str, FieldStats]]:
+    """Check the fields of files against the ones of reference files concurrently.
+
+    The arguments are the ones of :py:func:`compare_files`. All the files are
+    compared, then a single summary of all the files that differ from their
+    references is reported.
+
+    Returns:
+        The statistics of the comparisons of the fields of the files bound to the
+        paths to the files.
+
+    Raises:
+        AssertionError: If a file cannot be compared or has fields that differ
+            from its reference.
+    """
+    results = compare_files(
+        paths, tolerances, fields, loader, chunk_size, digests, max_workers
+    )
+    return check_files_results(results)
+
+
+def check_files_results(
+    results: FilesResultsType,
+) -> dict[Path, dict[str, FieldStats]]:
+    """Check the results of the comparisons of files.
+
+    Args:
+        results: The results from :py:func:`compare_files`.
+
+    Returns:
+        The statistics of the comparisons of the fields of the files bound to the
+        paths to the files.
+
+    Raises:
+        AssertionError: If a file cannot be compared or has fields that differ
+            from its reference.
+    """
+    files_stats: dict[Path, dict[str, FieldStats]] = {}
+    failures: list[str] = []
+    failed_files = 0
+    for (path, ref_path), stats in results.items():
+        if isinstance(stats, Exception):
+            failures += [
+                f"{path} cannot be compared to {ref_path}:",
+                f"  {type(stats).__name__}: {stats}",
+            ]
+            failed_files += 1
+            continue
+        files_stats[path] = stats
+        fields_failures = [f"  {field}" for field in stats.values() if not field.passed]
+        if fields_failures:
+            failures += [f"{path} differs from {ref_path}:"] + fields_failures
+            failed_files += 1
+
+    if failures:
+        summary = (
+            f"{failed_files} of {len(results)} files differ from their references:"
+        )
+        raise AssertionError("\n".join([summary] + failures))
+
+    return files_stats
+
+
+def check_stats(path: Path, ref_path: Path, stats: dict[str, FieldStats]) -> None:
+    """Check the statistics of the comparisons of the fields of a file.
+
+    Args:
+        path: Path to the file.
+        ref_path: Path to the reference file.
+        stats: The statistics of the comparisons bound to the names of the fields.
+
+    Raises:
+        AssertionError: If a field has elements out of the tolerances.
+    """
+    failures = [str(field) for field in stats.values() if not field.passed]
+    if failures:
+        msg = "\n".join([f"{path} differs from {ref_path}:"] + failures)
+        raise AssertionError(msg)
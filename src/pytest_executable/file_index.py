@@ -0,0 +1,239 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Provides the in-memory index of a directory tree for matching path patterns."""
+from __future__ import annotations
+
+import fnmatch
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from pathlib import PurePosixPath
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import Tuple
+
+LOG = logging.getLogger(__name__)
+
+# the kinds of the entries of a directory
+_FILE = 0
+_DIR = 1
+_DIR_LINK = 2
+
+# the modification time of a directory and the kinds of its entries bound to
+# their names
+_DirData = Tuple[int, Dict[str, int]]
+
+_WILDCARD_CHARS = re.compile(r"[*?[]")
+
+
+class FileIndex:
+    """Index of the entries of a directory tree.
+
+    The tree is walked once, the directories of a same depth are scanned
+    concurrently. The index can be built from the data of a previous index, in
+    that case only the directories that have been modified since are scanned.
+
+    The path patterns are matched with the same rules as :py:meth:`Path.glob`.
+    Like with :py:meth:`Path.glob`, the symbolic links to directories are not
+    followed by :file:`**`, the other patterns that go through such a link are
+    matched against the file system.
+
+    Args:
+        root: Path to the root directory of the tree.
+        previous: The data of a previous index, as returned by :py:attr:`data`.
+    """
+
+    def __init__(self, root: Path, previous: dict[str, Any] | None = None) -> None:
+        self.root = root
+        self.__dirs: dict[str, _DirData] = {}
+        # number of the directories that have been scanned, for information
+        self.scanned_dirs = 0
+
+        previous_dirs: dict[str, _DirData] = {}
+        if previous is not None and previous.get("root") == str(root):
+            previous_dirs = previous["dirs"]
+        self.__build(previous_dirs)
+        LOG.debug(
+            "indexed %d directories under %s, %d scanned",
+            len(self.__dirs),
+            root,
+            self.scanned_dirs,
+        )
+
+    @property
+    def data(self) -> dict[str, Any]:
+        """The data of the index that can be serialized with json."""
+        return {"root": str(self.root), "dirs": self.__dirs}
+
+    def glob(self, dir_path: Path, pattern: str) -> list[Path]:
+        """Return the paths matching a pattern.
+
+        Args:
+            dir_path: Path to the directory from which the pattern is matched.
+            pattern: The path pattern.
+
+        Returns:
+            The sorted matching paths.
+        """
+        parts = PurePosixPath(pattern).parts
+        try:
+            rel_dir = dir_path.relative_to(self.root)
+        except ValueError:
+            rel_dir = None
+        if rel_dir is None or not _is_indexable(parts):
+            # not handled by the index, let pathlib deal with it
+            return sorted(dir_path.glob(pattern))
+
+        start = "" if rel_dir == Path() else rel_dir.as_posix()
+        matches = set(self.__select(start, parts))
+        return sorted(self.root / path for path in matches)
+
+    def __select(self, rel_dir: str, parts: tuple[str, ...]) -> Iterator[str]:
+        """Yield the relative paths matching the pattern parts.
+
+        Args:
+            rel_dir: The relative path to a directory from the root.
+            parts: The parts of the pattern relative to this directory.
+        """
+        if not parts:
+            yield rel_dir
+            return
+
+        dir_data = self.__dirs.get(rel_dir)
+        if dir_data is None:
+            # not a directory
+            return
+
+        part, parts = parts[0], parts[1:]
+
+        if part == "**":
+            for sub_dir in self.__iter_dirs(rel_dir):
+                yield from self.__select(sub_dir, parts)
+            return
+
+        entries = dir_data[1]
+        if _WILDCARD_CHARS.search(part) is None:
+            names = [part] if part in entries else []
+        else:
+            match = re.compile(fnmatch.translate(part)).match
+            names = [name for name in entries if match(name)]
+
+        for name in names:
+            path = _join(rel_dir, name)
+            if parts and entries[name] == _DIR_LINK:
+                # the links to directories are not indexed
+                link_path = self.root / path
+                for match_path in link_path.glob(str(PurePosixPath(*parts))):
+                    yield match_path.relative_to(self.root).as_posix()
+            else:
+                yield from self.__select(path, parts)
+
+    def __iter_dirs(self, rel_dir: str) -> Iterator[str]:
+        """Yield a directory and all its sub-directories.
+
+        Args:
+            rel_dir: The relative path to a directory from the root.
+        """
+        yield rel_dir
+        for name, kind in self.__dirs[rel_dir][1].items():
+            if kind == _DIR:
+                yield from self.__iter_dirs(_join(rel_dir, name))
+
+    def __build(self, previous_dirs: dict[str, _DirData]) -> None:
+        """Build the index.
+
+        Args:
+            previous_dirs: The directories data of a previous index.
+        """
+
+        def update(rel_dir: str) -> tuple[_DirData, bool]:
+            return _update(self.root / rel_dir, previous_dirs.get(rel_dir))
+
+        rel_dirs = [""]
+        with ThreadPoolExecutor(thread_name_prefix="index") as executor:
+            while rel_dirs:
+                sub_dirs: list[str] = []
+                results = executor.map(update, rel_dirs)
+                for rel_dir, (dir_data, scanned) in zip(rel_dirs, results):
+                    self.__dirs[rel_dir] = dir_data
+                    self.scanned_dirs += scanned
+                    for name, kind in dir_data[1].items():
+                        if kind == _DIR:
+                            sub_dirs += [_join(rel_dir, name)]
+                rel_dirs = sub_dirs
+
+
+def _update(path: Path, previous: _DirData | None) -> tuple[_DirData, bool]:
+    """Return the data of a directory, scanning it only if it was modified.
+
+    Args:
+        path: Path to a directory.
+        previous: The data of the directory from a previous index.
+
+    Returns:
+        The data of the directory and whether it has been scanned.
+    """
+    try:
+        # the modification time is taken before the scan such that a directory
+        # modified during the scan is scanned again the next time
+        mtime = os.stat(path).st_mtime_ns
+        if previous is not None and previous[0] == mtime:
+            return (mtime, previous[1]), False
+        entries: dict[str, int] = {}
+        with os.scandir(path) as dir_entries:
+            for entry in dir_entries:
+                if entry.is_dir(follow_symlinks=False):
+                    entries[entry.name] = _DIR
+                elif entry.is_symlink() and entry.is_dir():
+                    entries[entry.name] = _DIR_LINK
+                else:
+                    entries[entry.name] = _FILE
+    except OSError:
+        # like pathlib, ignore the directories that cannot be read
+        return (-1, {}), True
+    return (mtime, entries), True
+
+
+def _is_indexable(parts: tuple[str, ...]) -> bool:
+    """Return whether a pattern can be matched against the index.
+
+    Args:
+        parts: The parts of the pattern.
+
+    Returns:
+        Whether the pattern is relative, does not go up and its recursive
+        wildcards are whole parts.
+    """
+    if not parts or parts[0] == "/" or ".." in parts:
+        return False
+    return all(part == "**" or "**" not in part for part in parts)
+
+
+def _join(rel_dir: str, name: str) -> str:
+    """Return the relative path to a directory entry.
+
+    Args:
+        rel_dir: The relative path to a directory from the root.
+        name: The name of the entry.
+
+    Returns:
+        The relative path to the entry.
+    """
+    return f"{rel_dir}/{name}" if rel_dir else name
@@ -17,14 +17,88 @@
 """Output directory tree creation functions."""
 from __future__ import annotations
 
+import fcntl
+import hashlib
 import logging
+import os
 import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from typing import AbstractSet
+from typing import BinaryIO
+from typing import Callable
 from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+from .file_index import FileIndex
 
 LOG = logging.getLogger(__name__)
 
+# size of the blocks read for computing a file digest
+DIGEST_BLOCK_SIZE = 1 << 20
+
+# the ways to create the files of an output directory
+LINK_MODES = ("symlink", "hardlink", "reflink", "copy")
+
+# request code of the linux ioctl for cloning a file
+_FICLONE = 0x40049409
+
+
+class Trash:
+    """Directory where the directories are moved to be removed in the background.
+
+    The directories are moved into the trash directory with a rename, which is
+    atomic and fast when both are on the same file system, then they are
+    removed by a background thread. The trash directory shall be emptied with
+    :py:meth:`empty` before the end of the program, the leftovers of an
+    interrupted program are removed when another trash is created at the same
+    path.
+
+    Args:
+        path: Path to the trash directory.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trash")
+        try:
+            leftovers = list(path.iterdir())
+        except FileNotFoundError:
+            leftovers = []
+        for leftover in leftovers:
+            LOG.debug("removing the trash leftover %s", leftover)
+            self.__executor.submit(shutil.rmtree, leftover, ignore_errors=True)
+
+    def move(self, dir_path: Path) -> None:
+        """Move a directory into the trash and schedule its removal.
+
+        The directory is removed immediately if it cannot be moved into the trash.
+
+        Args:
+            dir_path: Path to the directory.
+        """
+        trash_path = self.path / uuid.uuid4().hex
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            dir_path.rename(trash_path)
+        except OSError:
+            # for instance when the trash is on another file system
+            shutil.rmtree(dir_path)
+            return
+        self.__executor.submit(shutil.rmtree, trash_path, ignore_errors=True)
+
+    def empty(self) -> None:
+        """Wait for the removal of the contents of the trash and remove it."""
+        self.__executor.shutdown(wait=True)
+        try:
+            self.path.rmdir()
+        except OSError:
+            # not existing or not empty
+            pass
+
 
 @dataclass
 class FilePath:
@@ -90,12 +164,18 @@ def get_mirror_path(path_from: Path, path_to: Path) -> Path:
     return path_to.joinpath(*relative_from.parts[offset:])
 
 
-def find_references(ref_dir: Path, ref_files: Iterable[str]) -> list[FilePath]:
+def find_references(
+    ref_dir: Path, ref_files: Iterable[str], index: FileIndex | None = None
+) -> list[FilePath]:
     """Return the paths to the references files.
 
+    The paths matching a pattern are sorted.
+
     Args:
         ref_dir: Path to a case directory under the references tree.
         ref_files: Path patterns to the references files.
+        index: The index of the references tree, if None the patterns are matched
+            against the file system.
 
     Returns:
         Absolute and relative paths from a reference case directory to the
@@ -103,7 +183,10 @@ def find_references(ref_dir: Path, ref_files: Iterable[str]) -> list[FilePath]:
     """
     abs_paths: list[Path] = []
     for ref in ref_files:
-        abs_paths += ref_dir.glob(ref)
+        if index is None:
+            abs_paths += sorted(ref_dir.glob(ref))
+        else:
+            abs_paths += index.glob(ref_dir, ref)
 
     if not abs_paths:
         return []
@@ -116,18 +199,85 @@ def find_references(ref_dir: Path, ref_files: Iterable[str]) -> list[FilePath]:
     return file_paths
 
 
+def file_digest(path: Path) -> str:
+    """Return the digest of the contents of a file.
+
+    Args:
+        path: Path to a file.
+
+    Returns:
+        The hexadecimal BLAKE2 digest.
+    """
+    digest = hashlib.blake2b()
+    # read into the same buffer to avoid allocating a block per read
+    buffer = bytearray(DIGEST_BLOCK_SIZE)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as file_:
+        while True:
+            size = file_.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+@dataclass
+class SyncStats:
+    """Numbers of the entries of an output directory touched by its creation.
+
+    Attributes:
+        created: The number of created entries.
+        updated: The number of entries replaced because they differed from the
+            inputs.
+        removed: The number of removed stale symlinks.
+        unchanged: The number of entries already up to date.
+    """
+
+    created: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    def add(self, other: SyncStats) -> None:
+        """Add the numbers of another object.
+
+        Args:
+            other: The numbers to add.
+        """
+        self.created += other.created
+        self.updated += other.updated
+        self.removed += other.removed
+        self.unchanged += other.unchanged
+
+    def count(self, existed: bool) -> None:
+        """Count an entry that has been created or replaced.
+
+        Args:
+            existed: Whether the entry existed before.
+        """
+        if existed:
+            self.updated += 1
+        else:
+            self.created += 1
+
+
 def create_output_directory(
     src_dir: Path,
     dst_dir: Path,
     check_dst: bool,
     clean_dst: bool,
     ignored_files: Iterable[str],
-) -> None:
+    link_mode: str = "symlink",
+    linked_dirs: Iterable[str] = (),
+    trash: Trash | None = None,
+) -> SyncStats:
     """Create a directory copy with symbolic links.
 
     The destination directory is created if it does not exist or if clean_dst
     is true. Only the specified input files will be symlinked, the other files
-    will be ignored.
+    will be ignored. When the destination directory exists, it is synchronized
+    with the source directory: only the entries that differ are touched and the
+    stale symlinks to the source directory are removed.
 
     Args:
         src_dir: Path to the source directory.
@@ -136,6 +286,15 @@ def create_output_directory(
         clean_dst: Whether to remove an existing destination.
         ignored_files: Files to be ignored when creating the destination
         directory.
+        link_mode: How the files are created in the destination directory, one of
+            :py:data:`LINK_MODES`.
+        linked_dirs: Paths relative to the source directory of the directories to
+            be symlinked as a whole instead of being duplicated.
+        trash: The trash where an existing destination is moved to be removed in
+            the background, if None it is removed immediately.
+
+    Returns:
+        The numbers of the touched entries.
 
     Raises:
         FileExistsError: If the destination directory exists when check_dst is
@@ -145,38 +304,346 @@ def create_output_directory(
     if check_dst and dst_dir.is_dir():
         if clean_dst:
             LOG.debug("removing output directory %s", dst_dir)
-            shutil.rmtree(dst_dir)
+            if trash is None:
+                shutil.rmtree(dst_dir)
+            else:
+                trash.move(dst_dir)
         else:
             raise FileExistsError
 
     LOG.debug("creating a shallow copy from %s to %s", src_dir, dst_dir)
-    _shallow_dir_copy(src_dir, dst_dir, ignored_files)
+    stats = _shallow_dir_copy(src_dir, dst_dir, ignored_files, link_mode, linked_dirs)
+    LOG.debug(
+        "output directory %s: %d created, %d updated, %d removed, %d unchanged",
+        dst_dir,
+        stats.created,
+        stats.updated,
+        stats.removed,
+        stats.unchanged,
+    )
+    return stats
+
+
+# a file to be created: the path to the source file, the path to the destination
+# file and the entry of the existing destination file if any
+_FileSync = Tuple[Path, Path, Optional["os.DirEntry[str]"]]
 
 
 def _shallow_dir_copy(
-    src_dir: Path, dst_dir: Path, ignored_files: Iterable[str]
-) -> None:
+    src_dir: Path,
+    dst_dir: Path,
+    ignored_files: Iterable[str],
+    link_mode: str = "symlink",
+    linked_dirs: Iterable[str] = (),
+) -> SyncStats:
     """Shallow copy a directory tree.
 
-    Directories are duplicated, files are symlinked. The destination directory
-    shall not exist and will be created.
+    Directories are duplicated, files are symlinked, hard linked, reflinked or
+    copied according to the link mode. The linked directories are symlinked. The
+    files that are not symlinked are created concurrently.
 
     Args:
         src_dir: Path to the source directory.
         dst_dir: Path to the destination directory.
         ignored_files: Files to be ignored.
+        link_mode: How the files are created, one of :py:data:`LINK_MODES`.
+        linked_dirs: Paths relative to the source directory of the directories to
+            be symlinked.
+
+    Returns:
+        The numbers of the touched entries.
     """
-    dst_dir.mkdir(parents=True, exist_ok=True)
-    for src_entry in src_dir.iterdir():
-        dst_entry = dst_dir / src_entry.name
-        if src_entry.name in ignored_files:
-            pass
-        elif src_entry.is_dir():
-            # directories are not symlinked but created such that we can not modify a
-            # child file by accident
-            _shallow_dir_copy(src_entry, dst_entry, ignored_files)
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"invalid link mode: {link_mode}")
+    stats = SyncStats()
+    files: list[_FileSync] = []
+    _sync_dirs(
+        src_dir,
+        dst_dir,
+        frozenset(ignored_files),
+        {str(src_dir / path) for path in linked_dirs},
+        files,
+        stats,
+    )
+
+    def sync_file(file: _FileSync) -> bool | None:
+        return _sync_file(*file, link_mode)
+
+    if link_mode == "symlink":
+        results = [sync_file(file) for file in files]
+    else:
+        with ThreadPoolExecutor(thread_name_prefix="link") as executor:
+            results = list(executor.map(sync_file, files))
+
+    for existed in results:
+        if existed is None:
+            stats.unchanged += 1
         else:
-            # symlink files, first removing an already existing symlink
-            if dst_entry.exists():
-                dst_entry.unlink()
-            dst_entry.symlink_to(src_entry)
+            stats.count(existed)
+
+    return stats
+
+
+def _sync_dirs(
+    src_dir: Path,
+    dst_dir: Path,
+    ignored_files: AbstractSet[str],
+    linked_dirs: AbstractSet[str],
+    files: list[_FileSync],
+    stats: SyncStats,
+) -> None:
+    """Synchronize the directories of a tree and symlink the linked directories.
+
+    The trees are walked with os.scandir such that the types of the entries are
+    known without calling stat on most file systems.
+
+    Args:
+        src_dir: Path to the source directory.
+        dst_dir: Path to the destination directory.
+        ignored_files: Files to be ignored.
+        linked_dirs: Paths to the source directories to be symlinked.
+        files: The files to be created, the files of the tree are appended to it.
+        stats: The numbers of the touched entries, updated for the directories.
+    """
+    try:
+        with os.scandir(dst_dir) as entries:
+            dst_entries = {entry.name: entry for entry in entries}
+    except FileNotFoundError:
+        dst_dir.mkdir(parents=True)
+        dst_entries = {}
+
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            if entry.name in ignored_files:
+                continue
+            src_entry = src_dir / entry.name
+            dst_entry = dst_dir / entry.name
+            existing = dst_entries.pop(entry.name, None)
+            if not entry.is_dir():
+                files += [(src_entry, dst_entry, existing)]
+            elif entry.path in linked_dirs:
+                if existing is not None and _is_link_to(existing, src_entry):
+                    stats.unchanged += 1
+                    continue
+                stats.count(_remove_existing(existing))
+                dst_entry.symlink_to(src_entry, target_is_directory=True)
+            else:
+                # directories are not symlinked but created such that we can not
+                # modify a child file by accident
+                if existing is not None and not existing.is_dir(follow_symlinks=False):
+                    _remove_existing(existing)
+                _sync_dirs(
+                    src_entry, dst_entry, ignored_files, linked_dirs, files, stats
+                )
+
+    # the remaining entries are not in the source directory, only the symlinks to
+    # the source directory can be told apart from the outputs of the runner
+    for existing in dst_entries.values():
+        if existing.name in ignored_files or not existing.is_symlink():
+            continue
+        if os.path.dirname(os.readlink(existing.path)) == str(src_dir):
+            os.unlink(existing.path)
+            stats.removed += 1
+
+
+def _sync_file(
+    src_path: Path, dst_path: Path, existing: os.DirEntry[str] | None, link_mode: str
+) -> bool | None:
+    """Create a file of an output directory if it is not up to date.
+
+    Args:
+        src_path: Path to the source file.
+        dst_path: Path to the destination file.
+        existing: The entry of the existing destination file if any.
+        link_mode: How the file is created, one of :py:data:`LINK_MODES`.
+
+    Returns:
+        None if the file is up to date, otherwise whether it existed before.
+    """
+    if existing is not None and _is_up_to_date(src_path, existing, link_mode):
+        return None
+    existed = _remove_existing(existing)
+    if link_mode == "symlink":
+        dst_path.symlink_to(src_path)
+    else:
+        _LINK_FUNCTIONS[link_mode](src_path, dst_path)
+    return existed
+
+
+def _is_link_to(entry: os.DirEntry[str], path: Path) -> bool:
+    """Return whether a directory entry is a symlink to a path.
+
+    Args:
+        entry: The directory entry.
+        path: The path.
+
+    Returns:
+        Whether the entry points to the path.
+    """
+    return entry.is_symlink() and os.readlink(entry.path) == str(path)
+
+
+def _is_up_to_date(src_path: Path, existing: os.DirEntry[str], link_mode: str) -> bool:
+    """Return whether an existing file matches its source for a link mode.
+
+    The copies are up to date when they have the same size and modification time
+    as their source.
+
+    Args:
+        src_path: Path to the source file.
+        existing: The entry of the existing destination file.
+        link_mode: How the file is created, one of :py:data:`LINK_MODES`.
+
+    Returns:
+        Whether the file is up to date.
+    """
+    if link_mode == "symlink":
+        return _is_link_to(existing, src_path)
+    if existing.is_symlink():
+        return False
+    src_stat = src_path.stat()
+    dst_stat = existing.stat(follow_symlinks=False)
+    same_file = (src_stat.st_ino, src_stat.st_dev) == (dst_stat.st_ino, dst_stat.st_dev)
+    if link_mode == "hardlink":
+        return same_file
+    return not same_file and (src_stat.st_size, src_stat.st_mtime_ns) == (
+        dst_stat.st_size,
+        dst_stat.st_mtime_ns,
+    )
+
+
+def _remove_existing(entry: os.DirEntry[str] | None) -> bool:
+    """Remove an existing entry, such that it is not written through.
+
+    Args:
+        entry: The entry to remove if any.
+
+    Returns:
+        Whether there was an entry to remove.
+    """
+    if entry is None:
+        return False
+    if entry.is_dir(follow_symlinks=False):
+        shutil.rmtree(entry.path)
+    else:
+        os.unlink(entry.path)
+    return True
+
+
+def _hardlink_file(src_path: Path, dst_path: Path) -> None:
+    """Create a hard link to a file.
+
+    Args:
+        src_path: Path to the source file.
+        dst_path: Path to the destination file.
+    """
+    os.link(src_path, dst_path)
+
+
+def _reflink_file(src_path: Path, dst_path: Path) -> None:
+    """Create a copy on write clone of a file.
+
+    The file data is copied if the file system does not support cloning.
+
+    Args:
+        src_path: Path to the source file.
+        dst_path: Path to the destination file.
+    """
+    with src_path.open("rb") as src_file, dst_path.open("wb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+        except OSError:
+            _copy_data(src_file, dst_file)
+    shutil.copystat(src_path, dst_path)
+
+
+def _copy_file(src_path: Path, dst_path: Path) -> None:
+    """Copy a file.
+
+    Args:
+        src_path: Path to the source file.
+        dst_path: Path to the destination file.
+    """
+    with src_path.open("rb") as src_file, dst_path.open("wb") as dst_file:
+        _copy_data(src_file, dst_file)
+    shutil.copystat(src_path, dst_path)
+
+
+def _copy_data(src_file: BinaryIO, dst_file: BinaryIO) -> None:
+    """Copy the data of a file with in-kernel copies when possible.
+
+    The copy is done with copy_file_range, or sendfile, or by reading and writing
+    the data when the system calls are not available or not supported. When a
+    system call stops before the size of the source file, like for the files of
+    some virtual or network file systems, the remaining data are read and
+    written.
+
+    Args:
+        src_file: The source file.
+        dst_file: The destination file.
+    """
+    src_fd = src_file.fileno()
+    dst_fd = dst_file.fileno()
+    size = os.fstat(src_fd).st_size
+
+    offset = 0
+    # the files with a null size may not be empty, like the ones of procfs
+    for copy in (_copy_file_range, _sendfile) if size else ():
+        try:
+            while offset < size:
+                copied = copy(src_fd, dst_fd, offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except (AttributeError, OSError):
+            pass
+        if offset == size:
+            return
+        if offset:
+            break
+        # not available or not supported, try the next way
+
+    src_file.seek(offset)
+    dst_file.seek(offset)
+    shutil.copyfileobj(src_file, dst_file, DIGEST_BLOCK_SIZE)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    """Copy data between 2 files with copy_file_range.
+
+    Args:
+        src_fd: The source file descriptor.
+        dst_fd: The destination file descriptor.
+        offset: The offset in the source file.
+        count: The number of bytes to copy.
+
+    Returns:
+        The number of copied bytes.
+    """
+    copied: int = os.copy_file_range(  # type: ignore[attr-defined,unused-ignore]
+        src_fd, dst_fd, count, offset, offset
+    )
+    return copied
+
+
+def _sendfile(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    """Copy data between 2 files with sendfile.
+
+    Args:
+        src_fd: The source file descriptor.
+        dst_fd: The destination file descriptor.
+        offset: The offset in the source file.
+        count: The number of bytes to copy.
+
+    Returns:
+        The number of copied bytes.
+    """
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+# the functions that create the files for the link modes other than symlink
+_LINK_FUNCTIONS: dict[str, Callable[[Path, Path], None]] = {
+    "hardlink": _hardlink_file,
+    "reflink": _reflink_file,
+    "copy": _copy_file,
+}
@@ -0,0 +1,330 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Provides the history of the runner executions across the sessions.
+
+The history is a SQLite database where each session appends the status and the
+resources used by the runner of each of its test cases, with the time of the
+session and a build label. The command line tool of this module lists the
+slowest test cases, the test cases which wall time changed the most, and the
+test cases which wall time grew beyond a threshold compared to a baseline.
+
+Usage example:
+
+    python -m pytest_executable.history history.sqlite regressions --threshold 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import statistics
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+from typing import Iterable
+
+from .report import RESOURCES
+
+# the default number of previous sessions of the baseline
+BASELINE_SESSIONS = 5
+
+# the default relative growth of the wall time from the baseline that is a
+# regression
+REGRESSION_THRESHOLD = 0.2
+
+
+@dataclass
+class Change:
+    """Change of the wall time of a test case from its baseline.
+
+    Attributes:
+        path: The path to the test case.
+        wall_time: The wall time in seconds in the session.
+        baseline: The median of the wall times in the baseline sessions.
+    """
+
+    path: str
+    wall_time: float
+    baseline: float
+
+    @property
+    def ratio(self) -> float:
+        """The relative change of the wall time, infinite for a null baseline."""
+        if self.baseline == 0.0:
+            return float("inf") if self.wall_time > 0.0 else 0.0
+        return self.wall_time / self.baseline - 1.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.path}: {self.wall_time:.3f} s, baseline {self.baseline:.3f} s, "
+            f"{self.ratio:+.1%}"
+        )
+
+
+class HistoryDB:
+    """History of the runner executions stored with SQLite.
+
+    The sessions are identified by increasing numbers, the runs of a session are
+    only appended.
+
+    Args:
+        path: Path to the database file, it is created if it does not exist.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.__connection = sqlite3.connect(str(path))
+        resources_columns = ", ".join(
+            f"{name} {'INTEGER' if name == 'max_rss' else 'REAL'}" for name in RESOURCES
+        )
+        with self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, label TEXT)"
+            )
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS runs "
+                "(session INTEGER NOT NULL REFERENCES sessions(id), "
+                f"path TEXT NOT NULL, status TEXT NOT NULL, {resources_columns})"
+            )
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS runs_session ON runs (session, path)"
+            )
+
+    def __enter__(self) -> HistoryDB:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        self.__connection.close()
+
+    def add_session(
+        self, timestamp: str, label: str | None, runs: dict[str, dict[str, Any]]
+    ) -> int:
+        """Append a session and the runs of its test cases.
+
+        Args:
+            timestamp: The time of the session in ISO 8601 format.
+            label: The build label of the session.
+            runs: The status and the resources of the runs bound to the paths to
+                their test cases.
+
+        Returns:
+            The identifier of the session.
+        """
+        with self.__connection:
+            cursor = self.__connection.execute(
+                "INSERT INTO sessions (timestamp, label) VALUES (?, ?)",
+                (timestamp, label),
+            )
+            session = cursor.lastrowid
+            columns = ", ".join(("session", "path", "status") + RESOURCES)
+            placeholders = ", ".join("?" * (3 + len(RESOURCES)))
+            self.__connection.executemany(
+                f"INSERT INTO runs ({columns}) VALUES ({placeholders})",
+                (
+                    (session, path, run["status"], *map(run.get, RESOURCES))
+                    for path, run in runs.items()
+                ),
+            )
+        assert session is not None
+        return session
+
+    def sessions(self) -> list[tuple[int, str, str | None]]:
+        """Return the sessions.
+
+        Returns:
+            The identifiers, the timestamps and the labels of the sessions, from
+            the oldest.
+        """
+        cursor = self.__connection.execute(
+            "SELECT id, timestamp, label FROM sessions ORDER BY id"
+        )
+        return list(cursor)
+
+    def wall_times(self, sessions: Iterable[int]) -> dict[str, list[float]]:
+        """Return the wall times of the passed runs of sessions.
+
+        The runs that did not pass, since their wall times are not comparable,
+        and the runs without wall time, like the ones restored from the cache,
+        are ignored.
+
+        Args:
+            sessions: The identifiers of the sessions.
+
+        Returns:
+            The wall times bound to the paths to the test cases, in the order of
+            the sessions.
+        """
+        sessions = list(sessions)
+        placeholders = ", ".join("?" * len(sessions))
+        cursor = self.__connection.execute(
+            "SELECT path, wall_time FROM runs "
+            f"WHERE session IN ({placeholders}) AND status = 'passed' "
+            "AND wall_time IS NOT NULL ORDER BY session",
+            sessions,
+        )
+        wall_times: dict[str, list[float]] = {}
+        for path, wall_time in cursor:
+            wall_times.setdefault(path, []).append(wall_time)
+        return wall_times
+
+    def median_wall_times(self, sessions: int) -> dict[str, float]:
+        """Return the median wall times of the test cases in the last sessions.
+
+        Args:
+            sessions: The number of last sessions.
+
+        Returns:
+            The median wall times bound to the paths to the test cases.
+        """
+        ids = [id_ for id_, _, _ in self.sessions()][-sessions:]
+        return {
+            path: statistics.median(wall_times)
+            for path, wall_times in self.wall_times(ids).items()
+        }
+
+    def slowest(self, session: int, limit: int) -> list[tuple[str, float]]:
+        """Return the slowest test cases of a session.
+
+        Args:
+            session: The identifier of the session.
+            limit: The maximum number of test cases.
+
+        Returns:
+            The paths to the test cases and their wall times, from the slowest.
+        """
+        cursor = self.__connection.execute(
+            "SELECT path, wall_time FROM runs "
+            "WHERE session = ? AND wall_time IS NOT NULL "
+            "ORDER BY wall_time DESC LIMIT ?",
+            (session, limit),
+        )
+        return list(cursor)
+
+    def changes(self, session: int, baseline: int) -> list[Change]:
+        """Return the changes of the wall times of the test cases of a session.
+
+        The baseline of a test case is the median of its wall times in the
+        previous sessions, the test cases that did not run in these sessions
+        are ignored.
+
+        Args:
+            session: The identifier of the session.
+            baseline: The number of previous sessions of the baseline.
+
+        Returns:
+            The changes sorted by decreasing absolute relative change.
+        """
+        previous = [id_ for id_, _, _ in self.sessions() if id_ < session][-baseline:]
+        current = self.wall_times([session])
+        baseline_times = self.wall_times(previous)
+        changes = [
+            Change(path, wall_times[0], statistics.median(baseline_times[path]))
+            for path, wall_times in current.items()
+            if path in baseline_times
+        ]
+        changes.sort(key=lambda change: abs(change.ratio), reverse=True)
+        return changes
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point of the command line tool.
+
+    Args:
+        argv: The command line arguments, if None the ones of the process.
+
+    Returns:
+        The exit status, 1 if regressions are found, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m pytest_executable.history",
+        description="Show the history of the runner executions.",
+    )
+    parser.add_argument("path", type=Path, help="path to the history database")
+    parser.add_argument(
+        "command",
+        choices=("sessions", "slowest", "movers", "regressions"),
+        help="list the sessions, the slowest test cases, the test cases which wall "
+        "time changed the most, or the test cases which wall time grew beyond the "
+        "threshold",
+    )
+    parser.add_argument(
+        "--session",
+        type=int,
+        help="identifier of the session to show, by default the last one",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=20, help="maximum number of test cases to show"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=int,
+        default=BASELINE_SESSIONS,
+        help="number of previous sessions of the baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="relative growth of the wall time from the baseline that is a "
+        "regression",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.path.is_file():
+        parser.error(f"no such file: {args.path}")
+
+    with HistoryDB(args.path) as db:
+        sessions = db.sessions()
+        if args.command == "sessions":
+            for id_, timestamp, label in sessions:
+                sys.stdout.write(f"{id_}: {timestamp} {label or ''}".rstrip() + "\n")
+            return 0
+
+        if not sessions:
+            return 0
+        session = sessions[-1][0] if args.session is None else args.session
+
+        if args.command == "slowest":
+            for path, wall_time in db.slowest(session, args.limit):
+                sys.stdout.write(f"{path}: {wall_time:.3f} s\n")
+            return 0
+
+        changes = db.changes(session, args.baseline)
+        if args.command == "movers":
+            for change in changes[: args.limit]:
+                sys.stdout.write(f"{change}\n")
+            return 0
+
+        regressions = [change for change in changes if change.ratio > args.threshold]
+        for change in regressions:
+            sys.stdout.write(f"{change}\n")
+        return int(bool(regressions))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
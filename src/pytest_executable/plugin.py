@@ -17,13 +17,24 @@
 """Entry point into the pytest executable plugin."""
 from __future__ import annotations
 
+import asyncio
+import datetime
 import logging
+import math
+import os
+import statistics
 import sys
-from functools import cmp_to_key
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from functools import partial
 from pathlib import Path
 from types import ModuleType
 from typing import Any
 from typing import Callable
+from typing import Iterable
 from typing import TYPE_CHECKING
 
 import _pytest
@@ -31,12 +42,27 @@ import py
 import pytest
 from _pytest._code.code import ExceptionChainRepr
 
+from . import compare
 from . import report
+from .cache import CacheInputs
+from .cache import DigestCache
+from .cache import parse_size
+from .cache import ResultCache
+from .file_index import FileIndex
 from .file_tools import create_output_directory
+from .file_tools import FilePath
 from .file_tools import find_references
 from .file_tools import get_mirror_path
+from .file_tools import LINK_MODES
+from .file_tools import SyncStats
+from .file_tools import Trash
+from .history import BASELINE_SESSIONS
+from .history import HistoryDB
+from .scheduler import get_usable_cores
+from .scheduler import RunnerScheduler
 from .script_runner import ScriptRunner
 from .settings import Settings
+from .settings import SettingsCache
 from .settings import Tolerances
 
 if TYPE_CHECKING:
@@ -51,22 +77,99 @@ if TYPE_CHECKING:
     from _pytest.reports import TestReport
     from _pytest.runner import CallInfo
 
+try:
+    from _pytest.skipping import evaluate_skip_marks
+except ImportError:  # pragma: no cover
+    # pytest < 6
+    evaluate_skip_marks = None  # type: ignore[assignment]
+
 LOGGER = logging.getLogger(__name__)
 
 # files to be ignored when creating the output directories symlinks
 OUTPUT_IGNORED_FILES = ("__pycache__", "conftest.py", "test-settings.yaml")
 
+# name of the directory under the output root where the output directories are
+# moved to be removed in the background
+TRASH_DIRNAME = ".trash"
+
+# name of the file under the output root with the digests of the references files,
+# it is not in the references root directory which may be shared or read-only
+REFERENCE_DIGESTS_FILENAME = ".exe-reference-digests.json"
+
+# key of the index of the references root directory in the pytest cache
+REGRESSION_INDEX_CACHE_KEY = "exe/regression-index"
+
 # file with the test default settings
 SETTINGS_PATH = Path(__file__).parent / "test-settings.yaml"
 TEST_MODULE_PATH = Path(__file__).parent / "test_executable.py"
 
-# caches the test case directory path to marks to propagate them to all the
-# test modules of a test case
-_marks_cache: dict[Path, set[str]] = {}
-
 PYTEST_USE_FSPATH = pytest.__version__ < "7.0.0"
 
 
+@dataclass
+class _SessionState:
+    """Data shared by the hooks and the fixtures during a session.
+
+    Attributes:
+        settings_cache: The cache for the settings of the test cases.
+        marks: The marks of the test cases bound to the paths of their
+            directories, to propagate them to all the test modules of a test case.
+        scheduler: The scheduler of the runner scripts when they are executed
+            concurrently.
+        scheduled_runners: The runners submitted to the scheduler bound to the
+            paths of their test cases directories.
+        result_cache: The cache for the results of the runners, None if disabled.
+        output_stats: The numbers of the touched entries of the output directories
+            bound to their paths.
+        compare_stats: The statistics of the comparisons of the fields, for the
+            throughput summary.
+        trash: The trash where the output directories are moved to be removed in
+            the background.
+        regression_index: The index of the references root directory, built on
+            demand.
+        reference_digests: The cache of the digests of the references files,
+            None without references root directory.
+        report_recorder: The recorder of the results of the test cases for the
+            report, None without report generator.
+        start_time: The time at which the session started, in ISO 8601 format.
+        history_runs: The status and the resources of the runners bound to the
+            paths to their test cases, to be appended to the history.
+    """
+
+    settings_cache: SettingsCache = field(default_factory=SettingsCache)
+    marks: dict[str, set[str]] = field(default_factory=dict)
+    scheduler: RunnerScheduler | None = None
+    scheduled_runners: dict[Path, _ScheduledScriptRunner] = field(default_factory=dict)
+    result_cache: ResultCache | None = None
+    output_stats: dict[Path, SyncStats] = field(default_factory=dict)
+    compare_stats: list[compare.FieldStats] = field(default_factory=list)
+    trash: Trash | None = None
+    regression_index: FileIndex | None = None
+    reference_digests: DigestCache | None = None
+    report_recorder: report.ReportRecorder | None = None
+    start_time: str = ""
+    history_runs: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+
+def _get_state(config: _pytest.config.Config) -> _SessionState:
+    """Return the data of the current session.
+
+    The data is created on first access and is attached to the config, such that
+    several sessions running in the same process do not share it.
+
+    Args:
+        config: Config from pytest.
+
+    Returns:
+        The data of the current session.
+    """
+    state: _SessionState | None = getattr(config, "_exe_state", None)
+    if state is None:
+        state = _SessionState()
+        config._exe_state = state  # type: ignore
+    return state
+
+
 def _get_path(obj: Any) -> Path | LEGACY_PATH:
     if PYTEST_USE_FSPATH:  # pragma: no cover
         return obj.fspath
@@ -103,6 +206,53 @@ def pytest_addoption(parser: Parser) -> None:
         help="clean the tests output directories before executing the tests",
     )
 
+    group.addoption(
+        "--exe-link-mode",
+        default="symlink",
+        choices=LINK_MODES,
+        help="create the files of the tests output directories as symbolic links, "
+        "hard links, copy on write clones or copies, default: %(default)s",
+    )
+
+    group.addoption(
+        "--exe-jobs",
+        default=1,
+        type=int,
+        metavar="N",
+        help="execute the runner scripts of up to N test cases concurrently, "
+        "default: %(default)s",
+    )
+
+    group.addoption(
+        "--exe-max-cores",
+        type=int,
+        metavar="N",
+        help="use at most N cores for the concurrent execution of the runner "
+        "scripts, default: the number of usable cores",
+    )
+
+    group.addoption(
+        "--exe-cache-dir",
+        metavar="PATH",
+        help="use PATH as the directory of the cache for the results of the runner "
+        "scripts, a runner script is not executed when its results are in the cache",
+    )
+
+    group.addoption(
+        "--exe-cache-size",
+        default="10G",
+        metavar="SIZE",
+        help="remove the least recently used results from the cache when its size "
+        "exceeds SIZE, with an optional unit among K, M, G and T, "
+        "default: %(default)s",
+    )
+
+    group.addoption(
+        "--exe-no-cache",
+        action="store_true",
+        help="do not use the cache for the results of the runner scripts",
+    )
+
     group.addoption(
         "--exe-regression-root",
         metavar="PATH",
@@ -110,6 +260,13 @@ def pytest_addoption(parser: Parser) -> None:
         "regression testing",
     )
 
+    group.addoption(
+        "--exe-regression-index",
+        action="store_true",
+        help="store the index of the references root directory in the pytest cache "
+        "such that only the modified directories are scanned by the next sessions",
+    )
+
     group.addoption(
         "--exe-default-settings",
         default=SETTINGS_PATH,
@@ -131,6 +288,47 @@ def pytest_addoption(parser: Parser) -> None:
         help="use PATH as the script to generate the test report",
     )
 
+    group.addoption(
+        "--exe-report-yaml",
+        action="store_true",
+        help=f"export the report database to {report.REPORT_DB_FILENAME} in the "
+        "output root before calling the script to generate the test report",
+    )
+
+    group.addoption(
+        "--exe-report-async",
+        action="store_true",
+        help="run the script to generate the test report in a detached process and "
+        f"write its output to {report.REPORT_LOG_FILENAME} in the output root",
+    )
+
+    group.addoption(
+        "--exe-report-wait",
+        action="store_true",
+        help="wait for a report generation running in the output root before running "
+        "the tests, otherwise the session fails",
+    )
+
+    group.addoption(
+        "--exe-history",
+        metavar="PATH",
+        help="append the status and the resources used by the runner of each test "
+        "case to the history database PATH, it is created if it does not exist",
+    )
+
+    group.addoption(
+        "--exe-longest-first",
+        action="store_true",
+        help="execute the test cases with the longest runner durations recorded in "
+        "the history of --exe-history first",
+    )
+
+    group.addoption(
+        "--exe-build-label",
+        metavar="LABEL",
+        help="use LABEL to identify the build under test in the history database",
+    )
+
     # change default traceback settings to get only the message without the
     # traceback
     term_rep_options = parser.getgroup("terminal reporting").options
@@ -149,6 +347,20 @@ def pytest_sessionstart(session: Session) -> None:
         msg = "options --exe-clean-output and --exe-overwrite-output are not compatible"
         raise pytest.UsageError(msg)
 
+    if option.exe_longest_first and option.exe_history is None:
+        msg = "option --exe-longest-first requires --exe-history"
+        raise pytest.UsageError(msg)
+
+    if option.exe_jobs < 1:
+        msg = "argument --exe-jobs: shall be greater than 0"
+        raise pytest.UsageError(msg)
+
+    if option.exe_max_cores is None:
+        option.exe_max_cores = get_usable_cores()
+    elif option.exe_max_cores < 1:
+        msg = "argument --exe-max-cores: shall be greater than 0"
+        raise pytest.UsageError(msg)
+
     # check paths are valid
     for option_name in (
         "exe_runner",
@@ -175,6 +387,56 @@ def pytest_sessionstart(session: Session) -> None:
 
     # convert remaining option with pat
     option.exe_output_root = Path(option.exe_output_root).resolve()
+    if option.exe_history is not None:
+        option.exe_history = Path(option.exe_history).resolve()
+
+    _get_state(session.config).start_time = datetime.datetime.now(
+        datetime.timezone.utc
+    ).isoformat(timespec="seconds")
+
+    if option.exe_regression_root is not None:
+        # the digests are identified by the absolute paths of the files
+        _get_state(session.config).reference_digests = DigestCache(
+            Path(option.exe_regression_root.anchor),
+            option.exe_output_root / REFERENCE_DIGESTS_FILENAME,
+        )
+
+    # only the sessions that write the report database conflict with a generation
+    if option.exe_report_generator is not None and report.is_generation_running(
+        option.exe_output_root
+    ):
+        if not option.exe_report_wait:
+            msg = (
+                "a report is being generated in the output root "
+                f"{option.exe_output_root}, use --exe-report-wait to wait for it"
+            )
+            raise pytest.UsageError(msg)
+        report.wait_generation(option.exe_output_root)
+
+    # this also removes the leftovers of the interrupted sessions
+    _get_state(session.config).trash = Trash(option.exe_output_root / TRASH_DIRNAME)
+
+    if option.exe_report_generator is not None:
+        # the results are recorded as the tests are run
+        recorder = report.ReportRecorder(
+            session.config,
+            option.exe_output_root / report.REPORT_SQLITE_FILENAME,
+            option.exe_output_root / report.REPORT_DB_FILENAME,
+        )
+        session.config.pluginmanager.register(recorder)
+        _get_state(session.config).report_recorder = recorder
+
+    try:
+        option.exe_cache_size = parse_size(option.exe_cache_size)
+    except ValueError:
+        msg = f"argument --exe-cache-size: invalid size: {option.exe_cache_size}"
+        raise pytest.UsageError(msg)
+
+    if option.exe_cache_dir is not None and not option.exe_no_cache:
+        option.exe_cache_dir = Path(option.exe_cache_dir).resolve()
+        _get_state(session.config).result_cache = ResultCache(
+            option.exe_cache_dir, option.exe_cache_size
+        )
 
 
 def _get_parent_path(path: Path) -> Path:
@@ -189,20 +451,37 @@ def _get_parent_path(path: Path) -> Path:
     return Path(path).parent.resolve(True)
 
 
-@pytest.fixture(scope="module")
-def create_output_tree(request: SubRequest) -> None:
-    """Fixture to create and return the path to the output directory tree."""
-    option = request.config.option
-    parent_path = _get_parent_path(_get_path(request.node))
-    output_path = get_mirror_path(parent_path, option.exe_output_root)
+def _create_output_tree(
+    config: _pytest.config.Config,
+    parent_path: Path,
+    output_path: Path,
+    settings: Settings,
+) -> None:
+    """Create the output directory tree of a test case.
+
+    The numbers of the touched entries are stored in the session state.
 
+    Args:
+        config: The pytest config.
+        parent_path: Path to the test case directory.
+        output_path: Path to the output directory.
+        settings: The settings of the test case.
+
+    Raises:
+        FileExistsError: If the output directory already exists and cannot be
+            overwritten.
+    """
+    option = config.option
     try:
-        create_output_directory(
+        stats = create_output_directory(
             parent_path,
             output_path,
             not option.exe_overwrite_output,
             option.exe_clean_output,
             OUTPUT_IGNORED_FILES,
+            option.exe_link_mode,
+            settings.read_only_directories,
+            _get_state(config).trash,
         )
     except FileExistsError:
         msg = (
@@ -211,6 +490,25 @@ def create_output_tree(request: SubRequest) -> None:
             "it or use the --exe-overwrite-output to overwrite it"
         )
         raise FileExistsError(msg)
+    _get_state(config).output_stats[output_path] = stats
+
+
+@pytest.fixture(scope="module")
+def create_output_tree(request: SubRequest) -> None:
+    """Fixture to create and return the path to the output directory tree."""
+    option = request.config.option
+    path = _get_path(request.node)
+    parent_path = _get_parent_path(path)
+
+    scheduled_runner = _get_state(request.config).scheduled_runners.get(parent_path)
+    if scheduled_runner is not None:
+        # the output tree is created by the scheduled job
+        scheduled_runner.output_tree.result()
+        return
+
+    output_path = get_mirror_path(parent_path, option.exe_output_root)
+    settings = _get_settings(request.config, path)
+    _create_output_tree(request.config, parent_path, output_path, settings)
 
 
 @pytest.fixture(scope="module")
@@ -225,6 +523,9 @@ def output_path(request: SubRequest) -> Path:
 def _get_settings(config: _pytest.config.Config, path: Path) -> Settings:
     """Return the settings from global and local test-settings.yaml.
 
+    The settings files are loaded once per session, the returned settings can be
+    modified without side effects.
+
     Args:
         config: Config from pytest.
         path: Path to a test case directory.
@@ -232,7 +533,7 @@ def _get_settings(config: _pytest.config.Config, path: Path) -> Settings:
     Returns:
         The settings from the test case yaml.
     """
-    return Settings.from_local_file(
+    return _get_state(config).settings_cache.get(
         Path(config.option.exe_default_settings),
         _get_parent_path(path) / SETTINGS_PATH.name,
     )
@@ -244,6 +545,67 @@ def tolerances(request: SubRequest) -> dict[str, Tolerances]:
     return _get_settings(request.config, _get_path(request.node)).tolerances
 
 
+@pytest.fixture
+def compare_fields(
+    request: SubRequest, tolerances: dict[str, Tolerances]
+) -> Callable[..., dict[str, compare.FieldStats]]:
+    """Fixture to check the fields of a file against the ones of a reference file.
+
+    The fixture is :py:func:`compare.check_fields` with the tolerances and the
+    chunk size of the test case, and with the cache of the references digests.
+    The throughputs of the comparisons are added to
+    the user properties and to a section of the report of the test.
+    """
+    chunk_size = _get_settings(
+        request.config, _get_path(request.node)
+    ).comparison_chunk_size
+    digests = _get_state(request.config).reference_digests
+
+    def check_fields(
+        path: Path,
+        ref_path: Path,
+        fields: Iterable[str] | None = None,
+        loader: compare.LoaderType | None = None,
+    ) -> dict[str, compare.FieldStats]:
+        try:
+            stats = compare.compare_fields(
+                path, ref_path, tolerances, fields, loader, chunk_size, digests
+            )
+        except ValueError as error:
+            raise AssertionError(str(error))
+        _add_throughputs(request.node, path, stats)
+        compare.check_stats(path, ref_path, stats)
+        return stats
+
+    return check_fields
+
+
+def _add_throughputs(
+    item: Item, path: Path, stats: dict[str, compare.FieldStats]
+) -> None:
+    """Add the throughputs of the comparisons of fields to the report of a test.
+
+    The statistics are also kept for the summary of the session.
+
+    Args:
+        item: The test item.
+        path: Path to the compared file.
+        stats: The statistics of the comparisons bound to the names of the fields.
+    """
+    lines = []
+    for name, field_stats in stats.items():
+        item.user_properties.append(
+            (f"compare_throughput:{path}:{name}", field_stats.throughput)
+        )
+        action = "checked identical" if field_stats.identical else "compared"
+        lines += [
+            f"{path}: field {name}: {field_stats.nbytes / 1e9:.3f} GB {action} in "
+            f"{field_stats.duration:.3f} s, {field_stats.throughput:.3f} GB/s"
+        ]
+    item.add_report_section("call", "compare fields", "\n".join(lines))
+    _get_state(item.config).compare_stats.extend(stats.values())
+
+
 @pytest.fixture(scope="module")
 def runner(
     request: SubRequest,
@@ -255,10 +617,301 @@ def runner(
     if runner_path is None:
         pytest.skip("no runner provided with --exe-runner")
 
-    settings = _get_settings(request.config, _get_path(request.node)).runner
-    settings["output_path"] = str(output_path)
+    path = _get_path(request.node)
+    scheduled_runner = _get_state(request.config).scheduled_runners.get(
+        _get_parent_path(path)
+    )
+    if scheduled_runner is not None:
+        return scheduled_runner
+
+    settings = _get_settings(request.config, path)
+    runner_settings = settings.runner
+    runner_settings["output_path"] = str(output_path)
+
+    runner = ScriptRunner(runner_path, runner_settings, output_path)
+    _set_runner_cache(request.config, runner, _get_parent_path(path), settings)
+    return runner
+
+
+def _set_runner_cache(
+    config: _pytest.config.Config,
+    runner: ScriptRunner,
+    parent_path: Path,
+    settings: Settings,
+) -> None:
+    """Set the results cache of a runner if the cache is enabled.
+
+    Args:
+        config: Config from pytest.
+        runner: The runner of a test case.
+        parent_path: Path to the test case directory.
+        settings: The settings of the test case.
+    """
+    cache = _get_state(config).result_cache
+    if cache is None:
+        return
+    runner.cache = cache
+    runner.cache_inputs = CacheInputs(
+        parent_path,
+        OUTPUT_IGNORED_FILES,
+        [parent_path / Path(path).expanduser() for path in settings.dependencies],
+    )
+
+
+class _ScheduledScriptRunner(ScriptRunner):
+    """Script runner executed by the scheduler ahead of its test.
+
+    The output directory tree of the test case is created before the execution
+    of the script. The :meth:`run` and :meth:`run_async` methods wait for the end
+    of the execution.
+
+    Attributes:
+        output_tree: The future result of the output tree creation.
+        execution: The future result of the script execution.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        settings: dict[str, str],
+        workdir: Path,
+        create_output_tree: Callable[[], None],
+    ):
+        """Docstring just to prevent the arguments to appear in the autodoc.
+
+        Args:
+            path: Path to the script.
+            settings: Runner settings from the yaml file.
+            workdir: Path to the script working directory.
+            create_output_tree: Callable that creates the output directory tree.
+        """
+        super().__init__(path, settings, workdir)
+        self.__create_output_tree = create_output_tree
+        self.output_tree: Future[None] = Future()
+        self.execution: Future[int] | None = None
+
+    def execute(self) -> int:
+        """Create the output directory tree and execute the script.
 
-    return ScriptRunner(runner_path, settings, output_path)
+        Returns:
+            The return code of the executed subprocess.
+        """
+        try:
+            self.__create_output_tree()
+        except BaseException as error:
+            self.output_tree.set_exception(error)
+            raise
+        self.output_tree.set_result(None)
+        return super().run()
+
+    def run(self) -> int:
+        """Wait for the end of the script execution.
+
+        Returns:
+            The return code of the executed subprocess.
+        """
+        assert self.execution is not None
+        return self.execution.result()
+
+    async def run_async(self) -> int:
+        """Wait asynchronously for the end of the script execution.
+
+        Returns:
+            The return code of the executed subprocess.
+        """
+        assert self.execution is not None
+        return await asyncio.wrap_future(self.execution)
+
+
+def _schedule_runners(session: Session) -> None:
+    """Submit the runners of the selected test cases to a scheduler.
+
+    The test cases skipped by a skip or skipif mark, or for which the runner
+    cannot be created, are not submitted, their runners are created and executed
+    by their tests.
+
+    The output directory tree of a test case contains the ones of the test cases
+    nested in its directory, so the runner of a nested test case is started only
+    when the runners of the test cases of its parent directories are done, like
+    when the test cases are executed sequentially.
+
+    The number of cores used by a runner is given by the nproc runner setting, 1
+    if it is not defined.
+
+    Args:
+        session: Session from pytest.
+
+    Raises:
+        pytest.UsageError: If a runner uses more cores than the budget, this is
+            checked before executing any runner.
+    """
+    config = session.config
+    option = config.option
+    state = _get_state(config)
+    runners: list[tuple[Path, _ScheduledScriptRunner, int]] = []
+
+    for item in session.items:
+        if not isinstance(item.parent, TestExecutableModule):
+            continue
+        if "runner" not in getattr(item, "fixturenames", ()):
+            continue
+        if _is_skipped(item):
+            continue
+        path = _get_path(item)
+        parent_path = _get_parent_path(path)
+        if parent_path in state.scheduled_runners:
+            continue
+
+        output_path = get_mirror_path(parent_path, option.exe_output_root)
+        settings = _get_settings(config, path)
+        runner_settings = settings.runner
+        runner_settings["output_path"] = str(output_path)
+
+        create_output_tree = partial(
+            _create_output_tree, config, parent_path, output_path, settings
+        )
+
+        try:
+            runner = _ScheduledScriptRunner(
+                option.exe_runner, runner_settings, output_path, create_output_tree
+            )
+        except Exception:
+            # the error is reported by the runner fixture
+            continue
+        _set_runner_cache(config, runner, parent_path, settings)
+
+        nproc = runner_settings.get("nproc", 1)
+        try:
+            nproc = int(nproc)
+        except (TypeError, ValueError):
+            msg = (
+                f"the runner setting nproc of the test case {parent_path} shall be "
+                f"an integer: {nproc}"
+            )
+            raise pytest.UsageError(msg)
+        if nproc > option.exe_max_cores:
+            msg = (
+                f"the test case {parent_path} uses {nproc} cores but "
+                f"--exe-max-cores is {option.exe_max_cores}"
+            )
+            raise pytest.UsageError(msg)
+
+        runners += [(parent_path, runner, nproc)]
+        state.scheduled_runners[parent_path] = runner
+
+    scheduler = state.scheduler = RunnerScheduler(option.exe_jobs, option.exe_max_cores)
+    for parent_path, runner, nproc in runners:
+        ancestors = [
+            str(path) for path in parent_path.parents if path in state.scheduled_runners
+        ]
+        runner.execution = scheduler.submit(
+            str(parent_path), runner.execute, nproc, ancestors
+        )
+    scheduler.start()
+
+
+def _is_skipped(item: _pytest.nodes.Item) -> bool:
+    """Return whether a test is skipped by its skip and skipif marks.
+
+    Args:
+        item: The test.
+
+    Returns:
+        Whether the test is skipped, or may be since its marks cannot be
+        evaluated.
+    """
+    if evaluate_skip_marks is None:  # pragma: no cover
+        return any(item.iter_markers("skip")) or any(item.iter_markers("skipif"))
+    try:
+        return evaluate_skip_marks(item) is not None
+    except Exception:
+        # the error is reported when the test is executed
+        return True
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtestloop(session: Session) -> None:
+    """Start the concurrent execution of the runners before running the tests."""
+    option = session.config.option
+    if option.collectonly or option.exe_jobs == 1 or option.exe_runner is None:
+        return
+    if session.testsfailed and not option.continue_on_collection_errors:
+        # the session is interrupted by the default implementation
+        return
+    _schedule_runners(session)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item: Item, call: CallInfo[None]) -> Any:
+    """Tell in the report of a runner test whether its results were cached.
+
+    The resources used by the execution of the runner are also added to the user
+    properties of the report, with their names prefixed with ``runner_``, and
+    recorded for the history. Only the test_runner test of the test module is
+    concerned, not the other tests that request the runner fixture.
+    """
+    outcome = yield
+    if call.when != "call" or not isinstance(item.parent, TestExecutableModule):
+        return
+    if getattr(item, "originalname", item.name) != "test_runner":
+        return
+    runner = getattr(item, "funcargs", {}).get("runner")
+    if not isinstance(runner, ScriptRunner):
+        return
+    test_report = outcome.get_result()
+    if item.config.option.exe_history is not None:
+        # the runs restored from the cache have no resources
+        run = {} if runner.resources is None else asdict(runner.resources)
+        run["status"] = test_report.outcome
+        _get_state(item.config).history_runs[report.get_case_path(test_report)] = run
+    user_properties = test_report.user_properties
+    if runner.cached:
+        user_properties.append(("runner_cached", True))
+    if runner.resources is not None:
+        for name, value in asdict(runner.resources).items():
+            if value is not None:
+                user_properties.append((f"runner_{name}", value))
+                # for the next reports of the test, like the teardown one used by
+                # the junit xml report
+                item.user_properties.append((f"runner_{name}", value))
+
+
+def pytest_report_teststatus(report: TestReport) -> tuple[str, str, str] | None:
+    """Show the runner tests which results were restored from the cache."""
+    if report.when != "call" or not report.passed:
+        return None
+    if ("runner_cached", True) in report.user_properties:
+        return "passed", "c", "PASSED (cached)"
+    return None
+
+
+def pytest_sessionfinish(session: Session) -> None:
+    """Stop the scheduler, empty the trash and save the digests caches.
+
+    The pending runners are not executed. The recorded results of the test cases
+    are written to the report database and the runs are appended to the history,
+    even if the session was interrupted.
+    """
+    state = _get_state(session.config)
+    if state.scheduler is not None:
+        state.scheduler.shutdown()
+    if state.trash is not None:
+        state.trash.empty()
+    if state.reference_digests is not None:
+        state.reference_digests.save()
+    if state.result_cache is not None:
+        state.result_cache.save()
+    if state.report_recorder is not None:
+        state.report_recorder.flush()
+    history_path = session.config.option.exe_history
+    if history_path is not None and state.history_runs:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with HistoryDB(history_path) as history:
+            history.add_session(
+                state.start_time,
+                session.config.option.exe_build_label,
+                state.history_runs,
+            )
 
 
 def _get_regression_path(config: _pytest.config.Config, path: Path) -> Path | None:
@@ -290,6 +943,117 @@ def regression_path(request: SubRequest) -> Path | None:
     return regression_path
 
 
+def _get_regression_index(config: _pytest.config.Config) -> FileIndex:
+    """Return the index of the references root directory.
+
+    The index is built once per session. With --exe-regression-index, the index
+    from the previous session is stored in the pytest cache and only the
+    directories modified since are scanned.
+
+    Args:
+        config: Config from pytest.
+
+    Returns:
+        The index.
+    """
+    state = _get_state(config)
+    if state.regression_index is not None:
+        return state.regression_index
+
+    # the cache is not available when the cacheprovider plugin is disabled
+    cache = getattr(config, "cache", None)
+    if not config.option.exe_regression_index:
+        cache = None
+
+    previous = None
+    if cache is not None:
+        previous = cache.get(REGRESSION_INDEX_CACHE_KEY, None)
+
+    state.regression_index = FileIndex(config.option.exe_regression_root, previous)
+
+    if cache is not None:
+        cache.set(REGRESSION_INDEX_CACHE_KEY, state.regression_index.data)
+
+    return state.regression_index
+
+
+def _get_regression_file_paths(
+    config: _pytest.config.Config, path: Path
+) -> list[FilePath]:
+    """Return the paths to the references files of a test case.
+
+    Args:
+        config: Config from pytest.
+        path: Path to a test case directory.
+
+    Returns:
+        The paths to the references files, empty if --exe-regression-root is not
+        passed to the CLI.
+    """
+    regression_path = _get_regression_path(config, path)
+    if regression_path is None:
+        return []
+
+    settings = _get_settings(config, path)
+    if not settings.references:
+        return []
+
+    return find_references(
+        regression_path, settings.references, _get_regression_index(config)
+    )
+
+
+@pytest.fixture(scope="module")
+def regression_file_paths(request: SubRequest) -> list[FilePath]:
+    """Fixture to return the paths to all the references files of a test case."""
+    file_paths = _get_regression_file_paths(request.config, _get_path(request.node))
+    if not file_paths:
+        pytest.skip(
+            "no references files, either --exe-regression-root is not set or no "
+            "references are matched"
+        )
+    return file_paths
+
+
+@pytest.fixture
+def compare_regression_files(
+    request: SubRequest,
+    output_path: Path,
+    regression_file_paths: list[FilePath],
+    tolerances: dict[str, Tolerances],
+) -> Callable[..., dict[Path, dict[str, compare.FieldStats]]]:
+    """Fixture to check the fields of all the output files against the references.
+
+    The fixture is :py:func:`compare.check_files` for all the references files
+    of the test case and their output files, with the tolerances, the chunk size
+    and the cache of the references digests. The throughputs of the comparisons
+    are reported like with :py:func:`compare_fields`.
+    """
+    chunk_size = _get_settings(
+        request.config, _get_path(request.node)
+    ).comparison_chunk_size
+    digests = _get_state(request.config).reference_digests
+
+    def check_files(
+        fields: Iterable[str] | None = None,
+        loader: compare.LoaderType | None = None,
+        max_workers: int | None = None,
+    ) -> dict[Path, dict[str, compare.FieldStats]]:
+        paths = [
+            (output_path / file_path.relative, file_path.absolute)
+            for file_path in regression_file_paths
+        ]
+        results = compare.compare_files(
+            paths, tolerances, fields, loader, chunk_size, digests, max_workers
+        )
+        for (path, _), stats in results.items():
+            if not isinstance(stats, Exception):
+                _add_throughputs(request.node, path, stats)
+        return compare.check_files_results(results)
+
+    return check_files
+
+
 def pytest_generate_tests(metafunc: Metafunc) -> None:
     """Create the regression_file_path parametrized fixture.
 
@@ -302,19 +1066,10 @@ def pytest_generate_tests(metafunc: Metafunc) -> None:
 
     # result absolute and relative file paths to be provided by the fixture parameter
     # empty means skip the test function that use the fixture
-    file_paths = []
-
-    regression_path = _get_regression_path(
+    file_paths = _get_regression_file_paths(
         metafunc.config, _get_path(metafunc.definition)
     )
 
-    if regression_path is not None:
-        settings_path = _get_path(metafunc.definition)
-        settings = _get_settings(metafunc.config, settings_path)
-
-        if settings.references:
-            file_paths = find_references(regression_path, settings.references)
-
     metafunc.parametrize(
         "regression_file_path",
         file_paths,
@@ -405,7 +1160,7 @@ class TestExecutableModule(pytest.Module):
 
         # store the marks for applying them later
         if settings.marks:
-            _marks_cache[Path(path).parent] = settings.marks
+            _get_state(self.config).marks[str(Path(path).parent)] = settings.marks
 
         return module
 
@@ -438,7 +1193,9 @@ def pytest_exception_interact(
         report.longrepr.reprcrash = f"{report.nodeid}: {excinfo.value}"  # type:ignore
 
 
-def pytest_collection_modifyitems(items: list[_pytest.nodes.Item]) -> None:
+def pytest_collection_modifyitems(
+    config: _pytest.config.Config, items: list[_pytest.nodes.Item]
+) -> None:
     """Change the tests execution order.
 
     Such that:
@@ -446,43 +1203,201 @@ def pytest_collection_modifyitems(items: list[_pytest.nodes.Item]) -> None:
       directories
     - in a test case directory, the yaml defined tests are executed before the
       others
+    - with --exe-longest-first, the test cases directories are sorted from the
+      longest runner duration recorded in the history
+    """
+    durations = None
+    if config.option.exe_longest_first:
+        durations = _get_durations(config, items)
+    keys = _get_sort_keys(items, durations)
+    order = sorted(range(len(items)), key=keys.__getitem__)
+    items[:] = [items[index] for index in order]
+    _set_marks(items, _get_state(config).marks)
+
+
+def _get_sort_keys(
+    items: list[_pytest.nodes.Item], durations: list[float] | None = None
+) -> list[tuple[float, ...]]:
+    """Return the keys for sorting the items.
+
+    The key of an item is made of the ranks of its directory and of the parents of
+    its directory, from the root, followed by a flag and by the item index. The rank
+    of a directory is the opposite of its duration followed by the index of the
+    first item in its tree, such that the directories are sorted from the longest
+    and then keep their collection order. The duration of a directory is the
+    longest duration of the items in its tree. The flag sorts the yaml item before
+    the children directories and the other items after them.
+
+    Args:
+        items: The collected items.
+        durations: The estimated durations of the items, if None the directories
+            keep their collection order.
+
+    Returns:
+        The keys of the items.
+    """
+    yaml_flag = -math.inf
+    module_flag = math.inf
+    # the keys of the directories
+    dir_keys: dict[str, tuple[float, ...]] = {}
+    paths = [str(_get_path(item)) for item in items]
+    dir_paths = [path.rpartition(os.sep)[0] for path in paths]
+
+    # the durations of the directories
+    dir_durations: dict[str, float] = defaultdict(float)
+    if durations is not None:
+        for dir_path, duration in zip(dir_paths, durations):
+            while dir_durations[dir_path] < duration:
+                dir_durations[dir_path] = duration
+                parent_path = dir_path.rpartition(os.sep)[0]
+                if parent_path == dir_path:
+                    break
+                dir_path = parent_path
+
+    for index, dir_path in enumerate(dir_paths):
+        # the directories not seen yet up to the first seen parent
+        new_dir_paths = []
+        while dir_path not in dir_keys:
+            parent_path = dir_path.rpartition(os.sep)[0]
+            if parent_path == dir_path:
+                # root directory
+                dir_keys[dir_path] = (-dir_durations[dir_path], index)
+                break
+            new_dir_paths += [dir_path]
+            dir_path = parent_path
+        for new_dir_path in reversed(new_dir_paths):
+            parent_key = dir_keys[new_dir_path.rpartition(os.sep)[0]]
+            dir_keys[new_dir_path] = parent_key + (-dir_durations[new_dir_path], index)
+
+    keys: list[tuple[float, ...]] = []
+    for index, (path, dir_path) in enumerate(zip(paths, dir_paths)):
+        flag = yaml_flag if path.endswith(".yaml") else module_flag
+        keys += [dir_keys[dir_path] + (flag, index)]
+    return keys
+
+
+def _get_durations(
+    config: _pytest.config.Config, items: list[_pytest.nodes.Item]
+) -> list[float]:
+    """Return the estimated durations of the items from the history.
+
+    The duration of the items of a test case is the median of the wall times of
+    its runner in the last sessions of the history. The test cases missing from
+    the history are estimated with the median of the durations of the other
+    test cases, the items of the test cases without runner last no time.
+
+    Args:
+        config: Config from pytest.
+        items: The collected items.
+
+    Returns:
+        The durations of the items.
+    """
+    history_path = config.option.exe_history
+    case_durations: dict[str, float] = {}
+    if history_path.is_file():
+        with HistoryDB(history_path) as history:
+            case_durations = history.median_wall_times(BASELINE_SESSIONS)
+    default = statistics.median(case_durations.values()) if case_durations else 0.0
+    durations: list[float] = []
+    for item in items:
+        if not isinstance(item.parent, TestExecutableModule) or "runner" not in (
+            getattr(item, "fixturenames", ())
+        ):
+            durations += [0.0]
+            continue
+        # like report.get_case_path for the reports of the item
+        case_path = str(Path(*Path(item.nodeid.split("::")[0]).parts[1:]).parent)
+        durations += [case_durations.get(case_path, default)]
+    return durations
+
+
+def _set_marks(items: list[_pytest.nodes.Item], marks: dict[str, set[str]]) -> None:
+    """Set the marks to all the test functions of a test case.
+
+    Args:
+        items: The collected items.
+        marks: The marks bound to the paths of the test cases directories.
+    """
+    if not marks:
+        return
+    for item in items:
+        path = str(_get_path(item))
+        # look for the marks of all the parent directories
+        while True:
+            parent_path = path.rpartition(os.sep)[0]
+            if parent_path == path:
+                break
+            path = parent_path
+            for mark in marks.get(path, ()):
+                item.add_marker(mark)
+
+
+def _write_output_stats(
+    terminalreporter: _pytest.terminal.TerminalReporter,
+    config: _pytest.config.Config,
+) -> None:
+    """Write the numbers of the touched entries of the output directories.
+
+    Args:
+        terminalreporter: The terminal reporter.
+        config: The pytest config.
+    """
+    output_stats = _get_state(config).output_stats
+    if not output_stats:
+        return
+    total = SyncStats()
+    for stats in output_stats.values():
+        total.add(stats)
+    terminalreporter.write_line(
+        f"synchronized {len(output_stats)} output directories: "
+        f"{total.created} created, {total.updated} updated, "
+        f"{total.removed} removed, {total.unchanged} unchanged entries"
+    )
+
+
+def _write_compare_stats(
+    terminalreporter: _pytest.terminal.TerminalReporter,
+    config: _pytest.config.Config,
+) -> None:
+    """Write the throughput of the comparisons of the fields.
+
+    Args:
+        terminalreporter: The terminal reporter.
+        config: The pytest config.
+    """
+    compare_stats = _get_state(config).compare_stats
+    if not compare_stats:
+        return
+    nbytes = sum(stats.nbytes for stats in compare_stats)
+    duration = sum(stats.duration for stats in compare_stats)
+    identical = sum(stats.identical for stats in compare_stats)
+    throughput = nbytes / duration / 1e9 if duration else 0.0
+    terminalreporter.write_line(
+        f"compared {len(compare_stats)} fields, {identical} checked identical: "
+        f"{nbytes / 1e9:.3f} GB in {duration:.3f} s, {throughput:.3f} GB/s"
+    )
+
+
+def pytest_report_header(config: _pytest.config.Config) -> str | None:
+    """Tell the status of the last report generation in a detached process.
+
+    Nothing is shown when the generation succeeded or is still running.
     """
-    items.sort(key=cmp_to_key(_sort_parent_last))
-    items.sort(key=cmp_to_key(_sort_yaml_first))
-    _set_marks(items)
-
-
-def _sort_yaml_first(item_1: _pytest.nodes.Item, item_2: _pytest.nodes.Item) -> int:
-    """Sort yaml item first vs module at or below yaml parent directory."""
-    path_1 = Path(_get_path(item_1))
-    path_2 = Path(_get_path(item_2))
-    if path_1 == path_2 or path_1.suffix == path_2.suffix:
-        return 0
-    if path_2.suffix == ".yaml" and (path_2.parent in path_1.parents):
-        return 1
-    if path_1.suffix == ".yaml" and (path_1.parent in path_2.parents):
-        return -1
-    return 0
-
-
-def _sort_parent_last(item_1: _pytest.nodes.Item, item_2: _pytest.nodes.Item) -> int:
-    """Sort item in parent directory last."""
-    dir_1 = Path(_get_path(item_1)).parent
-    dir_2 = Path(_get_path(item_2)).parent
-    if dir_1 == dir_2:
-        return 0
-    if dir_2 in dir_1.parents:
-        return -1
-    return 1
-
-
-def _set_marks(items: list[_pytest.nodes.Item]) -> None:
-    """Set the marks to all the test functions of a test case."""
-    for dir_path, marks in _marks_cache.items():
-        for item in items:
-            if dir_path in Path(_get_path(item)).parents:
-                for mark in marks:
-                    item.add_marker(mark)
+    output_root = config.option.exe_output_root
+    pid, exit_status = report.get_generation_status(output_root)
+    if pid is None or exit_status == 0:
+        return None
+    if exit_status is None:
+        if report.is_generation_running(output_root):
+            return None
+        status = "was interrupted"
+    else:
+        status = f"exited with status {exit_status}"
+    return (
+        f"last detached report generation {status}, see "
+        f"{output_root / report.REPORT_LOG_FILENAME}"
+    )
 
 
 def pytest_terminal_summary(
@@ -494,9 +1409,14 @@ def pytest_terminal_summary(
     In the directory that contains the report generator, the report database is created
     and the report generator is called.
     """
+    recorder = _get_state(config).report_recorder
+    if config.option.exe_overwrite_output:
+        _write_output_stats(terminalreporter, config)
+    _write_compare_stats(terminalreporter, config)
+
     # path to the report generator
     reporter_path = config.option.exe_report_generator
-    if reporter_path is None:
+    if reporter_path is None or recorder is None:
         return
 
     if not terminalreporter.stats:
@@ -505,10 +1425,24 @@ def pytest_terminal_summary(
 
     terminalreporter.write_sep("=", "starting report generation")
 
+    output_root = config.option.exe_output_root
+    export_yaml = config.option.exe_report_yaml
     try:
-        report.generate(reporter_path, config.option.exe_output_root, terminalreporter)
+        if config.option.exe_report_async:
+            pid = report.generate_detached(
+                reporter_path, output_root, recorder, export_yaml
+            )
+        else:
+            report.generate(reporter_path, output_root, recorder, export_yaml)
     except Exception as e:
         terminalreporter.write_line(str(e), red=True)
         terminalreporter.write_sep("=", "report generation failed", red=True)
     else:
-        terminalreporter.write_sep("=", "report generation done")
+        if config.option.exe_report_async:
+            terminalreporter.write_line(
+                f"the report generator runs with PID {pid}, its output is written "
+                f"to {output_root / report.REPORT_LOG_FILENAME}"
+            )
+            terminalreporter.write_sep("=", "report generation started")
+        else:
+            terminalreporter.write_sep("=", "report generation done")
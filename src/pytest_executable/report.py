@@ -14,15 +14,26 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Provide the report database dumper and report generation."""
+"""Provide the report database and the report generation."""
 from __future__ import annotations
 
+import contextlib
+import json
+import os
+import shlex
+import sqlite3
 import subprocess
-from collections import defaultdict
+import time
 from pathlib import Path
+from types import TracebackType
 from typing import Any
 from typing import Dict
 
+import yaml
+from _pytest.config import Config
+from _pytest.reports import BaseReport
+from _pytest.reports import CollectReport
+from _pytest.reports import TestReport
 from _pytest.terminal import TerminalReporter
 
 from .yaml_helper import YamlHelper
@@ -30,10 +41,269 @@ from .yaml_helper import YamlHelper
 YAML_HELPER = YamlHelper(Path(__file__).parent / "report-db-schema.yaml")
 
 REPORT_DB_FILENAME = "tests_report_db.yaml"
+REPORT_SQLITE_FILENAME = "tests_report_db.sqlite"
+REPORT_LOG_FILENAME = "report-generation.log"
+REPORT_STATUS_FILENAME = ".exe-report-status"
 REPORT_DIRNAME = "report"
 
 ReportDBType = Dict[str, Dict[str, Any]]
 
+# the statuses of the test cases by decreasing precedence
+STATUSES = ("error", "failed", "passed", "skipped")
+
+# the minimum time in seconds between 2 writes of the recorded results
+FLUSH_INTERVAL = 10.0
+
+# the resources used by the runner of a test case, from the user properties of
+# the report of the runner test where they are prefixed with runner_
+RESOURCES = ("wall_time", "user_time", "system_time", "max_rss")
+_RESOURCES_COLUMNS = {
+    "wall_time": "REAL",
+    "user_time": "REAL",
+    "system_time": "REAL",
+    "max_rss": "INTEGER",
+}
+
+# the libyaml dumper is much faster for large databases, if available
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class ReportDB:
+    """Report database stored with SQLite.
+
+    A test case is a row indexed by its path, such that the results of the test
+    cases of a session are written without reading and rewriting the results of
+    the other test cases. The resources used by the runner of a test case are
+    stored in columns such that the test cases can be sorted by them. The
+    database can be exported to the yaml report database.
+
+    When the database file does not exist but a yaml report database exists, the
+    yaml database is imported such that the results of the previous sessions are
+    kept.
+
+    Args:
+        path: Path to the database file.
+        yaml_path: Path to a yaml report database to import.
+    """
+
+    def __init__(self, path: Path, yaml_path: Path | None = None) -> None:
+        self.path = path
+        is_new = not path.is_file()
+        self.__connection = sqlite3.connect(str(path))
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS cases "
+            "(path TEXT PRIMARY KEY, status TEXT NOT NULL, messages TEXT NOT NULL)"
+        )
+        # the databases written by the previous versions have no resources
+        columns = {
+            row[1] for row in self.__connection.execute("PRAGMA table_info(cases)")
+        }
+        with self.__connection:
+            for name, column_type in _RESOURCES_COLUMNS.items():
+                if name not in columns:
+                    self.__connection.execute(
+                        f"ALTER TABLE cases ADD COLUMN {name} {column_type}"
+                    )
+        if is_new and yaml_path is not None and yaml_path.is_file():
+            # the existing database is validated when loaded
+            self.upsert(YAML_HELPER.load(yaml_path))
+
+    def __enter__(self) -> ReportDB:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database."""
+        self.__connection.close()
+
+    def upsert(self, report_db: ReportDBType) -> None:
+        """Insert or update the entries of the database.
+
+        The entries not in report_db are left untouched. The entries in both are
+        overwritten with the ones in report_db. The entries only in report_db are
+        added. The changes are written in a single transaction.
+
+        Args:
+            report_db: The entries to be written.
+        """
+        rows = []
+        for path, entry in report_db.items():
+            messages = json.dumps(entry.get("messages", []))
+            resources = entry.get("resources", {})
+            values = [resources.get(name) for name in RESOURCES]
+            rows += [(path, entry["status"], messages, *values)]
+        columns = ", ".join(("path", "status", "messages") + RESOURCES)
+        placeholders = ", ".join("?" * (3 + len(RESOURCES)))
+        with self.__connection:
+            self.__connection.executemany(
+                f"INSERT OR REPLACE INTO cases ({columns}) VALUES ({placeholders})",
+                rows,
+            )
+
+    def load(self) -> ReportDBType:
+        """Return all the entries of the database.
+
+        Returns:
+            The entries sorted by paths.
+        """
+        columns = ", ".join(("path", "status", "messages") + RESOURCES)
+        cursor = self.__connection.execute(f"SELECT {columns} FROM cases ORDER BY path")
+        return {path: _get_entry(*row) for path, *row in cursor}
+
+    def get(self, path: str) -> dict[str, Any] | None:
+        """Return an entry of the database.
+
+        Args:
+            path: The path to the test case.
+
+        Returns:
+            The entry, or None if there is no entry for path.
+        """
+        columns = ", ".join(("status", "messages") + RESOURCES)
+        row = self.__connection.execute(
+            f"SELECT {columns} FROM cases WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _get_entry(*row)
+
+    def export(self, yaml_path: Path) -> None:
+        """Export the database to a yaml report database.
+
+        Args:
+            yaml_path: Path to the yaml file.
+        """
+        with yaml_path.open("w") as stream:
+            yaml.dump(self.load(), stream, Dumper=_YAML_DUMPER)
+
+
+def _get_entry(status: str, messages: str, *values: float | None) -> dict[str, Any]:
+    """Return an entry of the report database from a row of the SQLite database.
+
+    Args:
+        status: The status of the test case.
+        messages: The messages serialized with json.
+        values: The values of the resources, None if not recorded.
+
+    Returns:
+        The entry.
+    """
+    entry: dict[str, Any] = {"status": status, "messages": json.loads(messages)}
+    resources = {
+        name: value for name, value in zip(RESOURCES, values) if value is not None
+    }
+    if resources:
+        entry["resources"] = resources
+    return entry
+
+
+class _CaseRecord:
+    """Compact result of a test case folded from the reports of its tests.
+
+    Args:
+        status: The status of the first report.
+    """
+
+    __slots__ = ("status", "errors", "failures", "resources")
+
+    def __init__(self, status: str) -> None:
+        self.status = status
+        self.errors: list[str] = []
+        self.failures: list[str] = []
+        self.resources: dict[str, float] = {}
+
+    @classmethod
+    def from_entry(cls, entry: dict[str, Any], nb_errors: int) -> _CaseRecord:
+        """Create a record from an entry of the report database.
+
+        Args:
+            entry: The entry.
+            nb_errors: The number of error messages, they come before the failure
+                messages.
+
+        Returns:
+            The record.
+        """
+        record = cls(entry["status"])
+        record.errors = entry["messages"][:nb_errors]
+        record.failures = entry["messages"][nb_errors:]
+        record.resources = dict(entry.get("resources", {}))
+        return record
+
+    def add(self, status: str, test_report: BaseReport) -> None:
+        """Fold the report of a test.
+
+        Args:
+            status: The status of the report among STATUSES.
+            test_report: The report.
+        """
+        if STATUSES.index(status) < STATUSES.index(self.status):
+            self.status = status
+        if status == "error":
+            self.errors += [test_report.longreprtext]
+        elif status == "failed":
+            self.failures += [test_report.longreprtext]
+        for name, value in getattr(test_report, "user_properties", ()):
+            if name.startswith("runner_") and name[7:] in RESOURCES:
+                self.resources[name[7:]] = value
+
+    @property
+    def entry(self) -> dict[str, Any]:
+        """The entry of the report database."""
+        entry: dict[str, Any] = {
+            "status": self.status,
+            "messages": self.errors + self.failures,
+        }
+        if self.resources:
+            entry["resources"] = dict(self.resources)
+        return entry
+
+
+def get_case_path(test_report: BaseReport) -> str:
+    """Return the path to the test case of the report of a test.
+
+    Args:
+        test_report: The report.
+
+    Returns:
+        The path to the test case directory relative to the test inputs root
+        directory.
+    """
+    try:
+        path = test_report.path
+    except AttributeError:
+        path = test_report.fspath
+    path_from_root = Path(*Path(path).parts[1:])
+    return str(path_from_root.parent)
+
+
+def _add_report(
+    records: dict[str, _CaseRecord], status: str, test_report: BaseReport
+) -> str:
+    """Fold the report of a test into the record of its test case.
+
+    Args:
+        records: The records of the test cases bound to their paths.
+        status: The status of the report among STATUSES.
+        test_report: The report.
+
+    Returns:
+        The path to the test case.
+    """
+    dir_path = get_case_path(test_report)
+    record = records.get(dir_path)
+    if record is None:
+        record = records[dir_path] = _CaseRecord(status)
+    record.add(status, test_report)
+    return dir_path
+
 
 def create(terminalreporter: TerminalReporter) -> ReportDBType:
     """Create the report database.
@@ -50,76 +320,148 @@ def create(terminalreporter: TerminalReporter) -> ReportDBType:
     Returns:
         The report database.
     """
-    report_db: ReportDBType = defaultdict(dict)
-    seen_dirs: set[str] = set()
-
-    for status in ("error", "failed", "passed", "skipped"):
-        stats = terminalreporter.stats.get(status, [])
-        for test_report in stats:
-            try:
-                path = test_report.path
-            except AttributeError:
-                path = test_report.fspath
-            path_from_root = Path(*Path(path).parts[1:])
-            dir_path = str(path_from_root.parent)
-            db_entry = report_db[dir_path]
-            messages = db_entry.setdefault("messages", [])
-            if status in ("error", "failed"):
-                messages += [test_report.longreprtext]
-            if dir_path in seen_dirs:
-                continue
-            seen_dirs.add(dir_path)
-            db_entry["status"] = status
-
-    return dict(report_db)
-
-
-def merge(db_path: Path, new_db: ReportDBType) -> ReportDBType:
-    """Merge a report database into an existing database on disk.
-
-    The entries in db_path but not in new_db are left untouched. The entries in
-    both are overwritten with the ones in new_db. The entries only in new_db
-    are added.
-
-    Args:
-        db_path: Path to a database file.
-        new_db: Database to be merged from.
-
-    Returns:
-        The merged database.
-    """
-    merged_db = YAML_HELPER.load(db_path)
-    merged_db.update(new_db)
-    return merged_db
+    records: dict[str, _CaseRecord] = {}
+    for status in STATUSES:
+        for test_report in terminalreporter.stats.get(status, []):
+            _add_report(records, status, test_report)
+    return {path: record.entry for path, record in records.items()}
 
 
-def dump(report_db_path: Path, terminalreporter: TerminalReporter) -> None:
-    """Dump the report database.
+class ReportRecorder:
+    """Record the results of the test cases as the reports of the tests arrive.
 
-    If the database file already exists then new test results are merged with
-    the ones in the file.
+    It is a pytest plugin. The reports of the tests are folded into the records
+    of their test cases like with :py:func:`create`, the records modified since
+    the last flush are written to the report database at most every
+    flush_interval seconds and when the recorder is closed. The database is
+    opened on the first flush. The written records are dropped such that the
+    memory does not grow with the number of test cases, a record is read back
+    from the database when a later report of its test case arrives.
 
-    The database yaml file have the following format:
+    Args:
+        config: Config from pytest.
+        db_path: Path to the report database file.
+        yaml_path: Path to a yaml report database to import, see ReportDB.
+        flush_interval: The minimum time in seconds between 2 flushes.
+    """
 
-    path/to/a/test/case:
-      status: the test case status among error, failure, passed and skipped
-      messages: list of error and failure messages for all the test functions
-                of the test case
+    def __init__(
+        self,
+        config: Config,
+        db_path: Path,
+        yaml_path: Path | None = None,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.__config = config
+        self.__db_path = db_path
+        self.__yaml_path = yaml_path
+        self.__flush_interval = flush_interval
+        self.__db: ReportDB | None = None
+        # the records modified since the last flush
+        self.__records: dict[str, _CaseRecord] = {}
+        # the number of error messages of the records written to the database
+        self.__flushed: dict[str, int] = {}
+        self.__flush_time = time.monotonic()
+
+    def pytest_runtest_logreport(self, report: TestReport) -> None:
+        """Record the report of a test."""
+        status = self.__config.hook.pytest_report_teststatus(
+            report=report, config=self.__config
+        )[0]
+        self.add(status, report)
+
+    def pytest_collectreport(self, report: CollectReport) -> None:
+        """Record the report of a collection error."""
+        # like the terminal reporter
+        if report.failed:
+            self.add("error", report)
+        elif report.skipped:
+            self.add("skipped", report)
+
+    def add(self, status: str, test_report: BaseReport) -> None:
+        """Fold the report of a test and flush the records if it is time to.
+
+        Args:
+            status: The status of the report, the reports with a status not in
+                STATUSES are ignored.
+            test_report: The report.
+        """
+        if status not in STATUSES:
+            return
+        dir_path = get_case_path(test_report)
+        if dir_path in self.__flushed and self.__db is not None:
+            entry = self.__db.get(dir_path)
+            if entry is not None:
+                self.__records[dir_path] = _CaseRecord.from_entry(
+                    entry, self.__flushed.pop(dir_path)
+                )
+        _add_report(self.__records, status, test_report)
+        if time.monotonic() - self.__flush_time >= self.__flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the records modified since the last flush to the database."""
+        self.__flush_time = time.monotonic()
+        if not self.__records:
+            return
+        if self.__db is None:
+            self.__db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.__db = ReportDB(self.__db_path, self.__yaml_path)
+        self.__db.upsert(
+            {path: record.entry for path, record in self.__records.items()}
+        )
+        for path, record in self.__records.items():
+            self.__flushed[path] = len(record.errors)
+        self.__records.clear()
+
+    def close(self) -> None:
+        """Flush the records and close the database."""
+        self.flush()
+        if self.__db is not None:
+            self.__db.close()
+            self.__db = None
+
+
+def _prepare(
+    script_path: str, output_root: Path, recorder: ReportRecorder, export_yaml: bool
+) -> Path:
+    """Check the report generator script and write the report database.
 
     Args:
-        report_db_path: Path to the report db file.
-        terminalreporter: Pytest terminal reporter.
+        script_path: Path to the reporter generator script.
+        output_root: Path to the test results root directory.
+        recorder: The recorder of the results of the test cases of the session.
+        export_yaml: Whether to export the report database to REPORT_DB_FILENAME
+            in the output root, otherwise an existing export is removed since it
+            would be stale.
+
+    Returns:
+        The resolved path to the report generator script.
     """
-    report_db = create(terminalreporter)
+    # check that the report generator script is there
+    reporter_path = Path(script_path).resolve(True)
 
-    if report_db_path.is_file():
-        report_db = merge(report_db_path, report_db)
+    # write the remaining results
+    recorder.close()
+    yaml_path = output_root / REPORT_DB_FILENAME
+    sqlite_path = output_root / REPORT_SQLITE_FILENAME
+    if export_yaml:
+        with ReportDB(sqlite_path, yaml_path) as db:
+            db.export(yaml_path)
+    elif sqlite_path.is_file():
+        # the yaml database has been imported into the SQLite one or exported
+        # from it by a previous session
+        with contextlib.suppress(FileNotFoundError):
+            yaml_path.unlink()
 
-    YAML_HELPER.dump(report_db, report_db_path.open("w"))
+    return reporter_path
 
 
 def generate(
-    script_path: str, output_root: Path, terminalreporter: TerminalReporter
+    script_path: str,
+    output_root: Path,
+    recorder: ReportRecorder,
+    export_yaml: bool = False,
 ) -> None:
     """Generate the report in the output root.
 
@@ -129,13 +471,130 @@ def generate(
     Args:
         script_path: Path to the reporter generator script.
         output_root: Path to the test results root directory.
-        terminalreporter: Pytest terminal reporter.
+        recorder: The recorder of the results of the test cases of the session.
+        export_yaml: Whether to export the report database to REPORT_DB_FILENAME
+            in the output root before calling the script.
     """
-    # check that the report generator script is there
-    reporter_path = Path(script_path).resolve(True)
-
-    # write the report database
-    dump(output_root / REPORT_DB_FILENAME, terminalreporter)
+    reporter_path = _prepare(script_path, output_root, recorder, export_yaml)
 
     # generate the report
     subprocess.run(str(reporter_path), cwd=output_root, check=True, shell=True)
+
+
+def generate_detached(
+    script_path: str,
+    output_root: Path,
+    recorder: ReportRecorder,
+    export_yaml: bool = False,
+) -> int:
+    """Generate the report in the output root with a detached process.
+
+    Like :py:func:`generate` but the report generator script is executed in a
+    new session and the function returns immediately. The outputs of the script
+    are written to REPORT_LOG_FILENAME in the output root. The status file
+    REPORT_STATUS_FILENAME in the output root contains the PID of the process on
+    its first line, the exit status of the script is appended to it when the
+    script is done.
+
+    Args:
+        script_path: Path to the reporter generator script.
+        output_root: Path to the test results root directory.
+        recorder: The recorder of the results of the test cases of the session.
+        export_yaml: Whether to export the report database to REPORT_DB_FILENAME
+            in the output root before calling the script.
+
+    Returns:
+        The PID of the process.
+    """
+    reporter_path = _prepare(script_path, output_root, recorder, export_yaml)
+
+    status_path = output_root / REPORT_STATUS_FILENAME
+    quoted_status_path = shlex.quote(str(status_path))
+    # the shell writes its own PID such that the exit status is always after it
+    cmd = (
+        f"echo $$ > {quoted_status_path}; "
+        f"{shlex.quote(str(reporter_path))}; "
+        f"echo $? >> {quoted_status_path}"
+    )
+
+    with contextlib.suppress(FileNotFoundError):
+        status_path.unlink()
+
+    with (output_root / REPORT_LOG_FILENAME).open("w") as log:
+        process = subprocess.Popen(
+            cmd,
+            cwd=output_root,
+            shell=True,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+    # the generation is seen as running as soon as this function returns, unless
+    # the shell has already written the status file
+    with contextlib.suppress(FileExistsError), status_path.open("x") as status:
+        status.write(f"{process.pid}\n")
+
+    return process.pid
+
+
+def get_generation_status(output_root: Path) -> tuple[int | None, int | None]:
+    """Return the status of the last report generation in a detached process.
+
+    Args:
+        output_root: Path to the test results root directory.
+
+    Returns:
+        The PID of the process and the exit status of the script, the exit
+        status is None while the script is running or if the process was
+        killed, both are None if no status is available.
+    """
+    try:
+        lines = (output_root / REPORT_STATUS_FILENAME).read_text().split()
+    except OSError:
+        return None, None
+    # the status file may be read while it is written
+    try:
+        pid = int(lines[0])
+    except (IndexError, ValueError):
+        return None, None
+    try:
+        exit_status = int(lines[1])
+    except (IndexError, ValueError):
+        exit_status = None
+    return pid, exit_status
+
+
+def is_generation_running(output_root: Path) -> bool:
+    """Return whether a report generation is running in a detached process.
+
+    Args:
+        output_root: Path to the test results root directory.
+
+    Returns:
+        Whether the report is being generated.
+    """
+    pid, exit_status = get_generation_status(output_root)
+    if pid is None or exit_status is not None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        # the process was killed
+        return False
+    except PermissionError:
+        # the PID has been reused by a process of another user
+        return False
+    return True
+
+
+def wait_generation(output_root: Path, poll_interval: float = 0.5) -> None:
+    """Wait for a report generation running in a detached process.
+
+    Args:
+        output_root: Path to the test results root directory.
+        poll_interval: The time in seconds between 2 checks of the status.
+    """
+    while is_generation_running(output_root):
+        time.sleep(poll_interval)
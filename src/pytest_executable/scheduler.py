@@ -0,0 +1,210 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Provides the scheduler for executing the runner scripts concurrently."""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+from typing import Iterable
+
+LOG = logging.getLogger(__name__)
+
+
+class RunnerScheduler:
+    """Scheduler for executing jobs concurrently within a budget of cores.
+
+    Each job declares the number of cores it uses. The jobs are started when
+    :meth:`start` is called, then whenever a job ends. At each start, among the
+    pending jobs, the one that uses the most cores and fits in the free cores is
+    started first, the submission order breaks the ties. The total number of
+    cores used by the running jobs never exceeds the budget. A job that depends
+    on other jobs is started only when they are done.
+
+    Args:
+        max_jobs: The maximum number of jobs executed concurrently.
+        max_cores: The maximum number of cores used by the running jobs.
+    """
+
+    def __init__(self, max_jobs: int, max_cores: int):
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max_jobs, thread_name_prefix="runner"
+        )
+        self.__max_jobs = max_jobs
+        self.__max_cores = max_cores
+        self.__futures: dict[str, Future[int]] = {}
+        # the jobs waiting to be started, in submission order
+        self.__pending: list[_Job] = []
+        self.__nb_running = 0
+        self.__used_cores = 0
+        self.__started = False
+        self.__lock = threading.Lock()
+
+    def submit(
+        self,
+        key: str,
+        job: Callable[[], int],
+        nproc: int = 1,
+        after: Iterable[str] = (),
+    ) -> Future[int]:
+        """Submit a job.
+
+        Args:
+            key: The identifier of the job.
+            job: The callable that executes the job and returns its exit status.
+            nproc: The number of cores used by the job.
+            after: The identifiers of the jobs that shall be done, whatever their
+                results, before the job is started. The jobs not submitted when
+                the job is started are ignored.
+
+        Returns:
+            The future result of the job.
+
+        Raises:
+            ValueError: If a job with the same key has already been submitted, or
+                if the job uses more cores than the budget.
+        """
+        if key in self.__futures:
+            raise ValueError(f"a job has already been submitted for {key}")
+        if nproc > self.__max_cores:
+            raise ValueError(
+                f"the job {key} uses {nproc} cores but at most {self.__max_cores} "
+                "are available"
+            )
+        LOG.debug("submitting the job %s using %d cores", key, nproc)
+        future: Future[int] = Future()
+        self.__futures[key] = future
+        with self.__lock:
+            self.__pending += [_Job(job, nproc, future, list(after))]
+            self.__dispatch()
+        return future
+
+    def start(self) -> None:
+        """Start the execution of the jobs."""
+        with self.__lock:
+            self.__started = True
+            self.__dispatch()
+
+    def get(self, key: str) -> Future[int] | None:
+        """Return the future result of a job.
+
+        Args:
+            key: The identifier of the job.
+
+        Returns:
+            The future result of the job, None if no job has been submitted for key.
+        """
+        return self.__futures.get(key)
+
+    def shutdown(self) -> None:
+        """Cancel the pending jobs and wait for the running ones."""
+        with self.__lock:
+            for job in self.__pending:
+                job.future.cancel()
+            self.__pending.clear()
+        self.__executor.shutdown(wait=True)
+
+    def __dispatch(self) -> None:
+        """Start the pending jobs that fit in the free cores.
+
+        Shall be called with the lock acquired.
+        """
+        if not self.__started:
+            return
+        while self.__pending and self.__nb_running < self.__max_jobs:
+            free_cores = self.__max_cores - self.__used_cores
+            fitting_jobs = [
+                job
+                for job in self.__pending
+                if job.nproc <= free_cores and self.__is_ready(job)
+            ]
+            if not fitting_jobs:
+                return
+            # max returns the first of the largest jobs
+            job = max(fitting_jobs, key=lambda job: job.nproc)
+            self.__pending.remove(job)
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            self.__nb_running += 1
+            self.__used_cores += job.nproc
+            self.__executor.submit(self.__run, job)
+
+    def __is_ready(self, job: _Job) -> bool:
+        """Return whether the jobs a job depends on are done.
+
+        Args:
+            job: The job.
+
+        Returns:
+            Whether the job can be started.
+        """
+        for key in job.after:
+            future = self.__futures.get(key)
+            if future is not None and not future.done():
+                return False
+        return True
+
+    def __run(self, job: _Job) -> None:
+        """Execute a job and start the next ones.
+
+        Args:
+            job: The job to be executed.
+        """
+        try:
+            job.future.set_result(job.func())
+        except BaseException as error:
+            job.future.set_exception(error)
+        finally:
+            with self.__lock:
+                self.__nb_running -= 1
+                self.__used_cores -= job.nproc
+                self.__dispatch()
+
+
+@dataclass
+class _Job:
+    """A job of the scheduler.
+
+    Attributes:
+        func: The callable that executes the job.
+        nproc: The number of cores used by the job.
+        future: The future result of the job.
+        after: The identifiers of the jobs that shall be done before the job.
+    """
+
+    func: Callable[[], int]
+    nproc: int
+    future: Future[int]
+    after: list[str] = field(default_factory=list)
+
+
+def get_usable_cores() -> int:
+    """Return the number of cores usable by the current process.
+
+    Returns:
+        The number of usable cores.
+    """
+    try:
+        return len(os.sched_getaffinity(0))  # type: ignore[attr-defined,unused-ignore]
+    except AttributeError:  # pragma: no cover
+        # not available on macOS
+        return os.cpu_count() or 1
@@ -17,15 +17,27 @@
 """Provides the shell script creation and execution routines."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import stat
 import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import cast
+from typing import TextIO
 
 import delta
 import jinja2
 
+from .cache import CacheInputs
+from .cache import get_modified_files
+from .cache import get_snapshot
+from .cache import ResultCache
+
 LOG = logging.getLogger(__name__)
 
 
@@ -33,6 +45,58 @@ class ScriptExecutionError(Exception):
     """Error for script execution."""
 
 
+@dataclass
+class ResourceUsage:
+    """Resources used by the execution of a script.
+
+    The CPU times and the peak memory cover the script and all the processes
+    it has started and waited for, like the processes of mpirun on the local
+    host.
+
+    Attributes:
+        wall_time: The elapsed time in seconds.
+        user_time: The user CPU time in seconds, None if not measured.
+        system_time: The system CPU time in seconds, None if not measured.
+        max_rss: The peak resident set size in bytes of the largest process,
+            None if not measured.
+    """
+
+    wall_time: float
+    user_time: float | None = None
+    system_time: float | None = None
+    max_rss: int | None = None
+
+
+# the unit of ru_maxrss in bytes
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    """Kill a subprocess and wait for it.
+
+    Args:
+        process: The subprocess.
+    """
+    if process.returncode is None:
+        process.kill()
+    await process.wait()
+
+
+def _get_exit_code(status: int) -> int:
+    """Return the return code of a process from its exit status.
+
+    Args:
+        status: The exit status from :func:`os.wait4`.
+
+    Returns:
+        The return code, negative if the process was killed by a signal, like
+        :attr:`subprocess.Popen.returncode`.
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
 class ScriptRunner:
     """Class for creating and running a runner script.
 
@@ -43,6 +107,13 @@ class ScriptRunner:
         path: Path to the script.
         settings: Runner settings from the yaml file.
         workdir: Path to the script working directory.
+        cache: The cache for the results of the execution, None to disable it.
+        cache_inputs: The inputs that identify the results of the execution in
+            the cache.
+        cached: Whether the results of the last execution were restored from the
+            cache.
+        resources: The resources used by the last execution, None if it was
+            restored from the cache or if the script has not been executed.
         STDOUT_EXT: Suffix for the file with the script standard output (class
                     attribute).
         STDERR_EXT: Suffix for the file with the script standard error (class
@@ -65,6 +136,10 @@ class ScriptRunner:
         self.path = path
         self.workdir = workdir
         self.settings = settings
+        self.cache: ResultCache | None = None
+        self.cache_inputs: CacheInputs | None = None
+        self.cached = False
+        self.resources: ResourceUsage | None = None
         self._content = self._substitute()
 
     def _substitute(self) -> str:
@@ -94,12 +169,198 @@ class ScriptRunner:
         The script is created and executed in the working directory. The stdout
         and stderr of the script are each redirected to files named after the
         script and suffixed with :py:data:`STDOUT_EXT` and :py:data:`STDERR_EXT`.
+        The resources used by the execution are set to :py:attr:`resources`.
+
+        If a cache is set and contains the results of a previous execution with
+        the same inputs, the results are restored instead of executing the script.
+
+        Returns:
+            The return code of the executed subprocess.
+
+        Raises:
+            ScriptExecutionError: If the execution fails.
+            subprocess.TimeoutExpired: If the execution is not finished before
+                the timeout.
+        """
+        cache_key = self._restore_from_cache()
+        if self.cached:
+            return 0
+        snapshot = get_snapshot(self.workdir) if cache_key else {}
+
+        cmd = self._write_script()
+        timeout = self._get_timeout()
+
+        # redirect the stdout and stderr to files
+        stdout, stderr = self._open_output_files()
+
+        try:
+            returncode = self._execute(cmd, stdout, stderr, timeout)
+        finally:
+            stdout.close()
+            stderr.close()
+
+        if returncode != 0:
+            # inform about the log files
+            raise ScriptExecutionError(self._get_error_message())
+
+        self._store_in_cache(cache_key, snapshot)
+
+        return returncode
+
+    async def run_async(self) -> int:
+        """Execute the script asynchronously.
+
+        This is the coroutine counterpart of :meth:`run`, the script execution
+        does not block the event loop such that several runners can be awaited
+        concurrently, for instance with :func:`asyncio.gather`.
+
+        The results are restored from the cache like with :meth:`run`, the cache
+        operations are executed in the default executor of the event loop. Only
+        the wall time of the resources used by the execution is measured. If the
+        coroutine is cancelled, the subprocess is killed.
 
         Returns:
             The return code of the executed subprocess.
 
         Raises:
             ScriptExecutionError: If the execution fails.
+            subprocess.TimeoutExpired: If the execution is not finished before
+                the timeout.
+        """
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(None, self._restore_from_cache)
+        if self.cached:
+            return 0
+        snapshot: dict[Path, tuple[int, int]] = {}
+        if cache_key:
+            snapshot = await loop.run_in_executor(None, get_snapshot, self.workdir)
+
+        cmd = self._write_script()
+        timeout = self._get_timeout()
+
+        # redirect the stdout and stderr to files
+        stdout, stderr = self._open_output_files()
+
+        start = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, cwd=self.workdir, stdout=stdout, stderr=stderr
+            )
+            try:
+                returncode = await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                await _kill(process)
+                raise subprocess.TimeoutExpired(cmd, timeout) from None  # type: ignore
+            except BaseException:
+                # for instance a cancellation, the process shall not be left behind
+                await _kill(process)
+                raise
+            finally:
+                self.resources = ResourceUsage(time.monotonic() - start)
+        finally:
+            stdout.close()
+            stderr.close()
+
+        if returncode != 0:
+            # inform about the log files
+            raise ScriptExecutionError(self._get_error_message())
+
+        await loop.run_in_executor(None, self._store_in_cache, cache_key, snapshot)
+
+        return returncode
+
+    def _execute(
+        self, cmd: list[str], stdout: TextIO, stderr: TextIO, timeout: float | None
+    ) -> int:
+        """Execute a command and measure the resources it uses.
+
+        The process is waited for with :func:`os.wait4` to get the resources used
+        by the process and its waited for children, it is killed after the
+        timeout.
+
+        Args:
+            cmd: The command line.
+            stdout: The file for the standard output.
+            stderr: The file for the standard error.
+            timeout: The timeout in seconds, None if there is no timeout.
+
+        Returns:
+            The return code of the process.
+
+        Raises:
+            subprocess.TimeoutExpired: If the execution is not finished before
+                the timeout.
+        """
+        start = time.monotonic()
+        process = subprocess.Popen(cmd, cwd=self.workdir, stdout=stdout, stderr=stderr)
+        timed_out = threading.Event()
+
+        def kill() -> None:
+            timed_out.set()
+            process.kill()
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except BaseException:
+            # for instance an interruption, the process shall not be left behind
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        wall_time = time.monotonic() - start
+        # the process has been reaped, tell it to Popen
+        process.returncode = _get_exit_code(status)
+
+        self.resources = ResourceUsage(
+            wall_time,
+            usage.ru_utime,
+            usage.ru_stime,
+            usage.ru_maxrss * _MAXRSS_UNIT,
+        )
+
+        if timed_out.is_set() and process.returncode < 0:
+            raise subprocess.TimeoutExpired(cmd, cast(float, timeout))
+
+        return process.returncode
+
+    def _restore_from_cache(self) -> str:
+        """Restore the results of a previous execution from the cache.
+
+        The attribute :py:attr:`cached` tells whether the results were restored.
+
+        Returns:
+            The key of the results in the cache, empty if there is no cache.
+        """
+        self.cached = False
+        self.resources = None
+        if self.cache is None or self.cache_inputs is None:
+            return ""
+        key = self.cache_inputs.get_key(self._content, self.cache.digests)
+        self.cached = self.cache.restore(key, self.workdir)
+        return key
+
+    def _store_in_cache(self, key: str, snapshot: dict[Path, tuple[int, int]]) -> None:
+        """Store the results of an execution in the cache.
+
+        Args:
+            key: The key of the results in the cache, empty if there is no cache.
+            snapshot: The snapshot of the working directory before the execution.
+        """
+        if self.cache is None or not key:
+            return
+        self.cache.store(key, self.workdir, get_modified_files(self.workdir, snapshot))
+
+    def _write_script(self) -> list[str]:
+        """Write the script in the working directory.
+
+        Returns:
+            The command line to execute the script.
         """
         filename = self.path.name
         script_path = self.workdir / filename
@@ -113,36 +374,38 @@ class ScriptRunner:
         permission = stat.S_IMODE(script_path.stat().st_mode)
         script_path.chmod(permission | stat.S_IXUSR | stat.S_IXGRP)
 
-        # redirect the stdout and stderr to files
-        stdout = open(self.workdir / f"{filename}.{self.STDOUT_EXT}", "w")
-        stderr = open(self.workdir / f"{filename}.{self.STDERR_EXT}", "w")
-
         LOG.debug("executing the shell script %s", script_path)
-        cmd = self.SHELL.split() + [filename]
+        return self.SHELL.split() + [filename]
+
+    def _get_timeout(self) -> float | None:
+        """Return the timeout of the execution.
 
+        Returns:
+            The timeout in seconds, None if there is no timeout.
+        """
         timeout = self.settings.get("timeout")
 
-        if timeout is not None:
-            # convert to seconds
-            timeout = delta.parse(timeout).seconds
+        if timeout is None:
+            return None
 
-        try:
-            process = subprocess.run(
-                cmd,
-                cwd=self.workdir,
-                stdout=stdout,
-                stderr=stderr,
-                check=True,
-                timeout=timeout,  # type: ignore
-            )
-        except subprocess.CalledProcessError:
-            # inform about the log files
-            raise ScriptExecutionError(
-                "execution failure, see the stdout and stderr files in "
-                f"{self.workdir}"
-            )
-        finally:
-            stdout.close()
-            stderr.close()
+        # convert to seconds
+        return cast(float, delta.parse(timeout).seconds)
 
-        return process.returncode
+    def _open_output_files(self) -> tuple[TextIO, TextIO]:
+        """Open the files for the stdout and stderr of the script.
+
+        Returns:
+            The stdout and stderr files.
+        """
+        filename = self.path.name
+        stdout = open(self.workdir / f"{filename}.{self.STDOUT_EXT}", "w")
+        stderr = open(self.workdir / f"{filename}.{self.STDERR_EXT}", "w")
+        return stdout, stderr
+
+    def _get_error_message(self) -> str:
+        """Return the message for an execution failure.
+
+        Returns:
+            The message.
+        """
+        return f"execution failure, see the stdout and stderr files in {self.workdir}"
@@ -21,16 +21,25 @@ completion.
 """
 from __future__ import annotations
 
+from copy import deepcopy
 from dataclasses import dataclass
+from dataclasses import field
 from dataclasses import fields
 from pathlib import Path
+from typing import Tuple
 
+from .cache import parse_size
+from .yaml_helper import DataType
 from .yaml_helper import YamlHelper
 
 # the yaml file with the default settings is in the same directory as the
 # current module, the yaml schema too
 SETTINGS_SCHEMA_FILE = Path(__file__).parent / "test-settings-schema.yaml"
 
+# identifies the contents of a file on disk: resolved path, modification time and
+# size
+_FileKey = Tuple[str, int, int]
+
 
 @dataclass
 class Tolerances:
@@ -56,17 +65,30 @@ class Settings:
         marks: The pytest marks.
         references: The reference files path patterns.
         tolerances: The comparison tolerances.
+        dependencies: The paths to the files on which the results of the runner
+            depend, in addition to the input files.
+        read_only_directories: The paths to the input directories that are only
+            read by the runner, relative to the test case directory.
+        comparison_chunk_size: The number of bytes of the chunks of the compared
+            fields, it may be set with a string with a unit among K, M, G or T.
     """
 
     runner: dict[str, str]
     marks: set[str]
     references: set[str]
     tolerances: dict[str, Tolerances]
+    dependencies: set[str] = field(default_factory=set)
+    read_only_directories: set[str] = field(default_factory=set)
+    comparison_chunk_size: int = 1 << 26
 
     def __post_init__(self) -> None:
         """Coerce the attributes types."""
         self.marks = set(self.marks)
         self.references = set(self.references)
+        self.dependencies = set(self.dependencies)
+        self.read_only_directories = set(self.read_only_directories)
+        if isinstance(self.comparison_chunk_size, str):
+            self.comparison_chunk_size = parse_size(self.comparison_chunk_size)
         for key, value in self.tolerances.copy().items():
             self.tolerances[key] = Tolerances(**value)  # type:ignore
 
@@ -87,10 +109,92 @@ class Settings:
         """
         loader = YamlHelper(SETTINGS_SCHEMA_FILE)
         # contains the settings and eventually additional items
-        loaded_settings = loader.load_merge(path_global, path_local)
-        # keep the used settings
+        return cls._from_data(loader.load_merge(path_global, path_local))
+
+    @classmethod
+    def _from_data(cls, data: DataType) -> Settings:
+        """Create a :class:`Settings` object from the data of a yaml file.
+
+        Args:
+            data: The settings and eventually additional items.
+
+        Returns:
+            Settings object.
+        """
+        # keep the used settings, the missing optional ones get their default
+        # values
         settings = {}
-        for field in fields(cls):
-            name = field.name
-            settings[name] = loaded_settings[name]
+        for field_ in fields(cls):
+            name = field_.name
+            if name in data:
+                settings[name] = data[name]
         return cls(**settings)
+
+
+class SettingsCache:
+    """Cache for the settings loaded from yaml files.
+
+    A yaml file is loaded and validated only once as long as it is not modified,
+    a file is identified by its resolved path, its modification time and its size.
+    The merging of a local file with a global one is also done only once.
+
+    The returned settings are copies of the cached ones, such that they can be
+    modified without altering the cache.
+    """
+
+    def __init__(self) -> None:
+        self.__loader = YamlHelper(SETTINGS_SCHEMA_FILE)
+        self.__data: dict[_FileKey, DataType] = {}
+        self.__settings: dict[tuple[_FileKey, _FileKey], Settings] = {}
+
+    def get(self, path_global: Path, path_local: Path) -> Settings:
+        """Return the :class:`Settings` object from 2 yaml files.
+
+        See :meth:`Settings.from_local_file` for the merging of the files.
+
+        Args:
+            path_global: Path to a yaml file with global settings.
+            path_local: Path to a yaml file with local settings.
+
+        Returns:
+            Settings object.
+        """
+        key_global = self.__get_key(path_global)
+        key_local = self.__get_key(path_local)
+        settings = self.__settings.get((key_global, key_local))
+        if settings is None:
+            # the merging modifies the global data in place
+            data = self.__loader.merge(
+                deepcopy(self.__load(key_global)), self.__load(key_local)
+            )
+            settings = Settings._from_data(data)
+            self.__settings[(key_global, key_local)] = settings
+        return deepcopy(settings)
+
+    def __load(self, key: _FileKey) -> DataType:
+        """Return the validated data of a yaml file.
+
+        Args:
+            key: Key of a yaml file.
+
+        Returns:
+            The validated data.
+        """
+        data = self.__data.get(key)
+        if data is None:
+            data = self.__data[key] = self.__loader.load(Path(key[0]))
+        return data
+
+    @staticmethod
+    def __get_key(path: Path) -> _FileKey:
+        """Return the key that identifies the contents of a file.
+
+        Args:
+            path: Path to a file.
+
+        Returns:
+            The key of the file.
+        """
+        path = path.resolve()
+        stat = path.stat()
+        return str(path), stat.st_mtime_ns, stat.st_size
@@ -28,25 +28,65 @@ import yaml
 # basic type for the content of a yaml with a mapping at the root level
 DataType = Dict[str, Any]
 
+# maps the resolved paths to the schema files to their validators, such that a
+# schema is checked and its validator is built only once
+_VALIDATORS: dict[Path, Any] = {}
+
+
+def _get_validator(schema_path: Path) -> Any:
+    """Return the validator for a schema file.
+
+    Args:
+        schema_path: Path to a schema file.
+
+    Returns:
+        The validator.
+    """
+    schema_path = schema_path.resolve()
+    validator = _VALIDATORS.get(schema_path)
+    if validator is None:
+        with schema_path.open() as file_:
+            schema = yaml.safe_load(file_)
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        validator = _VALIDATORS[schema_path] = validator_class(schema)
+    return validator
+
 
 class YamlHelper:
     """Yaml file helper class.
 
     Can load and validate a yaml file, can also merge tha data 2 yaml files.
 
+    The validator of a schema is shared by all the helpers using the same schema
+    file.
+
     Args:
         schema_path: Path to a schema file used for validating a yaml.
     """
 
     def __init__(self, schema_path: Path):
-        with schema_path.open() as file_:
-            self.__schema = yaml.safe_load(file_)
+        self.__validator = _get_validator(schema_path)
+
+    def validate(self, data: DataType) -> None:
+        """Validate data against the schema.
+
+        Args:
+            data: Data to be validated.
 
-    def load(self, path: Path) -> DataType:
+        Raises:
+            jsonschema.ValidationError: If the data is not valid.
+        """
+        error = jsonschema.exceptions.best_match(self.__validator.iter_errors(data))
+        if error is not None:
+            raise error
+
+    def load(self, path: Path, validate: bool = True) -> DataType:
         """Return the validated data from a yaml file.
 
         Args:
             path: Path to a yaml file.
+            validate: Whether to validate the data.
 
         Returns:
             The validated data.
@@ -58,18 +98,22 @@ class YamlHelper:
         if data is None:
             data = {}
 
-        jsonschema.validate(data, self.__schema)
+        if validate:
+            self.validate(data)
 
         return data
 
-    def dump(self, data: DataType, stream: TextIO) -> None:
+    def dump(self, data: DataType, stream: TextIO, validate: bool = True) -> None:
         """Validate and dump data to a yaml file.
 
         Args:
             data: Data to be dumped.
             stream: IO stream to be written to.
+            validate: Whether to validate the data, this can be disabled for data
+                that has already been validated.
         """
-        jsonschema.validate(data, self.__schema)
+        if validate:
+            self.validate(data)
         yaml.safe_dump(data, stream)
 
     def load_merge(self, ref: Path, new: Path) -> DataType:
@@ -82,7 +126,22 @@ class YamlHelper:
         Return:
             The merged dictionary.
         """
-        return self.__recursive_update(self.load(ref), self.load(new))
+        return self.merge(self.load(ref), self.load(new))
+
+    @classmethod
+    def merge(cls, ref: DataType, new: DataType) -> DataType:
+        """Merge the data of 2 yaml files.
+
+        The dictionaries are merged recursively and the lists are concatenated.
+
+        Args:
+            ref: The data to be updated with new, it is modified in place.
+            new: The data to be merged into ref.
+
+        Return:
+            The merged dictionary.
+        """
+        return cls.__recursive_update(ref, new)
 
     @classmethod
     def __recursive_update(cls, ref: DataType, new: DataType) -> DataType:
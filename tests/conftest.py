@@ -19,3 +19,10 @@ from __future__ import annotations
 
 
 pytest_plugins = "pytester"
+
+try:
+    # numpy cannot be imported again once the in process pytester runs have
+    # unloaded it, so it is imported once for all the tests
+    import numpy  # noqa: F401
+except ImportError:
+    pass
@@ -0,0 +1,33 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def test_fixture(compare_fields, tmp_path):
+    path = tmp_path / "out.npz"
+    ref_path = tmp_path / "ref.npz"
+    np.savez(path, field_name=np.ones(2), other=np.zeros(2))
+    np.savez(ref_path, field_name=np.zeros(2), other=np.zeros(2))
+    stats = compare_fields(path, ref_path)
+    assert stats["field_name"].max_abs_error == 1.0
+    np.savez(path, field_name=np.ones(2), other=np.ones(2))
+    with pytest.raises(AssertionError, match="field other: 2 of 2 elements"):
+        compare_fields(path, ref_path)
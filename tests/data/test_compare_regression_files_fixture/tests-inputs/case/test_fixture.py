@@ -0,0 +1,38 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def test_fixture(compare_regression_files, output_path):
+    np.zeros(2).tofile(output_path / "0.bin")
+    np.ones(2).tofile(output_path / "1.bin")
+    with pytest.raises(AssertionError) as excinfo:
+        compare_regression_files()
+    message = str(excinfo.value)
+    assert message.startswith("2 of 3 files differ from their references:")
+    assert "1.bin differs from" in message
+    assert "field data: 2 of 2 elements" in message
+    assert "2.bin cannot be compared to" in message
+    np.full(2, 0.25).tofile(output_path / "1.bin")
+    np.zeros(3).tofile(output_path / "2.bin")
+    stats = compare_regression_files(max_workers=2)
+    assert sorted(path.name for path in stats) == ["0.bin", "1.bin", "2.bin"]
+    assert stats[output_path / "1.bin"]["data"].max_abs_error == 0.25
@@ -0,0 +1,7 @@
+# wait for the runner of the other test case to be started
+touch started
+for i in $(seq 100); do
+    [ -e ../{{other_case}}/started ] && exit 0
+    sleep 0.1
+done
+exit 1
@@ -0,0 +1 @@
+{{command}}
@@ -0,0 +1,52 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Smoke test for the benchmarks."""
+from __future__ import annotations
+
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+BENCHMARK_PATH = Path(__file__).parents[1] / "benchmarks/bench_plugin.py"
+
+
+def test_benchmarks(tmp_path, monkeypatch):
+    """Test running the benchmarks on small trees."""
+    spec = importlib.util.spec_from_file_location("bench_plugin", BENCHMARK_PATH)
+    bench_plugin = importlib.util.module_from_spec(spec)
+    # the dataclasses of a module are resolved from the loaded modules
+    monkeypatch.setitem(sys.modules, "bench_plugin", bench_plugin)
+    spec.loader.exec_module(bench_plugin)
+
+    output_path = tmp_path / "results.json"
+    args = ["--cases", "1", "3", "--files", "2", "--depth", "2", "--references", "2"]
+    bench_plugin.main(args + ["--repeat", "1", "--output", str(output_path)])
+
+    with output_path.open() as file_:
+        results = json.load(file_)
+    assert [result["cases"] for result in results["results"]] == [1, 3]
+    for result in results["results"]:
+        assert set(result["phases"]) == {
+            "settings",
+            "output_tree",
+            "output_tree_sync",
+            "collection",
+            "ordering",
+            "run",
+            "report",
+        }
@@ -0,0 +1,227 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the results cache."""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+from pytest_executable.cache import CacheInputs
+from pytest_executable.cache import DigestCache
+from pytest_executable.cache import DIGESTS_FILENAME
+from pytest_executable.cache import get_modified_files
+from pytest_executable.cache import get_snapshot
+from pytest_executable.cache import parse_size
+from pytest_executable.cache import ResultCache
+from pytest_executable.cache import STALE_TMP_AGE
+from pytest_executable.file_tools import file_digest
+
+
+@pytest.mark.parametrize(
+    "size,expected",
+    (("10", 10), ("1K", 1024), ("1.5M", 3 << 19), ("2g", 2 << 30), ("1TB", 1 << 40)),
+)
+def test_parse_size(size, expected):
+    """Test parse_size."""
+    assert parse_size(size) == expected
+
+
+@pytest.mark.parametrize("size", ("1X", "0", "0K", "0.5"))
+def test_parse_size_error(size):
+    """Test parse_size error."""
+    with pytest.raises(ValueError, match=f"invalid size: {size}"):
+        parse_size(size)
+
+
+def test_key(tmp_path):
+    """Test the key changes with the inputs."""
+    input_dir = tmp_path / "inputs"
+    (input_dir / "dir").mkdir(parents=True)
+    (input_dir / "dir/file").write_text("0")
+    (input_dir / "ignored").write_text("0")
+    dependency = tmp_path / "executable"
+    dependency.write_text("0")
+    inputs = CacheInputs(input_dir, ["ignored"], [dependency])
+    key = inputs.get_key("script")
+
+    assert inputs.get_key("script") == key
+    assert inputs.get_key("other script") != key
+
+    (input_dir / "ignored").write_text("1")
+    assert inputs.get_key("script") == key
+
+    (input_dir / "dir/file").write_text("1")
+    new_key = inputs.get_key("script")
+    assert new_key != key
+
+    dependency.write_text("00")
+    assert inputs.get_key("script") != new_key
+
+
+def test_snapshot(tmp_path):
+    """Test the detection of the modified files."""
+    (tmp_path / "input").write_text("0")
+    (tmp_path / "link").symlink_to(tmp_path / "input")
+    (tmp_path / "modified").write_text("0")
+    snapshot = get_snapshot(tmp_path)
+    (tmp_path / "modified").write_text("00")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir/new").write_text("0")
+    assert sorted(map(str, get_modified_files(tmp_path, snapshot))) == [
+        "dir/new",
+        "modified",
+    ]
+
+
+def test_store_restore(tmp_path):
+    """Test storing and restoring an entry."""
+    cache = ResultCache(tmp_path / "cache", 100)
+    workdir = tmp_path / "workdir"
+    (workdir / "dir").mkdir(parents=True)
+    (workdir / "dir/output").write_text("output")
+    (tmp_path / "input").write_text("input")
+    (workdir / "input").symlink_to(tmp_path / "input")
+
+    assert not cache.restore("key", workdir)
+    cache.store("key", workdir, [Path("dir/output"), Path("input")])
+
+    workdir = tmp_path / "new-workdir"
+    workdir.mkdir()
+    (workdir / "input").symlink_to(tmp_path / "input")
+    assert cache.restore("key", workdir)
+    assert (workdir / "dir/output").read_text() == "output"
+    # the link to the input is replaced
+    assert not (workdir / "input").is_symlink()
+    assert (tmp_path / "input").read_text() == "input"
+
+
+def test_eviction(tmp_path):
+    """Test the least recently used entries are removed."""
+    cache = ResultCache(tmp_path / "cache", 25)
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    (workdir / "file").write_text("0" * 10)
+
+    for index, key in enumerate(("a", "b")):
+        cache.store(key, workdir, [Path("file")])
+        os.utime(tmp_path / "cache" / key, ns=(index, index))
+
+    # a is used more recently than b
+    assert cache.restore("a", workdir)
+    cache.store("c", workdir, [Path("file")])
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == ["a", "c"]
+
+
+def test_eviction_interrupted_store(tmp_path):
+    """Test the entries left behind by an interrupted store are removed."""
+    cache = ResultCache(tmp_path / "cache", 100)
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    (workdir / "file").write_text("0")
+    for name, age in ((".tmp-stale", STALE_TMP_AGE + 60), (".tmp-recent", 60)):
+        path = tmp_path / "cache" / name / "files"
+        path.mkdir(parents=True)
+        mtime = time.time() - age
+        os.utime(path.parent, (mtime, mtime))
+
+    cache.store("a", workdir, [Path("file")])
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == [
+        ".tmp-recent",
+        "a",
+    ]
+
+
+def test_input_digests(tmp_path, monkeypatch):
+    """Test the digests of the input files are stored in the cache directory."""
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    (input_dir / "file").write_text("0")
+    inputs = CacheInputs(input_dir, [], [])
+    cache = ResultCache(tmp_path / "cache", 100)
+    key = inputs.get_key("script", cache.digests)
+    assert key == inputs.get_key("script")
+    cache.save()
+    assert (tmp_path / "cache" / DIGESTS_FILENAME).is_file()
+
+    # the digest is not computed again in a new session
+    calls = []
+
+    def digest(path):
+        calls.append(path)
+        return file_digest(path)
+
+    monkeypatch.setattr("pytest_executable.cache.file_digest", digest)
+    cache = ResultCache(tmp_path / "cache", 100)
+    assert inputs.get_key("script", cache.digests) == key
+    assert not calls
+
+    (input_dir / "file").write_text("1")
+    assert inputs.get_key("script", cache.digests) != key
+    assert calls == [input_dir / "file"]
+
+
+def test_digest_cache(tmp_path, monkeypatch):
+    """Test the cache of the digests."""
+    root = tmp_path / "root"
+    (root / "dir").mkdir(parents=True)
+    path = root / "dir/file"
+    path.write_text("data")
+    expected = file_digest(path)
+
+    cache = DigestCache(root)
+    assert cache.get(path) == expected
+    cache.save()
+    assert (root / DIGESTS_FILENAME).is_file()
+
+    # the digest is not computed again
+    calls = []
+
+    def digest(path):
+        calls.append(path)
+        return file_digest(path)
+
+    monkeypatch.setattr("pytest_executable.cache.file_digest", digest)
+    cache = DigestCache(root)
+    assert cache.get(path) == expected
+    assert not calls
+
+    # a modified file is hashed again
+    path.write_text("other data")
+    assert cache.get(path) == file_digest(path)
+    assert calls == [path]
+
+    # a file outside of the root is not stored
+    outside_path = tmp_path / "outside"
+    outside_path.write_text("")
+    assert cache.get(outside_path) == file_digest(outside_path)
+
+
+def test_digest_cache_errors(tmp_path):
+    """Test the cache of the digests with an invalid or not writable cache file."""
+    (tmp_path / DIGESTS_FILENAME).write_text("[")
+    path = tmp_path / "file"
+    path.write_text("data")
+    cache = DigestCache(tmp_path)
+    assert cache.get(path) == file_digest(path)
+
+    # the cache file cannot be replaced
+    (tmp_path / DIGESTS_FILENAME).unlink()
+    (tmp_path / DIGESTS_FILENAME / "dir").mkdir(parents=True)
+    cache.save()
+    assert sorted(tmp_path.iterdir()) == [tmp_path / DIGESTS_FILENAME, path]
@@ -0,0 +1,275 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the fields comparison."""
+from __future__ import annotations
+
+import pytest
+from pytest_executable.cache import DigestCache
+from pytest_executable.compare import check_fields
+from pytest_executable.compare import check_files
+from pytest_executable.compare import check_files_results
+from pytest_executable.compare import compare_arrays
+from pytest_executable.compare import compare_fields
+from pytest_executable.compare import compare_files
+from pytest_executable.compare import FieldStats
+from pytest_executable.compare import load_fields
+from pytest_executable.compare import LOADERS
+from pytest_executable.compare import raw_loader
+from pytest_executable.compare import register_loader
+from pytest_executable.settings import Tolerances
+
+np = pytest.importorskip("numpy")
+
+
+def test_compare_arrays():
+    """Test the statistics of a comparison."""
+    ref = np.array([[1.0, 2.0], [0.0, 4.0]])
+    array = np.array([[1.0, 2.2], [0.1, 4.0]])
+    tolerances = Tolerances(rel=0.1, abs=0.0)
+    stats = compare_arrays("x", array, ref, tolerances)
+    assert stats.size == 4
+    assert stats.max_abs_error == pytest.approx(0.2)
+    assert stats.max_rel_error == np.inf
+    assert stats.violations == 2
+    assert stats.worst_index == (1, 0)
+    assert not stats.passed
+
+    # the same as numpy
+    for rel, abs_ in ((0.1, 0.0), (0.0, 0.15), (0.2, 0.1)):
+        stats = compare_arrays("x", array, ref, Tolerances(rel=rel, abs=abs_))
+        expected = (~np.isclose(array, ref, rtol=rel, atol=abs_)).sum()
+        assert stats.violations == expected
+
+
+def test_compare_arrays_special_values():
+    """Test the comparison of integers, NaN and infinite values."""
+    stats = compare_arrays("x", np.array([1, 2]), np.array([1, 2]), Tolerances())
+    assert stats.passed
+    assert stats.worst_index == (0,)
+
+    ref = np.array([np.nan, np.inf, 1.0, 1.0])
+    stats = compare_arrays("x", ref.copy(), ref, Tolerances())
+    assert stats.passed
+    assert stats.max_abs_error == 0.0
+
+    array = np.array([np.nan, np.inf, np.nan, np.inf])
+    stats = compare_arrays("x", array, ref, Tolerances(rel=1.0, abs=1.0))
+    assert stats.violations == 2
+    assert stats.max_abs_error == np.inf
+    assert stats.worst_index == (2,)
+
+    stats = compare_arrays("x", np.array([]), np.array([]), Tolerances())
+    assert stats == FieldStats("x", Tolerances(), 0, 0.0, 0.0, 0, None)
+
+
+@pytest.mark.parametrize("chunk_size", (8, 24, 64, 1 << 20))
+@pytest.mark.parametrize("order", ("C", "F"))
+def test_compare_arrays_chunks(chunk_size, order):
+    """Test that the statistics do not depend on the chunks."""
+    rng = np.random.default_rng(0)
+    ref = rng.random((7, 5))
+    array = ref + rng.normal(scale=0.1, size=ref.shape)
+    array[3, 2] = ref[3, 2] + 1.0
+    array[5, 4] = ref[5, 4] + 1.0
+    ref = np.asarray(ref, order=order)
+    array = np.asarray(array, order=order)
+    tolerances = Tolerances(rel=0.1, abs=0.01)
+    expected = compare_arrays("x", array, ref, tolerances, 1 << 30)
+    stats = compare_arrays("x", array, ref, tolerances, chunk_size)
+    assert stats.worst_index in ((3, 2), (5, 4))
+    assert stats.worst_index == expected.worst_index
+    for name in ("max_abs_error", "max_rel_error", "violations"):
+        assert getattr(stats, name) == getattr(expected, name)
+    assert stats.nbytes == 2 * 35 * 8
+    assert stats.throughput > 0.0
+
+
+def test_compare_fields_memory_mapped(tmp_path):
+    """Test comparing memory mapped files by chunks."""
+    data = np.arange(1000.0)
+    for suffix in (".npy", ".bin"):
+        path = tmp_path / f"out{suffix}"
+        ref_path = tmp_path / f"ref{suffix}"
+        if suffix == ".npy":
+            np.save(path, data + 1.0)
+            np.save(ref_path, data)
+        else:
+            (data + 1.0).tofile(path)
+            data.tofile(ref_path)
+        assert isinstance(load_fields(path)["data"], np.memmap)
+        stats = compare_fields(path, ref_path, {}, chunk_size=100)["data"]
+        assert stats.violations == 1000
+        assert stats.max_abs_error == 1.0
+        assert stats.max_rel_error == np.inf
+        assert stats.worst_index == (0,)
+
+
+def test_compare_fields_identical(tmp_path, monkeypatch):
+    """Test that identical files are not compared."""
+    path = tmp_path / "out.npz"
+    ref_path = tmp_path / "ref.npz"
+    np.savez(path, a=np.ones((2, 3)), b=np.zeros(0))
+    ref_path.write_bytes(path.read_bytes())
+
+    def compare(*args):
+        raise AssertionError
+
+    monkeypatch.setattr("pytest_executable.compare.compare_arrays", compare)
+    for digests in (None, DigestCache(tmp_path)):
+        stats = compare_fields(path, ref_path, {}, digests=digests)
+        assert stats["a"].identical
+        assert stats["a"].passed
+        assert stats["a"].worst_index == (0, 0)
+        assert stats["a"].nbytes == 96
+        assert stats["b"].worst_index is None
+
+    with pytest.raises(ValueError, match="field c: missing from .*out.npz"):
+        compare_fields(path, ref_path, {}, ["c"])
+
+    # same size but different contents
+    np.savez(path, a=np.zeros((2, 3)), b=np.zeros(0))
+    with pytest.raises(AssertionError):
+        compare_fields(path, ref_path, {})
+
+
+def test_compare_arrays_shape_error():
+    """Test the comparison of arrays with different shapes."""
+    msg = r"field x: the shape \(2,\) differs from the reference shape \(3,\)"
+    with pytest.raises(ValueError, match=msg):
+        compare_arrays("x", np.zeros(2), np.zeros(3), Tolerances())
+
+
+def test_loaders(tmp_path):
+    """Test the loaders."""
+    data = np.arange(6.0).reshape(2, 3)
+
+    path = tmp_path / "file.npy"
+    np.save(path, data)
+    fields = load_fields(path)
+    assert list(fields) == ["data"]
+    np.testing.assert_array_equal(fields["data"], data)
+
+    path = tmp_path / "file.npz"
+    np.savez(path, a=data, b=data[0])
+    fields = load_fields(path)
+    assert list(fields) == ["a", "b"]
+    np.testing.assert_array_equal(fields["b"], data[0])
+
+    path = tmp_path / "file.bin"
+    data.tofile(path)
+    np.testing.assert_array_equal(load_fields(path)["data"], data.ravel())
+    fields = load_fields(path, raw_loader("<f4", "x"))
+    assert fields["x"].size == 12
+
+    path = tmp_path / "file.csv"
+    path.write_text("a, b\n1, 2\n3, 4\n")
+    fields = load_fields(path)
+    np.testing.assert_array_equal(fields["b"], [2.0, 4.0])
+
+    path = tmp_path / "file.dat"
+    path.write_text("1 2\n3 4\n")
+    fields = load_fields(path)
+    assert list(fields) == ["column_0", "column_1"]
+    np.testing.assert_array_equal(fields["column_0"], [1.0, 3.0])
+
+
+def test_register_loader(tmp_path, monkeypatch):
+    """Test registering a loader."""
+    monkeypatch.setattr("pytest_executable.compare.LOADERS", dict(LOADERS))
+    path = tmp_path / "file.dummy"
+    with pytest.raises(ValueError, match="no loader registered for the file"):
+        load_fields(path)
+    register_loader(".dummy", lambda path: {"x": np.ones(1)})
+    assert list(load_fields(path)) == ["x"]
+
+
+def test_compare_fields(tmp_path):
+    """Test comparing and checking files."""
+    path = tmp_path / "out.npz"
+    ref_path = tmp_path / "ref.npz"
+    np.savez(path, a=np.ones(3), b=np.ones(2))
+    np.savez(ref_path, a=np.ones(3), b=np.zeros(2))
+
+    stats = compare_fields(path, ref_path, {})
+    assert [s.passed for s in stats.values()] == [True, False]
+
+    stats = compare_fields(path, ref_path, {"b": Tolerances(abs=1.0)})
+    assert all(s.passed for s in stats.values())
+
+    stats = check_fields(path, ref_path, {}, ["a"])
+    assert list(stats) == ["a"]
+
+    with pytest.raises(AssertionError, match="field b: 2 of 2 elements out of"):
+        check_fields(path, ref_path, {})
+
+    with pytest.raises(AssertionError, match="field c: missing from .*out.npz"):
+        check_fields(path, ref_path, {}, ["c"])
+
+
+def test_check_files(tmp_path):
+    """Test checking files concurrently."""
+    paths = []
+    for name in "abcd":
+        path = tmp_path / f"{name}.npy"
+        ref_path = tmp_path / f"ref-{name}.npy"
+        np.save(path, np.ones(2))
+        np.save(ref_path, np.ones(2))
+        paths += [(path, ref_path)]
+
+    stats = check_files(paths, {}, max_workers=2)
+    assert list(stats) == [path for path, _ in paths]
+    assert all(s.passed for file_stats in stats.values() for s in file_stats.values())
+
+    np.save(paths[1][0], np.zeros(2))
+    np.save(paths[3][0], np.zeros(3))
+    paths += [(tmp_path / "missing.npy", paths[0][1])]
+    results = compare_files(paths, {})
+    assert isinstance(results[paths[4]], FileNotFoundError)
+    with pytest.raises(AssertionError) as excinfo:
+        check_files_results(results)
+    lines = str(excinfo.value).splitlines()
+    assert lines[0] == "3 of 5 files differ from their references:"
+    assert lines[1].endswith(f"b.npy differs from {paths[1][1]}:")
+    assert lines[2].startswith("  field data: 2 of 2 elements out of")
+    assert lines[3].endswith(f"d.npy cannot be compared to {paths[3][1]}:")
+    assert lines[5].endswith(f"missing.npy cannot be compared to {paths[0][1]}:")
+    assert lines[6].startswith("  FileNotFoundError: ")
+
+
+def test_compare_files_loader_errors(tmp_path):
+    """Test reporting the errors of the loaders with the other results."""
+    ref_path = tmp_path / "ref.npz"
+    np.savez(ref_path, a=np.ones(2))
+    corrupted_path = tmp_path / "corrupted.npz"
+    corrupted_path.write_bytes(b"PK\x03\x04" + bytes(100))
+    path = tmp_path / "out.npz"
+    np.savez(path, a=np.ones(2))
+
+    def loader(path):
+        raise KeyError("a")
+
+    paths = [(corrupted_path, ref_path), (path, ref_path)]
+    results = compare_files(paths, {})
+    assert not isinstance(results[paths[0]], dict)
+    assert results[paths[1]]["a"].passed
+    results = compare_files(paths, {}, loader=loader)
+    assert all(isinstance(result, KeyError) for result in results.values())
+    with pytest.raises(AssertionError) as excinfo:
+        check_files_results(results)
+    lines = str(excinfo.value).splitlines()
+    assert lines[0] == "2 of 2 files differ from their references:"
+    assert lines[2] == "  KeyError: 'a'"
@@ -0,0 +1,93 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the file index."""
+from __future__ import annotations
+
+import json
+
+import pytest
+from pytest_executable.file_index import FileIndex
+
+PATTERNS = (
+    "*",
+    "**",
+    "**/*",
+    "**/*.prf",
+    "*/*.prf",
+    "0/1.prf",
+    "0/dir",
+    "0/dir/",
+    "./0/*.prf",
+    "0/dir/**/*.prf",
+    "**/dir/*",
+    "[01]/*",
+    "?/.hidden",
+    "*/link/*.prf",
+    "*/link",
+    "1.prf/x",
+    "dummy",
+    "../ref/0/1.prf",
+)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create a tree with files, hidden files and links."""
+    root = tmp_path / "ref"
+    for path in ("0/1.prf", "0/.hidden", "0/dir/2.prf", "0/dir/sub/3.prf", "1/4.txt"):
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).touch()
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other/5.prf").touch()
+    (root / "0/link").symlink_to(tmp_path / "other")
+    return root
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_glob(tree, pattern):
+    """Test that the matches are the ones of pathlib."""
+    index = FileIndex(tree)
+    for dir_path in (tree, tree / "0"):
+        assert index.glob(dir_path, pattern) == sorted(dir_path.glob(pattern))
+
+
+def test_glob_outside(tree, tmp_path):
+    """Test matching from a directory outside of the root."""
+    index = FileIndex(tree / "0")
+    assert index.glob(tmp_path / "other", "*") == [tmp_path / "other/5.prf"]
+
+
+def test_previous(tree):
+    """Test building from a previous index."""
+    index = FileIndex(tree)
+    assert index.scanned_dirs == 5
+
+    # the data shall survive a json round trip
+    data = json.loads(json.dumps(index.data))
+
+    index = FileIndex(tree, data)
+    assert index.scanned_dirs == 0
+    assert index.glob(tree, "**/*.prf") == sorted(tree.glob("**/*.prf"))
+
+    (tree / "0/dir/new.prf").touch()
+    index = FileIndex(tree, data)
+    assert index.scanned_dirs == 1
+    assert tree / "0/dir/new.prf" in index.glob(tree, "**/*.prf")
+
+    # the data of another root is ignored
+    index = FileIndex(tree / "0", data)
+    assert index.scanned_dirs == 3
@@ -21,9 +21,14 @@ import os
 from pathlib import Path
 
 import pytest
+from pytest_executable import file_tools
+from pytest_executable.file_index import FileIndex
 from pytest_executable.file_tools import create_output_directory
 from pytest_executable.file_tools import find_references
 from pytest_executable.file_tools import get_mirror_path
+from pytest_executable.file_tools import LINK_MODES
+from pytest_executable.file_tools import SyncStats
+from pytest_executable.file_tools import Trash
 
 from . import ROOT_DATA_DIR
 
@@ -60,6 +65,190 @@ def test_existing_destination_overwrite(shared_tmp_path):
     _helper(shared_tmp_path, False, False)
 
 
+@pytest.mark.parametrize("link_mode", ("hardlink", "reflink", "copy"))
+def test_link_modes(tmp_path, link_mode):
+    """Test the creation of the files other than symlinks."""
+    src_dir = tmp_path / "src"
+    (src_dir / "dir").mkdir(parents=True)
+    (src_dir / "file").write_text("data")
+    (src_dir / "dir/script").write_text("script")
+    (src_dir / "dir/script").chmod(0o755)
+    (src_dir / "file-to-ignore").touch()
+    dst_dir = tmp_path / "dst"
+
+    # an existing symlink shall be replaced, not written through
+    (dst_dir / "dir").mkdir(parents=True)
+    (dst_dir / "file").symlink_to(src_dir / "file")
+
+    create_output_directory(
+        src_dir, dst_dir, False, False, ["file-to-ignore"], link_mode
+    )
+
+    assert sorted(p.name for p in dst_dir.iterdir()) == ["dir", "file"]
+    for name in ("file", "dir/script"):
+        src_path = src_dir / name
+        dst_path = dst_dir / name
+        assert not dst_path.is_symlink()
+        assert dst_path.read_text() == src_path.read_text()
+        assert dst_path.stat().st_mode == src_path.stat().st_mode
+        is_same_file = dst_path.samefile(src_path)
+        assert is_same_file == (link_mode == "hardlink")
+
+    if link_mode != "hardlink":
+        # modifying a copy shall not modify the source
+        (dst_dir / "file").write_text("other")
+        assert (src_dir / "file").read_text() == "data"
+
+
+def test_link_modes_large_file(tmp_path):
+    """Test copying a file larger than the copy chunks."""
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    data = os.urandom(3 * (1 << 20) + 1)
+    (src_dir / "file").write_bytes(data)
+    create_output_directory(src_dir, tmp_path / "dst", False, False, [], "copy")
+    assert (tmp_path / "dst/file").read_bytes() == data
+
+
+@pytest.mark.parametrize("copied", (0, 10))
+def test_link_modes_short_copy(tmp_path, monkeypatch, copied):
+    """Test copying a file when the in-kernel copies stop before its size."""
+    calls = []
+
+    def copy(src_fd, dst_fd, offset, count):
+        calls.append(offset)
+        if offset:
+            return 0
+        os.pwrite(dst_fd, os.pread(src_fd, copied, offset), offset)
+        return copied
+
+    monkeypatch.setattr(file_tools, "_copy_file_range", copy)
+    monkeypatch.setattr(file_tools, "_sendfile", copy)
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    data = os.urandom(100)
+    (src_dir / "file").write_bytes(data)
+    create_output_directory(src_dir, tmp_path / "dst", False, False, [], "copy")
+    assert (tmp_path / "dst/file").read_bytes() == data
+    # the next system call is tried only when nothing has been copied
+    assert calls == ([0, 0] if copied == 0 else [0, 10])
+
+
+@pytest.mark.parametrize("link_mode", ("symlink", "copy"))
+def test_linked_dirs(tmp_path, link_mode):
+    """Test the directories symlinked as a whole."""
+    src_dir = tmp_path / "src"
+    (src_dir / "dir/mesh/sub").mkdir(parents=True)
+    (src_dir / "dir/mesh/sub/file").touch()
+    (src_dir / "dir/file").touch()
+    (src_dir / "other").mkdir()
+    dst_dir = tmp_path / "dst"
+
+    # a directory duplicated by a previous execution shall be replaced
+    _helper_linked_dirs(src_dir, dst_dir, link_mode, ())
+    assert not (dst_dir / "dir/mesh").is_symlink()
+
+    for _ in range(2):
+        _helper_linked_dirs(src_dir, dst_dir, link_mode, ("dir/mesh/", "other"))
+        for name in ("dir/mesh", "other"):
+            assert (dst_dir / name).is_symlink()
+            assert os.readlink(dst_dir / name) == str(src_dir / name)
+        assert (dst_dir / "dir/mesh/sub/file").is_file()
+        assert not (dst_dir / "dir").is_symlink()
+        assert (dst_dir / "dir/file").is_symlink() == (link_mode == "symlink")
+
+
+def _helper_linked_dirs(src_dir, dst_dir, link_mode, linked_dirs):
+    create_output_directory(src_dir, dst_dir, False, False, [], link_mode, linked_dirs)
+
+
+@pytest.mark.parametrize("link_mode", LINK_MODES)
+def test_sync(tmp_path, link_mode):
+    """Test the synchronization of an existing destination."""
+    src_dir = tmp_path / "src"
+    (src_dir / "dir").mkdir(parents=True)
+    for name in ("file", "stale", "dir/file", "dir/changed"):
+        (src_dir / name).write_text(name)
+    dst_dir = tmp_path / "dst"
+
+    stats = _helper_sync(src_dir, dst_dir, link_mode)
+    assert stats == SyncStats(created=4)
+
+    (dst_dir / "output").write_text("")
+    (src_dir / "stale").unlink()
+    (src_dir / "new").write_text("")
+    (src_dir / "dir/changed").unlink()
+    (src_dir / "dir/changed").write_text("changed")
+    (dst_dir / "dir/file").unlink()
+    stats = _helper_sync(src_dir, dst_dir, link_mode)
+
+    # only the stale symlinks can be told apart from the outputs
+    removed = int(link_mode == "symlink")
+    # a symlink to a re-created file is still up to date
+    updated = int(link_mode != "symlink")
+    assert stats == SyncStats(
+        created=2, updated=updated, removed=removed, unchanged=2 - updated
+    )
+    assert (dst_dir / "output").exists()
+    assert (dst_dir / "stale").exists() == (link_mode != "symlink")
+    assert (dst_dir / "dir/changed").read_text() == "changed"
+
+    # nothing to do
+    stats = _helper_sync(src_dir, dst_dir, link_mode)
+    assert stats == SyncStats(unchanged=4)
+
+
+def _helper_sync(src_dir, dst_dir, link_mode):
+    return create_output_directory(src_dir, dst_dir, False, False, [], link_mode)
+
+
+def test_trash(tmp_path):
+    """Test the removal of directories in the background."""
+    trash_path = tmp_path / "trash"
+    (trash_path / "leftover/dir").mkdir(parents=True)
+    dir_path = tmp_path / "dir"
+    (dir_path / "sub").mkdir(parents=True)
+    (dir_path / "sub/file").touch()
+
+    trash = Trash(trash_path)
+    trash.move(dir_path)
+    assert not dir_path.exists()
+    trash.empty()
+    assert not trash_path.exists()
+
+
+def test_trash_rename_error(tmp_path, monkeypatch):
+    """Test the removal of a directory that cannot be moved into the trash."""
+    dir_path = tmp_path / "dir"
+    dir_path.mkdir()
+
+    def rename(*args):
+        raise OSError
+
+    monkeypatch.setattr(Path, "rename", rename)
+    trash = Trash(tmp_path / "trash")
+    trash.move(dir_path)
+    assert not dir_path.exists()
+    trash.empty()
+
+
+def test_clean_destination_with_trash(tmp_path):
+    """Test clean destination with a trash."""
+    dst_dir = tmp_path / "dst"
+    (dst_dir / "output").mkdir(parents=True)
+    trash = Trash(tmp_path / "trash")
+    create_output_directory(DATA_DIR / "src_dir", dst_dir, True, True, [], trash=trash)
+    assert not (dst_dir / "output").exists()
+    trash.empty()
+    assert not (tmp_path / "trash").exists()
+
+
+def test_link_modes_error(tmp_path):
+    """Test invalid link mode."""
+    with pytest.raises(ValueError, match="invalid link mode: dummy"):
+        create_output_directory(tmp_path, tmp_path / "dst", False, False, [], "dummy")
+
+
 def _helper(shared_tmp_path, check, overwrite):
     create_output_directory(
         DATA_DIR / "src_dir",
@@ -137,3 +326,17 @@ def test_find_references():
     assert rel_paths == [Path("0/1.prf"), Path("0/dir/2.prf")]
     # empty case
     assert not find_references(data_dir / "ref-dir", ["**/*.dummy"])
+
+
+def test_find_references_with_index():
+    """Test find_references with an index."""
+    data_dir = ROOT_DATA_DIR / "find_references"
+    index = FileIndex(data_dir)
+    file_paths = find_references(data_dir / "ref-dir", ["**/*.prf", "0/*"], index)
+    rel_paths = [f.relative for f in file_paths]
+    assert rel_paths == [
+        Path("0/1.prf"),
+        Path("0/dir/2.prf"),
+        Path("0/1.prf"),
+        Path("0/dir"),
+    ]
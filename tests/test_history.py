@@ -0,0 +1,144 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the history of the runner executions."""
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+from pytest_executable.history import Change
+from pytest_executable.history import HistoryDB
+from pytest_executable.history import main
+
+
+def _run(status: str = "passed", wall_time: float | None = 1.0) -> dict:
+    return {"status": status, "wall_time": wall_time, "max_rss": 10}
+
+
+@pytest.fixture
+def history_path(tmp_path):
+    """Return the path to a history with 4 sessions."""
+    path = tmp_path / "history.sqlite"
+    with HistoryDB(path) as db:
+        for i, wall_time in enumerate((1.0, 3.0, 2.0)):
+            db.add_session(
+                f"2020-01-0{i + 1}T00:00:00+00:00",
+                "v1",
+                {"a": _run(wall_time=wall_time), "b": _run(wall_time=1.0)},
+            )
+        db.add_session(
+            "2020-01-04T00:00:00+00:00",
+            "v2",
+            {
+                "a": _run(wall_time=2.1),
+                "b": _run("failed", 2.0),
+                "c": _run(wall_time=5.0),
+                "d": _run(wall_time=None),
+            },
+        )
+    return path
+
+
+def test_append(history_path):
+    """Test that the sessions are appended."""
+    with HistoryDB(history_path) as db:
+        assert db.sessions() == [
+            (1, "2020-01-01T00:00:00+00:00", "v1"),
+            (2, "2020-01-02T00:00:00+00:00", "v1"),
+            (3, "2020-01-03T00:00:00+00:00", "v1"),
+            (4, "2020-01-04T00:00:00+00:00", "v2"),
+        ]
+        assert db.add_session("2020-01-05T00:00:00+00:00", None, {}) == 5
+    connection = sqlite3.connect(str(history_path))
+    rows = connection.execute(
+        "SELECT status, wall_time, user_time, max_rss FROM runs "
+        "WHERE session = 4 AND path = 'b'"
+    ).fetchall()
+    connection.close()
+    assert rows == [("failed", 2.0, None, 10)]
+
+
+def test_wall_times(history_path):
+    """Test the wall times of several sessions."""
+    with HistoryDB(history_path) as db:
+        assert db.wall_times([1, 2]) == {"a": [1.0, 3.0], "b": [1.0, 1.0]}
+        # the failed runs and the runs without wall time are ignored
+        assert db.wall_times([4]) == {"a": [2.1], "c": [5.0]}
+        assert db.wall_times([]) == {}
+
+
+def test_median_wall_times(history_path):
+    """Test the median wall times in the last sessions."""
+    with HistoryDB(history_path) as db:
+        assert db.median_wall_times(5) == pytest.approx({"a": 2.05, "b": 1.0, "c": 5.0})
+        assert db.median_wall_times(1) == {"a": 2.1, "c": 5.0}
+
+
+def test_slowest(history_path):
+    """Test the slowest test cases."""
+    with HistoryDB(history_path) as db:
+        assert db.slowest(4, 2) == [("c", 5.0), ("a", 2.1)]
+        assert db.slowest(1, 10) == [("a", 1.0), ("b", 1.0)]
+
+
+def test_changes(history_path):
+    """Test the changes against the median of the previous sessions."""
+    with HistoryDB(history_path) as db:
+        # the failed run of b is ignored
+        changes = db.changes(4, 5)
+        assert changes == [Change("a", 2.1, 2.0)]
+        assert changes[0].ratio == pytest.approx(0.05)
+        # only the last previous session
+        assert db.changes(4, 1) == [Change("a", 2.1, 2.0)]
+        # only the first 2 sessions
+        assert db.changes(3, 5) == [Change("a", 2.0, 2.0), Change("b", 1.0, 1.0)]
+        assert db.changes(1, 5) == []
+
+
+def test_change_ratio():
+    """Test the relative change with a null baseline."""
+    assert Change("a", 1.0, 0.0).ratio == float("inf")
+    assert Change("a", 0.0, 0.0).ratio == 0.0
+    assert str(Change("a", 1.5, 1.0)) == "a: 1.500 s, baseline 1.000 s, +50.0%"
+
+
+def test_main(history_path, capsys):
+    """Test the command line tool."""
+    path = str(history_path)
+    assert main([path, "sessions"]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == "4: 2020-01-04T00:00:00+00:00 v2"
+
+    assert main([path, "slowest", "--limit", "1"]) == 0
+    assert capsys.readouterr().out == "c: 5.000 s\n"
+
+    assert main([path, "movers", "--session", "3"]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "a: 2.000 s, baseline 2.000 s, +0.0%",
+        "b: 1.000 s, baseline 1.000 s, +0.0%",
+    ]
+
+    assert main([path, "regressions", "--threshold", "0.01"]) == 1
+    assert capsys.readouterr().out == "a: 2.100 s, baseline 2.000 s, +5.0%\n"
+
+    assert main([path, "regressions"]) == 0
+    assert capsys.readouterr().out == ""
+
+
+def test_main_no_file(tmp_path):
+    """Test the command line tool with a missing database."""
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "history.sqlite"), "slowest"])
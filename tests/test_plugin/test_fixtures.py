@@ -17,6 +17,10 @@
 """Tests for the plugin fixtures."""
 from __future__ import annotations
 
+from pathlib import Path
+
+from pytest_executable.history import HistoryDB
+
 from . import assert_outcomes
 
 
@@ -29,6 +33,25 @@ def test_tolerances_fixture(testdir):
     assert_outcomes(result, passed=1, skipped=1)
 
 
+def test_compare_fields_fixture(testdir):
+    """Test compare_fields fixture."""
+    directory = testdir.copy_example("tests/data/test_compare_fields_fixture")
+    result = testdir.runpytest(directory / "tests-inputs", "-rP")
+    # skip runner because no --exe-runner
+    # pass fixture
+    assert_outcomes(result, passed=1, skipped=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*Captured compare fields call*",
+            "*out.npz: field field_name: 0.000 GB compared in * s, * GB/s",
+            "*out.npz: field other: 0.000 GB compared in * s, * GB/s",
+        ]
+    )
+    result.stdout.fnmatch_lines(
+        ["compared 4 fields, 0 checked identical: 0.000 GB in * s, * GB/s"]
+    )
+
+
 def test_regression_path_fixture(testdir):
     """Test regression_path fixture."""
     directory = testdir.copy_example("tests/data/test_regression_path_fixture")
@@ -66,6 +89,48 @@ def test_regression_file_path_fixture_no_references(testdir):
     assert_outcomes(result, skipped=1)
 
 
+def test_regression_file_path_fixture(testdir):
+    """Test regression_file_path fixture with and without a stored index."""
+    directory = testdir.copy_example("tests/data/test_regression_file_path_fixture")
+    for options in ((), ("--exe-regression-index",), ("--exe-regression-index",)):
+        result = testdir.runpytest(
+            directory / "tests-inputs/case",
+            "--exe-regression-root",
+            directory / "references",
+            "--exe-overwrite-output",
+            *options,
+        )
+        # skip runner because no --exe-runner
+        assert_outcomes(result, passed=2, skipped=1)
+        cached = testdir.runpytest("--cache-show", "exe/*")
+        assert ("exe/regression-index contains" in cached.stdout.str()) == bool(options)
+
+
+def test_compare_regression_files_fixture(testdir):
+    """Test compare_regression_files fixture."""
+    directory = testdir.copy_example("tests/data/test_compare_regression_files_fixture")
+    references_path = Path(directory) / "references/case"
+    references_path.mkdir(parents=True)
+    for name, size in (("0", 2), ("1", 2), ("2", 3)):
+        (references_path / f"{name}.bin").write_bytes(bytes(8 * size))
+    result = testdir.runpytest(
+        directory / "tests-inputs", "--exe-regression-root", directory / "references"
+    )
+    # skip runner because no --exe-runner
+    assert_outcomes(result, passed=1, skipped=1)
+    # the references root directory is left untouched
+    assert sorted(Path(directory / "references").iterdir()) == [references_path]
+    assert Path(directory / "tests-output/.exe-reference-digests.json").is_file()
+
+
+def test_compare_regression_files_fixture_no_regression_root(testdir):
+    """Test skipping compare_regression_files fixture without regression root."""
+    directory = testdir.copy_example("tests/data/test_compare_regression_files_fixture")
+    result = testdir.runpytest(directory / "tests-inputs")
+    # skip runner because no --exe-runner
+    assert_outcomes(result, skipped=2)
+
+
 RUNNER_DATA_DIR = "tests/data/test_runner_fixture"
 
 
@@ -94,6 +159,45 @@ def test_runner_fixture_with_local_settings(testdir):
     assert stdout == "100"
 
 
+def test_runner_resources(testdir):
+    """Test the resources used by the runner in the user properties."""
+    directory = testdir.copy_example(RUNNER_DATA_DIR)
+    result = testdir.runpytest(
+        directory / "tests-inputs/case-local-settings",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--junitxml",
+        directory / "junit.xml",
+    )
+    assert_outcomes(result, passed=1)
+    junit = Path(directory / "junit.xml").read_text()
+    for name in ("wall_time", "user_time", "system_time", "max_rss"):
+        assert f'<property name="runner_{name}" value=' in junit
+
+
+def test_runner_history(testdir):
+    """Test the runner executions appended to the history."""
+    directory = testdir.copy_example(RUNNER_DATA_DIR)
+    history_path = Path(directory / "history/history.sqlite")
+    for label in ("v1", "v2"):
+        result = testdir.runpytest(
+            directory / "tests-inputs/case-local-settings",
+            "--exe-runner",
+            directory / "runner.sh",
+            "--exe-history",
+            history_path,
+            "--exe-build-label",
+            label,
+            "--exe-overwrite-output",
+        )
+        assert_outcomes(result, passed=1)
+    with HistoryDB(history_path) as db:
+        assert [label for _, _, label in db.sessions()] == ["v1", "v2"]
+        wall_times = db.wall_times([1, 2])
+    assert list(wall_times) == ["case-local-settings"]
+    assert len(wall_times["case-local-settings"]) == 2
+
+
 def test_runner_not_script(testdir):
     """Test error when the runner is not a text script."""
     directory = testdir.copy_example(RUNNER_DATA_DIR)
@@ -138,3 +242,163 @@ def test_runner_error_with_undefined_placeholder(testdir):
     result.stdout.fnmatch_lines(
         ["E   ValueError: in */runner.sh: 'nproc' is undefined"]
     )
+
+
+def test_runner_fixture_with_jobs(testdir):
+    """Test the concurrent execution of the runners."""
+    directory = testdir.copy_example("tests/data/test_exe_jobs")
+    # the runner of each test case waits for the runner of the other one
+    result = testdir.runpytest(
+        directory / "tests-inputs",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--exe-jobs",
+        "2",
+        "--exe-max-cores",
+        "2",
+    )
+    assert_outcomes(result, passed=2)
+
+
+def test_runner_fixture_with_jobs_skipif(testdir):
+    """Test the concurrent execution of the runners with false skipif marks."""
+    directory = testdir.copy_example("tests/data/test_exe_jobs")
+    testdir.makeconftest(
+        """
+import pytest
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        item.add_marker(pytest.mark.skipif(False, reason="not skipped"))
+"""
+    )
+    result = testdir.runpytest(
+        directory / "tests-inputs",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--exe-jobs",
+        "2",
+        "--exe-max-cores",
+        "2",
+    )
+    assert_outcomes(result, passed=2)
+
+
+def test_runner_fixture_with_jobs_nested(testdir):
+    """Test the concurrent execution of the runners of nested test cases."""
+    directory = testdir.copy_example("tests/data/test_exe_jobs_nested")
+    # the runner of the nested test case checks that the other one is done
+    result = testdir.runpytest(
+        directory / "tests-inputs",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--exe-jobs",
+        "2",
+        "--exe-max-cores",
+        "2",
+        "--exe-clean-output",
+    )
+    assert_outcomes(result, passed=2)
+
+
+def test_runner_fixture_with_jobs_errors(testdir):
+    """Test the errors of the runner fixture with concurrent execution."""
+    directory = testdir.copy_example(RUNNER_DATA_DIR)
+    Path(directory / "tests-output/case-local-settings").mkdir(parents=True)
+    result = testdir.runpytest(
+        directory / "tests-inputs",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--exe-jobs",
+        "2",
+        "--exe-max-cores",
+        "100",
+    )
+    assert_outcomes(result, errors=2)
+    result.stdout.fnmatch_lines_random(
+        [
+            "E   ValueError: in */runner.sh: 'nproc' is undefined",
+            'E   FileExistsError: the output directory "*" already exists: *',
+        ]
+    )
+
+
+def test_runner_fixture_with_jobs_too_many_cores(testdir):
+    """Test error when a runner uses more cores than the budget."""
+    directory = testdir.copy_example(RUNNER_DATA_DIR)
+    result = testdir.runpytest(
+        directory / "tests-inputs/case-local-settings",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--exe-jobs",
+        "2",
+        "--exe-max-cores",
+        "99",
+    )
+    result.stderr.fnmatch_lines(
+        [
+            "ERROR: the test case */case-local-settings uses 100 cores but "
+            "--exe-max-cores is 99"
+        ]
+    )
+    assert not Path(directory / "tests-output").exists()
+
+
+def test_runner_fixture_with_cache(testdir):
+    """Test restoring the results of a runner from the cache."""
+    directory = testdir.copy_example(RUNNER_DATA_DIR)
+    args = [
+        directory / "tests-inputs/case-local-settings",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--exe-cache-dir",
+        directory / "cache",
+        "--exe-clean-output",
+        "-v",
+    ]
+    stdout_path = Path(directory / "tests-output/case-local-settings/runner.sh.stdout")
+
+    result = testdir.runpytest(*args)
+    assert_outcomes(result, passed=1)
+    result.stdout.fnmatch_lines(["*::test_runner PASSED*"])
+
+    # the output directory is cleaned before restoring the results
+    result = testdir.runpytest(*args)
+    assert_outcomes(result, passed=1)
+    result.stdout.fnmatch_lines(["*::test_runner PASSED (cached)*"])
+    assert stdout_path.read_text().strip() == "100"
+
+    # disable the cache
+    result = testdir.runpytest(*args, "--exe-no-cache")
+    result.stdout.fnmatch_lines(["*::test_runner PASSED*"])
+    result.stdout.no_fnmatch_line("*(cached)*")
+
+
+def test_runner_fixture_post_processing(testdir):
+    """Test a post-processing test that requests the runner of a cached run."""
+    directory = testdir.copy_example(RUNNER_DATA_DIR)
+    Path(directory / "tests-inputs/case-local-settings/test_post.py").write_text(
+        "def test_post(runner):\n    pass\n"
+    )
+    args = [
+        directory / "tests-inputs/case-local-settings",
+        "--exe-runner",
+        directory / "runner.sh",
+        "--exe-cache-dir",
+        directory / "cache",
+        "--exe-overwrite-output",
+        # the scheduled runner is shared by the tests of the test case
+        "--exe-jobs",
+        "2",
+        "--exe-max-cores",
+        "100",
+        "-v",
+    ]
+    testdir.runpytest(*args)
+    result = testdir.runpytest(*args)
+    assert_outcomes(result, passed=2)
+    # only the runner test tells that the results were cached
+    result.stdout.fnmatch_lines(
+        ["*::test_runner PASSED (cached)*", "*::test_post PASSED *"]
+    )
+    assert result.stdout.str().count("(cached)") == 1
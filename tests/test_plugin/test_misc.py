@@ -17,7 +17,13 @@
 """Tests for the plugin itself."""
 from __future__ import annotations
 
+import random
+import time
+from pathlib import Path
+
 import pytest
+from pytest_executable.history import HistoryDB
+from pytest_executable.plugin import _get_sort_keys
 
 from . import assert_outcomes
 
@@ -47,6 +53,163 @@ def test_collect_order(testdir):
     )
 
 
+def test_collect_order_longest_first(testdir):
+    """Check the tests order from the durations in the history."""
+    directory = Path(testdir.copy_example("tests/data/collect_order"))
+    inputs_path = directory / "inputs"
+    inputs_path.mkdir()
+    for name in ("b", "z", "test_a.py"):
+        (directory / name).rename(inputs_path / name)
+    history_path = directory / "history.sqlite"
+    with HistoryDB(history_path) as history:
+        history.add_session(
+            "2020-01-01T00:00:00+00:00",
+            None,
+            {"b": {"status": "passed", "wall_time": 1.0}},
+        )
+        history.add_session(
+            "2020-01-02T00:00:00+00:00",
+            None,
+            {"z": {"status": "passed", "wall_time": 2.0}},
+        )
+
+    result = testdir.runpytest(
+        inputs_path,
+        "--collect-only",
+        "--exe-history",
+        history_path,
+        "--exe-longest-first",
+    )
+    result.stdout.re_match_lines(
+        [
+            "collected 5 items",
+            "<TestExecutableModule .*z/test-settings.yaml>",
+            "  <Function test_runner>",
+            "<Module .*z/test_aa.py>",
+            "  <Function test_dummy>",
+            "<TestExecutableModule .*b/test-settings.yaml>",
+            "  <Function test_runner>",
+            "<Module .*b/a/test_aaa.py>",
+            "  <Function test_dummy>",
+            "<Module .*test_a.py>",
+            "  <Function test_dummy>",
+        ]
+    )
+
+
+def test_longest_first_without_history(testdir):
+    """Check the error when --exe-longest-first has no history."""
+    directory = testdir.copy_example("tests/data/collect_order")
+    result = testdir.runpytest(directory, "--exe-longest-first")
+    result.stderr.re_match_lines(
+        ["ERROR: option --exe-longest-first requires --exe-history"]
+    )
+
+
+class _Item:
+    """Mock of a pytest item."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+
+def _create_items(nb_items: int, seed: int = 0) -> list[_Item]:
+    """Create items with a random tree of test cases, in collection order."""
+    rng = random.Random(seed)
+    items: list[_Item] = []
+    case_index = 0
+    while len(items) < nb_items:
+        depth = rng.randint(1, 4)
+        parts = [f"d{rng.randint(0, 3)}" for _ in range(depth - 1)]
+        parent_dir = "/".join(["/inputs"] + parts)
+        case_dir = f"{parent_dir}/case{case_index}"
+        items += [_Item(f"{case_dir}/test-settings.yaml")]
+        items += [_Item(f"{case_dir}/test_{i}.py") for i in range(rng.randint(0, 2))]
+        items += [_Item(f"{parent_dir}/test_parent.py")] * rng.randint(0, 1)
+        case_index += 1
+    items = items[:nb_items]
+    # pytest collects the items sorted by path
+    return sorted(items, key=lambda item: item.path.split("/"))
+
+
+def _sort(items: list[_Item], durations: dict[int, float] | None = None) -> list[_Item]:
+    """Sort the items, with the durations bound to the ids of the items."""
+    item_durations = None
+    if durations is not None:
+        item_durations = [durations[id(item)] for item in items]
+    keys = _get_sort_keys(items, item_durations)
+    return [items[i] for i in sorted(range(len(items)), key=keys.__getitem__)]
+
+
+@pytest.mark.parametrize("with_durations", (False, True))
+def test_sort_keys(with_durations):
+    """Check the order guarantees on a random tree."""
+    items = _create_items(300)
+    durations = None
+    if with_durations:
+        rng = random.Random(0)
+        durations = {id(item): rng.choice((0.0, 1.0, 10.0)) for item in items}
+    sorted_items = _sort(items, durations)
+    assert sorted(map(id, sorted_items)) == sorted(map(id, items))
+
+    for index_1, item_1 in enumerate(sorted_items):
+        dir_1 = Path(item_1.path).parent
+        for item_2 in sorted_items[index_1 + 1 :]:
+            dir_2 = Path(item_2.path).parent
+            if item_2.path.endswith(".yaml"):
+                # yaml item first in its tree
+                assert not (dir_2 == dir_1 or dir_2 in dir_1.parents)
+            elif not item_1.path.endswith(".yaml"):
+                # parent last
+                assert dir_1 not in dir_2.parents
+
+    # sorting is idempotent
+    assert _sort(_sort(items, durations), durations) == sorted_items
+
+
+def test_sort_keys_durations():
+    """Check that the longest test cases are first."""
+    paths = [
+        "/inputs/a/test-settings.yaml",
+        "/inputs/a/test_a.py",
+        "/inputs/b/c/test-settings.yaml",
+        "/inputs/b/d/test-settings.yaml",
+        "/inputs/b/test_b.py",
+        "/inputs/e/test-settings.yaml",
+        "/inputs/test_root.py",
+    ]
+    items = [_Item(path) for path in paths]
+    durations = dict(zip(map(id, items), (1.0, 1.0, 2.0, 3.0, 0.0, 5.0, 0.0)))
+    assert [item.path for item in _sort(items, durations)] == [
+        "/inputs/e/test-settings.yaml",
+        "/inputs/b/d/test-settings.yaml",
+        "/inputs/b/c/test-settings.yaml",
+        "/inputs/b/test_b.py",
+        "/inputs/a/test-settings.yaml",
+        "/inputs/a/test_a.py",
+        "/inputs/test_root.py",
+    ]
+    # same durations keep the collection order
+    durations = dict.fromkeys(map(id, items), 1.0)
+    assert _sort(items, durations) == _sort(items)
+
+
+@pytest.mark.parametrize(
+    "nb_items",
+    (10_000, 100_000, pytest.param(1_000_000, marks=pytest.mark.slow)),
+)
+def test_sort_keys_benchmark(nb_items, record_property):
+    """Benchmark the ordering of the items.
+
+    The timings are recorded in the user properties of the tests, they are shown
+    for instance in the junit xml report.
+    """
+    items = _create_items(nb_items)
+    start = time.perf_counter()
+    _sort(items)
+    record_property("ordering_time", time.perf_counter() - start)
+
+
 def test_marks_from_yaml(testdir):
     """Test marks from test-settings.yaml."""
     directory = testdir.copy_example("tests/data/test_marks_from_yaml")
@@ -62,6 +225,21 @@ def test_marks_from_yaml(testdir):
     assert result.parseoutcomes()["deselected"] == 3
 
 
+def test_marks_not_shared_by_sessions(testdir):
+    """Test that the marks of a session are not used in a following session."""
+    directory = testdir.copy_example("tests/data/test_marks_from_yaml")
+    result = testdir.runpytest(
+        directory / "tests-inputs", "--collect-only", "-m not mark1"
+    )
+    assert result.parseoutcomes()["deselected"] == 3
+
+    Path(directory / "tests-inputs/test-settings.yaml").write_text("")
+    result = testdir.runpytest(
+        directory / "tests-inputs", "--collect-only", "-m not mark1"
+    )
+    assert "deselected" not in result.parseoutcomes()
+
+
 def test_output_directory_already_exists(testdir):
     """Test create_output_dir fixture for existing directory error."""
     directory = testdir.copy_example("tests/data/test_output_dir_fixture")
@@ -80,6 +258,34 @@ def test_output_directory_already_exists(testdir):
     )
 
 
+def test_output_directory_overwrite(testdir):
+    """Test the report of the synchronization of the output directories."""
+    directory = testdir.copy_example("tests/data/test_output_dir_fixture")
+    Path(directory / "tests-inputs/case/input").write_text("")
+    for created, unchanged in ((1, 0), (0, 1)):
+        result = testdir.runpytest(directory / "tests-inputs", "--exe-overwrite-output")
+        result.stdout.fnmatch_lines(
+            [
+                f"synchronized 1 output directories: {created} created, 0 updated, "
+                f"0 removed, {unchanged} unchanged entries"
+            ]
+        )
+
+
+def test_output_directory_clean(testdir):
+    """Test the removal of the output directories in the background."""
+    directory = testdir.copy_example("tests/data/test_output_dir_fixture")
+    output_path = Path(directory / "tests-output")
+    (output_path / "case/output").write_text("")
+    (output_path / ".trash/leftover").mkdir(parents=True)
+    result = testdir.runpytest(directory / "tests-inputs", "--exe-clean-output")
+    # the runner test is skipped but the output directory is created
+    assert_outcomes(result, skipped=1)
+    assert (output_path / "case").is_dir()
+    assert not (output_path / "case/output").exists()
+    assert not (output_path / ".trash").exists()
+
+
 def test___init__(testdir):
     """Test error handling when missing __init__.py."""
     testdir.copy_example("tests/data/test___init__")
@@ -18,9 +18,13 @@
 from __future__ import annotations
 
 import stat
+import subprocess
+import threading
 from pathlib import Path
 
 import pytest
+import yaml
+from pytest_executable import report
 
 # deal with old pytest not having no_re_match_line
 # TODO: remove this once old pytest is no longer supported
@@ -73,14 +77,27 @@ def test_report_generator_ok(testdir):
     directory = testdir.copy_example("tests/data/test_report")
     generator_path = directory / "report/generator.sh"
     fix_execute_permission(generator_path)
-    result = testdir.runpytest(
-        directory / "tests-inputs", "--exe-report-generator", generator_path
-    )
-    # skip runner because no --exe-runner
-    result.assert_outcomes(skipped=1)
-    result.stdout.re_match_lines(
-        [".*starting report generation", ".*report generation done"]
-    )
+    db_path = Path(testdir.tmpdir) / "tests-output/tests_report_db.yaml"
+    for options in ((), ("--exe-report-yaml",), ()):
+        result = testdir.runpytest(
+            directory / "tests-inputs",
+            "--exe-report-generator",
+            generator_path,
+            "--exe-overwrite-output",
+            *options,
+        )
+        # skip runner because no --exe-runner
+        result.assert_outcomes(skipped=1)
+        result.stdout.re_match_lines(
+            [".*starting report generation", ".*report generation done"]
+        )
+        # the recorded results are exported for the generator only on demand, a
+        # previous export is removed
+        assert db_path.is_file() == bool(options)
+        if options:
+            with db_path.open() as file_:
+                db = yaml.safe_load(file_)
+            assert db == {"case": {"status": "skipped", "messages": []}}
 
 
 def test_no_test_no_report(testdir):
@@ -96,3 +113,93 @@ def test_no_test_no_report(testdir):
         assert "report generation" not in result.stdout.str()
     else:
         result.stdout.no_re_match_line("report generation")
+
+
+def test_report_generator_async(testdir):
+    """Test generating the report in a detached process."""
+    directory = testdir.copy_example("tests/data/test_report")
+    generator_path = directory / "report/generator-ko.sh"
+    fix_execute_permission(generator_path)
+    output_root = Path(testdir.tmpdir) / "tests-output"
+    result = testdir.runpytest(
+        directory / "tests-inputs",
+        "--exe-report-generator",
+        generator_path,
+        "--exe-report-async",
+    )
+    result.assert_outcomes(skipped=1)
+    result.stdout.re_match_lines(
+        [
+            ".*starting report generation",
+            "the report generator runs with PID [0-9]+, its output is written to "
+            ".*/tests-output/report-generation.log",
+            ".*report generation started",
+        ]
+    )
+
+    report.wait_generation(output_root, 0.01)
+    assert report.get_generation_status(output_root)[1] == 1
+    log_path = output_root / report.REPORT_LOG_FILENAME
+    assert "REPORT GENERATION FAILED" in log_path.read_text()
+
+    # the next session tells the status of the generation
+    result = testdir.runpytest(directory / "tests-inputs")
+    result.stdout.re_match_lines(
+        ["last detached report generation exited with status 1, see .*log"]
+    )
+
+    # the status of a successful generation is not shown
+    pid = report.get_generation_status(output_root)[0]
+    (output_root / report.REPORT_STATUS_FILENAME).write_text(f"{pid}\n0\n")
+    result = testdir.runpytest(directory / "tests-inputs", "--exe-overwrite-output")
+    if OLD_PYTEST:
+        assert "last detached report generation" not in result.stdout.str()
+    else:
+        result.stdout.no_re_match_line("last detached report generation")
+
+
+def test_report_generator_running(testdir):
+    """Test a session with a report generation running in the output root."""
+    directory = testdir.copy_example("tests/data/test_report")
+    output_root = Path(testdir.tmpdir) / "tests-output"
+    output_root.mkdir()
+    process = subprocess.Popen(["sleep", "0.5"])
+    # reap the process when it is done, like the init process would do
+    threading.Thread(target=process.wait).start()
+    (output_root / report.REPORT_STATUS_FILENAME).write_text(f"{process.pid}\n")
+    generator_path = directory / "report/generator.sh"
+    fix_execute_permission(generator_path)
+
+    # a session that does not write the report database is not blocked
+    result = testdir.runpytest(directory / "tests-inputs")
+    result.assert_outcomes(skipped=1)
+    assert process.poll() is None
+    if OLD_PYTEST:
+        assert "last detached report generation" not in result.stdout.str()
+    else:
+        result.stdout.no_re_match_line("last detached report generation")
+
+    result = testdir.runpytest(
+        directory / "tests-inputs",
+        "--exe-report-generator",
+        generator_path,
+        "--exe-overwrite-output",
+    )
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.re_match_lines(
+        [
+            "ERROR: a report is being generated in the output root .*/tests-output, "
+            "use --exe-report-wait to wait for it"
+        ]
+    )
+
+    result = testdir.runpytest(
+        directory / "tests-inputs",
+        "--exe-report-generator",
+        generator_path,
+        "--exe-report-wait",
+        "--exe-overwrite-output",
+    )
+    result.assert_outcomes(skipped=1)
+    assert process.poll() is not None
+    result.stdout.re_match_lines(["last detached report generation was interrupted.*"])
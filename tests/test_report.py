@@ -18,13 +18,14 @@
 from __future__ import annotations
 
 import shutil
+import sqlite3
 from collections import defaultdict
 
 import pytest
 import yaml
 from pytest_executable.report import create
-from pytest_executable.report import dump
-from pytest_executable.report import merge
+from pytest_executable.report import ReportDB
+from pytest_executable.report import ReportRecorder
 
 from . import ROOT_DATA_DIR
 
@@ -112,60 +113,122 @@ def test_create(report_data, expected):
     assert create(TerminalReporter(report_data)) == expected
 
 
-@pytest.mark.parametrize(
-    "db,expected_db",
-    (
-        (
-            {
-                # existing entry is overwritten
-                ".": None,
-                # new entry is added
-                "dir4": None,
-            },
-            {
-                ".": None,
-                "dir1": {"status": "failed", "messages": ["failure message 1"]},
-                "dir2": {"status": "passed", "messages": []},
-                "dir3": {"status": "skipped", "messages": []},
-                "dir4": None,
+def test_report_db(tmp_path):
+    """Test the SQLite report database."""
+    db_path = tmp_path / "report_db.sqlite"
+    yaml_path = tmp_path / "report_db.yaml"
+    shutil.copy(DATA_DIR / "report_db.yaml", yaml_path)
+
+    # the yaml database is imported when the database is created
+    with ReportDB(db_path, yaml_path) as db:
+        expected_db = yaml.safe_load(yaml_path.read_text())
+        assert db.load() == expected_db
+        db.upsert({"dir1": {"status": "passed", "messages": []}})
+        db.upsert({"dir4": {"status": "failed", "messages": ["message"]}})
+
+    # the yaml database is not imported again
+    yaml_path.write_text("")
+    expected_db["dir1"] = {"status": "passed", "messages": []}
+    expected_db["dir4"] = {"status": "failed", "messages": ["message"]}
+    with ReportDB(db_path, yaml_path) as db:
+        assert db.load() == expected_db
+        db.export(yaml_path)
+
+    assert yaml.safe_load(yaml_path.read_text()) == expected_db
+
+
+class _Config:
+    """Mock of pytest Config class."""
+
+
+def test_report_recorder(tmp_path):
+    """Test recording the reports as they arrive."""
+    db_path = tmp_path / "report_db.sqlite"
+    recorder = ReportRecorder(_Config(), db_path, flush_interval=3600.0)
+    for status, dir_path, message in REPORT_DATA[:6]:
+        recorder.add(status, _TestReport(dir_path, message))
+    # not flushed yet
+    assert not db_path.exists()
+    recorder.flush()
+    for status, dir_path, message in REPORT_DATA[6:] + [["xfailed", "root/x", ""]]:
+        recorder.add(status, _TestReport(dir_path, message))
+    recorder.close()
+
+    with ReportDB(db_path) as db:
+        # the order of the messages is kept
+        assert db.load() == create(TerminalReporter(REPORT_DATA))
+
+
+def test_report_recorder_flush_interval(tmp_path):
+    """Test flushing the recorded reports periodically."""
+    db_path = tmp_path / "report_db.sqlite"
+    recorder = ReportRecorder(_Config(), db_path, flush_interval=0.0)
+    recorder.add("passed", _TestReport("root/path", ""))
+    with ReportDB(db_path) as db:
+        assert db.load() == {".": {"status": "passed", "messages": []}}
+    recorder.add("failed", _TestReport("root/path", "message"))
+    with ReportDB(db_path) as db:
+        assert db.load() == {".": {"status": "failed", "messages": ["message"]}}
+    recorder.close()
+
+
+def test_report_recorder_read_back(tmp_path):
+    """Test merging the reports into the records dropped by the flushes."""
+    db_path = tmp_path / "report_db.sqlite"
+    # a test case of a previous session is not merged
+    with ReportDB(db_path) as db:
+        db.upsert({".": {"status": "error", "messages": ["old"]}})
+    recorder = ReportRecorder(_Config(), db_path, flush_interval=0.0)
+    test_report = _TestReport("root/path", "failure")
+    test_report.user_properties = [("runner_wall_time", 2.5)]
+    recorder.add("failed", test_report)
+    # the flushed records are not kept in memory
+    assert not recorder._ReportRecorder__records
+    recorder.add("error", _TestReport("root/path", "error"))
+    assert not recorder._ReportRecorder__records
+    recorder.add("passed", _TestReport("root/path", ""))
+    recorder.add("failed", _TestReport("root/path", "failure 2"))
+    recorder.close()
+
+    with ReportDB(db_path) as db:
+        # the error messages come first
+        assert db.load() == {
+            ".": {
+                "status": "error",
+                "messages": ["error", "failure", "failure 2"],
+                "resources": {"wall_time": 2.5},
+            }
+        }
+
+
+def test_report_db_resources(tmp_path):
+    """Test storing the resources used by the runners."""
+    db_path = tmp_path / "report_db.sqlite"
+    # a database without the resources columns
+    connection = sqlite3.connect(str(db_path))
+    with connection:
+        connection.execute(
+            "CREATE TABLE cases (path TEXT PRIMARY KEY, status TEXT, messages TEXT)"
+        )
+        connection.execute("INSERT INTO cases VALUES ('dir', 'passed', '[]')")
+    connection.close()
+
+    recorder = ReportRecorder(_Config(), db_path)
+    test_report = _TestReport("root/path", "")
+    test_report.user_properties = [
+        ("runner_cached", False),
+        ("runner_wall_time", 2.5),
+        ("runner_max_rss", 1024),
+    ]
+    recorder.add("passed", test_report)
+    recorder.close()
+
+    with ReportDB(db_path) as db:
+        assert db.load() == {
+            ".": {
+                "status": "passed",
+                "messages": [],
+                "resources": {"wall_time": 2.5, "max_rss": 1024},
             },
-        ),
-    ),
-)
-def test_merge(db, expected_db):
-    """Test the merge function."""
-    db_path = DATA_DIR / "report_db.yaml"
-    new_db = merge(db_path, db)
-    assert new_db == expected_db
-
-
-def test_dump_new(tmp_path):
-    """Test dump function without existing db file."""
-    report_path = tmp_path / "report_db.yaml"
-    dump(report_path, TerminalReporter(REPORT_DATA))
-
-    with report_path.open() as file_:
-        db = yaml.safe_load(file_)
-
-    with (DATA_DIR / "report_db.yaml").open() as file_:
-        excepted_db = yaml.safe_load(file_)
-
-    assert db == excepted_db
-
-
-def test_dump_existing(tmp_path):
-    """Test dump function with existing db file."""
-    expected_path = DATA_DIR / "report_db.yaml"
-    report_path = tmp_path / "report_db.yaml"
-    shutil.copy(expected_path, report_path)
-
-    # with the same test outcomes, we shall get the same db
-    dump(report_path, TerminalReporter(REPORT_DATA))
-
-    with report_path.open() as file_:
-        db = yaml.safe_load(file_)
-
-    with expected_path.open() as file_:
-        excepted_db = yaml.safe_load(file_)
-
-    assert db == excepted_db
+            "dir": {"status": "passed", "messages": []},
+        }
@@ -0,0 +1,175 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the runner scheduler."""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+from pytest_executable.plugin import _ScheduledScriptRunner
+from pytest_executable.scheduler import RunnerScheduler
+
+
+def test_submit():
+    """Test submitting jobs and getting their results."""
+    scheduler = RunnerScheduler(2, 2)
+    scheduler.submit("a", lambda: 0)
+    scheduler.submit("b", lambda: 1)
+    scheduler.start()
+    assert scheduler.get("a").result() == 0
+    assert scheduler.get("b").result() == 1
+    assert scheduler.get("c") is None
+
+    with pytest.raises(ValueError, match="a job has already been submitted for a"):
+        scheduler.submit("a", lambda: 0)
+
+    error_msg = "the job c uses 3 cores but at most 2 are available"
+    with pytest.raises(ValueError, match=error_msg):
+        scheduler.submit("c", lambda: 0, 3)
+
+    scheduler.shutdown()
+
+
+def test_max_jobs():
+    """Test the number of concurrent jobs is bounded."""
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def job():
+        with lock:
+            running.append(None)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return 0
+
+    scheduler = RunnerScheduler(2, 10)
+    futures = [scheduler.submit(str(i), job) for i in range(6)]
+    scheduler.start()
+    assert [future.result() for future in futures] == [0] * 6
+    assert max(max_running) == 2
+    scheduler.shutdown()
+
+
+def test_shutdown():
+    """Test the pending jobs are cancelled on shutdown."""
+    started = threading.Event()
+    event = threading.Event()
+
+    def job():
+        started.set()
+        event.wait()
+        return 0
+
+    scheduler = RunnerScheduler(1, 1)
+    running = scheduler.submit("running", job)
+    pending = scheduler.submit("pending", lambda: 0)
+    scheduler.start()
+    started.wait()
+    threading.Timer(0.1, event.set).start()
+    scheduler.shutdown()
+    assert running.result() == 0
+    assert pending.cancelled()
+
+
+def test_max_cores():
+    """Test the cores budget and the largest first policy."""
+    lock = threading.Lock()
+    used_cores = []
+    max_used_cores = []
+    started = []
+
+    def create_job(name, nproc):
+        def job():
+            with lock:
+                started.append(name)
+                used_cores.append(nproc)
+                max_used_cores.append(sum(used_cores))
+            time.sleep(0.05)
+            with lock:
+                used_cores.remove(nproc)
+            return 0
+
+        return job
+
+    scheduler = RunnerScheduler(10, 4)
+    jobs = (("a", 1), ("b", 2), ("c", 4), ("d", 3), ("e", 1), ("f", 2))
+    futures = [
+        scheduler.submit(name, create_job(name, nproc), nproc) for name, nproc in jobs
+    ]
+    scheduler.start()
+    assert [future.result() for future in futures] == [0] * len(jobs)
+    assert max(max_used_cores) == 4
+    # c uses all the cores, then d and a fill the budget
+    assert started[:3] == ["c", "d", "a"]
+    scheduler.shutdown()
+
+
+def test_after():
+    """Test the jobs that depend on other jobs."""
+    lock = threading.Lock()
+    events = []
+
+    def create_job(name, error=False):
+        def job():
+            with lock:
+                events.append(f"{name} started")
+            time.sleep(0.05)
+            with lock:
+                events.append(f"{name} done")
+            if error:
+                raise ValueError
+            return 0
+
+        return job
+
+    scheduler = RunnerScheduler(4, 4)
+    # a dependency submitted later and an unknown one
+    child = scheduler.submit("child", create_job("child"), 1, ["parent", "unknown"])
+    parent = scheduler.submit("parent", create_job("parent", error=True), 1, ["root"])
+    root = scheduler.submit("root", create_job("root"))
+    other = scheduler.submit("other", create_job("other"))
+    scheduler.start()
+    assert child.result() == 0
+    assert root.result() == other.result() == 0
+    with pytest.raises(ValueError):
+        parent.result()
+    # the failure of a dependency does not prevent the execution
+    assert events.index("root done") < events.index("parent started")
+    assert events.index("parent done") < events.index("child started")
+    assert events.index("other started") < events.index("root done")
+    scheduler.shutdown()
+
+
+def test_scheduled_runner(tmp_path):
+    """Test that waiting for a scheduled runner does not execute it again."""
+    script_path = tmp_path / "script.sh"
+    script_path.write_text("echo run >> runs\n")
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    runner = _ScheduledScriptRunner(script_path, {}, workdir, lambda: None)
+    scheduler = RunnerScheduler(1, 1)
+    runner.execution = scheduler.submit("a", runner.execute)
+    scheduler.start()
+    assert asyncio.run(runner.run_async()) == 0
+    assert runner.run() == 0
+    scheduler.shutdown()
+    assert (workdir / "runs").read_text() == "run\n"
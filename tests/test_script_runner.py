@@ -17,8 +17,11 @@
 """Tests for ScriptRunner."""
 from __future__ import annotations
 
+import asyncio
+import os
 import re
 import subprocess
+import sys
 from pathlib import Path
 
 import pytest
@@ -93,3 +96,103 @@ def _assertions(runner_path, script, stdout, stderr_regex):
         assert file_.read().strip() == stdout
     with (runner_path.with_suffix(".sh.stderr")).open() as file_:
         assert re.match(stderr_regex, file_.read())
+
+
+def test_async_execution(tmp_path):
+    """Test concurrent asynchronous script executions."""
+    script_path = DATA_DIR / "nproc.sh"
+    runners = []
+    for nproc in range(3):
+        workdir = tmp_path / str(nproc)
+        workdir.mkdir()
+        runners += [ScriptRunner(script_path, {"nproc": str(nproc)}, workdir)]
+
+    async def gather():
+        return await asyncio.gather(*(runner.run_async() for runner in runners))
+
+    assert asyncio.run(gather()) == [0, 0, 0]
+    for nproc in range(3):
+        _assertions(
+            tmp_path / str(nproc) / script_path.name,
+            f"echo {nproc}",
+            str(nproc),
+            "",
+        )
+
+
+def test_async_execution_with_timeout(tmp_path):
+    """Test asynchronous script execution with timeout."""
+    # with enough time
+    script_path = DATA_DIR / "timeout.sh"
+    runner = ScriptRunner(script_path, {"timeout": "2s"}, tmp_path)
+    assert asyncio.run(runner.run_async()) == 0
+
+    # without enough time
+    runner = ScriptRunner(script_path, {"timeout": "0.1s"}, tmp_path)
+    error_msg = (
+        r"Command '\['/usr/bin/env', 'bash', 'timeout\.sh'\]' timed out after "
+        ".* seconds"
+    )
+    with pytest.raises(subprocess.TimeoutExpired, match=error_msg):
+        asyncio.run(runner.run_async())
+
+
+def test_async_execution_error(tmp_path):
+    """Test error when the asynchronous script execution fails."""
+    error_msg = "execution failure, see the stdout and stderr files in /"
+    script_path = DATA_DIR / "error.sh"
+    runner = ScriptRunner(script_path, {}, tmp_path)
+    with pytest.raises(ScriptExecutionError, match=error_msg):
+        asyncio.run(runner.run_async())
+
+    _assertions(
+        tmp_path / script_path.name,
+        "ls non-existing-file",
+        "",
+        "ls: (?:cannot access )?'?non-existing-file'?: No such file or directory",
+    )
+
+
+def test_async_execution_cancelled(tmp_path):
+    """Test that the process is killed when the execution is cancelled."""
+    script_path = tmp_path / "script.sh"
+    script_path.write_text("echo $$ > pid\nsleep 10\n")
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    pid_path = workdir / "pid"
+    runner = ScriptRunner(script_path, {}, workdir)
+
+    async def cancel():
+        task = asyncio.ensure_future(runner.run_async())
+        while not pid_path.is_file() or not pid_path.read_text():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    # the process has been killed and reaped
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_path.read_text()), 0)
+
+
+def test_execution_resources(tmp_path):
+    """Test the resources used by the processes started by a script."""
+    script_path = tmp_path / "script.sh"
+    script_path.write_text(
+        f'"{sys.executable}" -c "x = bytearray(64 * 2**20); sum(range(10**6))"\n'
+    )
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    runner = ScriptRunner(script_path, {}, workdir)
+    assert runner.resources is None
+    runner.run()
+    resources = runner.resources
+    assert resources.wall_time > 0.0
+    assert resources.user_time + resources.system_time > 0.0
+    assert resources.max_rss >= 64 * 2**20
+
+    # only the wall time is measured asynchronously
+    asyncio.run(runner.run_async())
+    assert runner.resources.wall_time > 0.0
+    assert runner.resources.max_rss is None
@@ -21,7 +21,9 @@ import pytest
 from jsonschema import ValidationError
 from pytest_executable.plugin import SETTINGS_PATH as DEFAULT_SETTINGS_FILE
 from pytest_executable.settings import Settings
+from pytest_executable.settings import SettingsCache
 from pytest_executable.settings import Tolerances
+from pytest_executable.yaml_helper import YamlHelper
 
 
 @pytest.fixture
@@ -89,6 +91,15 @@ marks:
     _test_merge(tmp_path, yaml_str, default_settings)
 
 
+def test_merge_3(tmp_path, default_settings):
+    """Test the comparison chunk size with a unit."""
+    yaml_str = """
+comparison_chunk_size: 2K
+    """
+    default_settings.comparison_chunk_size = 2048
+    _test_merge(tmp_path, yaml_str, default_settings)
+
+
 @pytest.mark.parametrize(
     "yaml_str",
     (  # marks shall be unique
@@ -128,6 +139,19 @@ tolerances:
     quantity:
         rel: -1.
         """,
+        # chunk size shall be a size
+        """
+comparison_chunk_size: 1X
+        """,
+        """
+comparison_chunk_size: 0
+        """,
+        """
+comparison_chunk_size: 0K
+        """,
+        """
+comparison_chunk_size: 0.0M
+        """,
     ),
 )
 def test_yaml_validation(tmp_path, yaml_str):
@@ -145,3 +169,38 @@ def test_alien_item(tmp_path, default_settings):
     settings_file.write_text(yaml_str)
     settings = Settings.from_local_file(DEFAULT_SETTINGS_FILE, settings_file)
     assert settings == default_settings
+
+
+def test_cache(tmp_path, monkeypatch):
+    """Test the settings cache."""
+    settings_file = tmp_path / "settings.yaml"
+    settings_file.write_text("marks: [mark]\nrunner:\n  nproc: 1")
+
+    loaded_paths = []
+    load = YamlHelper.load
+
+    def counting_load(self, path):
+        loaded_paths.append(path)
+        return load(self, path)
+
+    monkeypatch.setattr(YamlHelper, "load", counting_load)
+
+    cache = SettingsCache()
+    settings = cache.get(DEFAULT_SETTINGS_FILE, settings_file)
+    assert settings == Settings.from_local_file(DEFAULT_SETTINGS_FILE, settings_file)
+
+    # the returned settings are copies
+    settings.runner["output_path"] = "dummy"
+    settings.marks.add("other")
+
+    loaded_paths.clear()
+    assert cache.get(DEFAULT_SETTINGS_FILE, settings_file) == Settings(
+        runner={"nproc": 1}, marks={"mark"}, references=set(), tolerances={}
+    )
+    assert not loaded_paths
+
+    # only the modified file is loaded again
+    settings_file.write_text("marks: [mark, other]")
+    settings = cache.get(DEFAULT_SETTINGS_FILE, settings_file)
+    assert settings.marks == {"mark", "other"}
+    assert loaded_paths == [settings_file]
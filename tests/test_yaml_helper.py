@@ -0,0 +1,97 @@
+# Copyright 2020, CS Systemes d'Information, http://www.c-s.fr
+#
+# This file is part of pytest-executable
+#     https://www.github.com/CS-SI/pytest-executable
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the yaml helper."""
+from __future__ import annotations
+
+import io
+import timeit
+
+import jsonschema
+import pytest
+import yaml
+from pytest_executable import yaml_helper
+from pytest_executable.report import YAML_HELPER
+from pytest_executable.settings import SETTINGS_SCHEMA_FILE
+from pytest_executable.yaml_helper import _get_validator
+from pytest_executable.yaml_helper import YamlHelper
+
+from . import ROOT_DATA_DIR
+
+REPORT_DB_PATH = ROOT_DATA_DIR / "report/report_db.yaml"
+REPORT_SCHEMA_PATH = SETTINGS_SCHEMA_FILE.parent / "report-db-schema.yaml"
+
+
+def test_shared_validator(monkeypatch):
+    """Test that the validator of a schema is built once."""
+    monkeypatch.setattr(yaml_helper, "_VALIDATORS", {})
+    YamlHelper(SETTINGS_SCHEMA_FILE)
+    validator = _get_validator(SETTINGS_SCHEMA_FILE)
+    YamlHelper(SETTINGS_SCHEMA_FILE)
+    assert list(yaml_helper._VALIDATORS.values()) == [validator]
+    assert _get_validator(REPORT_SCHEMA_PATH) is not validator
+
+
+def test_validation(tmp_path):
+    """Test the validation can be skipped."""
+    path = tmp_path / "db.yaml"
+    path.write_text("case: 0")
+    with pytest.raises(jsonschema.ValidationError):
+        YAML_HELPER.load(path)
+    assert YAML_HELPER.load(path, validate=False) == {"case": 0}
+
+    stream = io.StringIO()
+    with pytest.raises(jsonschema.ValidationError):
+        YAML_HELPER.dump({"case": 0}, stream)
+    YAML_HELPER.dump({"case": 0}, stream, validate=False)
+    assert yaml.safe_load(stream.getvalue()) == {"case": 0}
+
+
+def test_validation_reuses_validator(monkeypatch):
+    """Test that validating the data does not build a validator."""
+    with REPORT_DB_PATH.open() as file_:
+        data = yaml.safe_load(file_)
+    helper = YamlHelper(REPORT_SCHEMA_PATH)
+    validator = _get_validator(REPORT_SCHEMA_PATH)
+    assert helper._YamlHelper__validator is validator
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the schema is checked again")
+
+    monkeypatch.setattr(type(validator), "check_schema", fail)
+    monkeypatch.setattr(jsonschema, "validate", fail)
+    for _ in range(3):
+        helper.validate(data)
+        YAML_HELPER.validate(data)
+
+
+def test_validation_benchmark(record_property):
+    """Benchmark the cost of the validation per file before and after the reuse.
+
+    Before, the schema is checked and a validator is built for each file with
+    jsonschema.validate, after, the cached validator is used. The timings are
+    recorded in the user properties of the test, they are shown for instance in
+    the junit xml report.
+    """
+    with REPORT_DB_PATH.open() as file_:
+        data = yaml.safe_load(file_)
+    schema = _get_validator(REPORT_SCHEMA_PATH).schema
+
+    number = 200
+    before = timeit.timeit(lambda: jsonschema.validate(data, schema), number=number)
+    after = timeit.timeit(lambda: YAML_HELPER.validate(data), number=number)
+    record_property("validation_time_before", before / number)
+    record_property("validation_time_after", after / number)